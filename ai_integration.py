@@ -1,37 +1,57 @@
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Sequence, Tuple
 import openai
+import json
 import logging
 import os
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 import numpy as np
-from collections import defaultdict
+from ai_services.cache import get_llm_cache
+from ai_services.structured import REPAIR_RETRIES, extract_json, repair_prompt, validate_response
+from transaction_frame import TransactionFrame, grouped_stats
 
 logger = logging.getLogger(__name__)
 
+SPENDING_ANALYSIS_MODEL = "gpt-4"
+CATEGORIZATION_MODEL = os.getenv('AI_CATEGORIZATION_MODEL', 'gpt-4')
+# Transactions packed into one categorization request. Larger batches amortize
+# the instructions over more rows but make a single bad response costlier.
+CATEGORIZATION_BATCH_SIZE = int(os.getenv('AI_CATEGORIZATION_BATCH_SIZE', '25'))
+
 class TransactionAnalysis(BaseModel):
     category: str
     confidence: float
     insights: str
     budget_impact: str
 
+
+def _spending_frame(transactions) -> TransactionFrame:
+    """Spending rows (amount < 0, made positive) of a transaction list, or a frame already built by it."""
+    if isinstance(transactions, TransactionFrame):
+        return transactions
+    return TransactionFrame.from_dicts(transactions).expenses(negative=True)
+
+
 class AIFinancialAdvisor:
     def __init__(self, api_key: str = None):
         self.client = openai.OpenAI(api_key=api_key or os.environ.get('OPENAI_API_KEY'))
+        # Running totals reported by the API, read by benchmark_categorization.py.
+        self.usage = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
         
-    def analyze_spending_patterns(self, transactions: List[Dict]) -> Dict:
-        """Analyze spending patterns and provide detailed insights."""
-        try:
-            # Calculate basic spending metrics
-            spending_by_category = self._calculate_spending(transactions)
-            spending_trends = self._analyze_spending_trends(transactions)
-            unusual_transactions = self._identify_unusual_transactions(transactions)
-            recurring_expenses = self._identify_recurring_expenses(transactions)
-            
-            # Calculate total spending correctly
-            total_spending = sum(cat_data['total'] for cat_data in spending_by_category.values())
-            
-            prompt = """
+    def spending_metrics(self, transactions: List[Dict]) -> Dict:
+        """Category, trend, outlier and recurring-expense metrics fed to the analysis prompt."""
+        spending = _spending_frame(transactions)
+        spending_by_category = self._calculate_spending(spending)
+        return {
+            'spending_data': dict(spending_by_category),
+            'trends': self._analyze_spending_trends(spending),
+            'unusual_transactions': self._identify_unusual_transactions(spending),
+            'recurring_expenses': self._identify_recurring_expenses(spending),
+            'total_spending': sum(cat_data['total'] for cat_data in spending_by_category.values())
+        }
+
+    def _spending_analysis_messages(self, metrics: Dict) -> List[Dict]:
+        prompt = """
             Analyze the following financial data and provide detailed insights:
 
             Spending Categories: {categories}
@@ -66,32 +86,34 @@ class AIFinancialAdvisor:
                - Identify seasonal spending patterns
                - Suggest proactive financial planning steps
             """
-            
+
+        return [{
+            "role": "system",
+            "content": "You are a sophisticated financial advisor. Provide specific, actionable insights based on spending data."
+        },
+        {
+            "role": "user",
+            "content": prompt.format(
+                categories=metrics['spending_data'],
+                total=metrics['total_spending'],
+                trends=metrics['trends'],
+                unusual=metrics['unusual_transactions'],
+                recurring=metrics['recurring_expenses']
+            )
+        }]
+
+    def analyze_spending_patterns(self, transactions: List[Dict]) -> Dict:
+        """Analyze spending patterns and provide detailed insights."""
+        try:
+            metrics = self.spending_metrics(transactions)
             response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{
-                    "role": "system",
-                    "content": "You are a sophisticated financial advisor. Provide specific, actionable insights based on spending data."
-                },
-                {
-                    "role": "user",
-                    "content": prompt.format(
-                        categories=dict(spending_by_category),
-                        total=total_spending,
-                        trends=spending_trends,
-                        unusual=unusual_transactions,
-                        recurring=recurring_expenses
-                    )
-                }]
+                model=SPENDING_ANALYSIS_MODEL,
+                messages=self._spending_analysis_messages(metrics)
             )
             
             return {
                 'analysis': response.choices[0].message.content,
-                'spending_data': dict(spending_by_category),
-                'trends': spending_trends,
-                'unusual_transactions': unusual_transactions,
-                'recurring_expenses': recurring_expenses,
-                'total_spending': total_spending,
+                **metrics,
                 'timestamp': datetime.now().isoformat()
             }
         except Exception as e:
@@ -106,147 +128,228 @@ class AIFinancialAdvisor:
                 'timestamp': datetime.now().isoformat()
             }
 
-    def _calculate_spending(self, transactions: List[Dict]) -> Dict:
+    def analyze_spending_patterns_stream(self, metrics: Dict, use_cache: bool = True) -> Iterator[str]:
+        """Yield the analysis of precomputed ``spending_metrics`` as GPT-4 generates it.
+
+        The assembled text is cached like a Gemini completion, so a repeat
+        request for the same metrics is answered in one piece.
+        """
+        messages = self._spending_analysis_messages(metrics)
+        prompt = json.dumps(messages, sort_keys=True, default=str)
+        cache = get_llm_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(SPENDING_ANALYSIS_MODEL, prompt)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        try:
+            stream = self.client.chat.completions.create(
+                model=SPENDING_ANALYSIS_MODEL,
+                messages=messages,
+                stream=True
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            logger.error(f"Error streaming spending analysis: {str(e)}")
+            return
+
+        if cache is not None and parts:
+            cache.set(SPENDING_ANALYSIS_MODEL, prompt, ''.join(parts))
+
+    def _calculate_spending(self, transactions) -> Dict:
         """Calculate spending by category with additional metrics."""
-        spending = defaultdict(lambda: {
-            'total': 0,
-            'count': 0,
-            'average': 0,
-            'max': 0,
-            'min': float('inf')
-        })
-        
-        for transaction in transactions:
-            if transaction['amount'] < 0:
-                category = transaction.get('category', 'Uncategorized')
-                amount = abs(transaction['amount'])
-                
-                cat_data = spending[category]
-                cat_data['total'] += amount
-                cat_data['count'] += 1
-                cat_data['max'] = max(cat_data['max'], amount)
-                cat_data['min'] = min(cat_data['min'], amount)
-                cat_data['average'] = cat_data['total'] / cat_data['count']
-        
-        return dict(spending)
+        spending = _spending_frame(transactions)
+        counts, totals, minima, maxima = spending.category_summary()
+        return {
+            category: {
+                'total': float(totals[code]),
+                'count': int(counts[code]),
+                'average': float(totals[code] / counts[code]),
+                'max': float(maxima[code]),
+                'min': float(minima[code])
+            }
+            for code, category in enumerate(spending.categories)
+        }
 
-    def _analyze_spending_trends(self, transactions: List[Dict]) -> Dict:
+    def _analyze_spending_trends(self, transactions) -> Dict:
         """Analyze month-over-month spending trends."""
-        monthly_spending = defaultdict(float)
-        
-        for transaction in transactions:
-            if transaction['amount'] < 0:
-                date = datetime.strptime(transaction['date'], '%Y-%m-%d')
-                month_key = date.strftime('%Y-%m')
-                monthly_spending[month_key] += abs(transaction['amount'])
-        
-        # Calculate month-over-month changes
-        months = sorted(monthly_spending.keys())
+        monthly_spending = _spending_frame(transactions).monthly_totals()
+        months = list(monthly_spending)
+
         trends = {}
-        
-        for i in range(1, len(months)):
-            current_month = months[i]
-            prev_month = months[i-1]
-            change = ((monthly_spending[current_month] - monthly_spending[prev_month]) 
-                     / monthly_spending[prev_month] * 100)
+        for prev_month, current_month in zip(months, months[1:]):
+            change = ((monthly_spending[current_month] - monthly_spending[prev_month])
+                      / monthly_spending[prev_month] * 100)
             trends[current_month] = {
                 'change_percentage': round(change, 2),
                 'current_spending': round(monthly_spending[current_month], 2),
                 'previous_spending': round(monthly_spending[prev_month], 2)
             }
-        
+
         return trends
 
-    def _identify_unusual_transactions(self, transactions: List[Dict]) -> List[Dict]:
+    def _identify_unusual_transactions(self, transactions) -> List[Dict]:
         """Identify statistically unusual transactions."""
-        category_stats = defaultdict(list)
-        unusual_transactions = []
-        
-        # Calculate category statistics
-        for transaction in transactions:
-            if transaction['amount'] < 0:
-                category = transaction.get('category', 'Uncategorized')
-                category_stats[category].append(abs(transaction['amount']))
-        
-        # Identify outliers using Z-score
-        for transaction in transactions:
-            if transaction['amount'] < 0:
-                category = transaction.get('category', 'Uncategorized')
-                amount = abs(transaction['amount'])
-                amounts = category_stats[category]
-                
-                if len(amounts) > 0:
-                    mean = np.mean(amounts)
-                    std = np.std(amounts)
-                    z_score = (amount - mean) / std if std > 0 else 0
-                    
-                    if abs(z_score) > 2:  # More than 2 standard deviations
-                        unusual_transactions.append({
-                            'transaction': transaction,
-                            'z_score': z_score,
-                            'average_for_category': mean
-                        })
-        
-        return unusual_transactions
+        spending = _spending_frame(transactions)
+        z_scores, means = spending.category_z_scores()
 
-    def _identify_recurring_expenses(self, transactions: List[Dict]) -> List[Dict]:
+        # More than 2 standard deviations from the category mean
+        return [
+            {
+                'transaction': spending.rows[i],
+                'z_score': float(z_scores[i]),
+                'average_for_category': float(means[spending.category_codes[i]])
+            }
+            for i in np.flatnonzero(np.abs(z_scores) > 2)
+        ]
+
+    def _identify_recurring_expenses(self, transactions) -> List[Dict]:
         """Identify recurring expenses and subscriptions."""
-        merchant_transactions = defaultdict(list)
+        spending = _spending_frame(transactions)
+        merchant_count = len(spending.merchants)
+        counts, mean_amounts, amount_stds = grouped_stats(spending.merchant_codes, spending.amounts, merchant_count)
+        intervals, interval_codes = spending.merchant_intervals()
+        _, mean_intervals, interval_stds = grouped_stats(interval_codes, intervals, merchant_count)
+
         recurring_expenses = []
-        
-        # Group transactions by merchant
-        for transaction in transactions:
-            if transaction['amount'] < 0:
-                merchant = transaction.get('merchant_name', transaction.get('name', ''))
-                merchant_transactions[merchant].append({
-                    'amount': abs(transaction['amount']),
-                    'date': datetime.strptime(transaction['date'], '%Y-%m-%d')
-                })
-        
-        # Identify recurring patterns
-        for merchant, trans in merchant_transactions.items():
-            if len(trans) >= 2:
-                amounts = [t['amount'] for t in trans]
-                dates = [t['date'] for t in trans]
-                
-                # Check for consistent amounts and regular intervals
-                amount_std = np.std(amounts)
-                if amount_std < 1:  # Very consistent amounts
-                    date_diffs = [(dates[i] - dates[i-1]).days 
-                                for i in range(1, len(dates))]
-                    mean_interval = np.mean(date_diffs)
-                    interval_std = np.std(date_diffs)
-                    
-                    if interval_std < 5:  # Consistent intervals
-                        recurring_expenses.append({
-                            'merchant': merchant,
-                            'amount': np.mean(amounts),
-                            'interval_days': mean_interval,
-                            'confidence': 'high' if interval_std < 2 else 'medium'
-                        })
-        
+        # Very consistent amounts at consistent intervals
+        for code in np.flatnonzero((counts >= 2) & (amount_stds < 1) & (interval_stds < 5)):
+            recurring_expenses.append({
+                'merchant': spending.merchants[code],
+                'amount': float(mean_amounts[code]),
+                'interval_days': float(mean_intervals[code]),
+                'confidence': 'high' if interval_stds[code] < 2 else 'medium'
+            })
+
         return recurring_expenses
 
+    def _complete(self, prompt: str) -> str:
+        """Single-message chat completion; records token usage."""
+        response = self.client.chat.completions.create(
+            model=CATEGORIZATION_MODEL,
+            messages=[{
+                "role": "user",
+                "content": prompt
+            }]
+        )
+        self.usage['requests'] += 1
+        if getattr(response, 'usage', None) is not None:
+            self.usage['prompt_tokens'] += response.usage.prompt_tokens or 0
+            self.usage['completion_tokens'] += response.usage.completion_tokens or 0
+        return response.choices[0].message.content
+
     def enhance_transaction_categorization(
         self, 
         transaction: str,
-        xgb_category: str
+        xgb_category: str,
+        use_cache: bool = True
     ) -> TransactionAnalysis:
-        """Enhance transaction categorization with AI insights."""
+        """Enhance transaction categorization with AI insights.
+
+        Malformed answers get up to AI_REPAIR_RETRIES repair requests; only
+        validated results are cached.
+        """
+        prompt = self._create_categorization_prompt(transaction, xgb_category)
+        cache = get_llm_cache() if use_cache else None
+        if cache is not None:
+            analysis, _ = validate_response(cache.get(CATEGORIZATION_MODEL, prompt), TransactionAnalysis)
+            if analysis is not None:
+                return analysis
+
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{
-                    "role": "user",
-                    "content": self._create_categorization_prompt(transaction, xgb_category)
-                }]
-            )
-            
-            return TransactionAnalysis.parse_raw(response.choices[0].message.content)
+            content = self._complete(prompt)
+            analysis, error = validate_response(content, TransactionAnalysis)
+            for _ in range(REPAIR_RETRIES):
+                if analysis is not None:
+                    break
+                content = self._complete(repair_prompt(content, TransactionAnalysis, error))
+                analysis, error = validate_response(content, TransactionAnalysis)
         except Exception as e:
             logger.error(f"Error in transaction enhancement: {str(e)}")
             return None
 
+        if analysis is None:
+            logger.error(f"Error in transaction enhancement: {error}")
+            return None
+        if cache is not None:
+            cache.set(CATEGORIZATION_MODEL, prompt, analysis.model_dump_json())
+        return analysis
+
+    def enhance_transaction_categorizations(
+        self,
+        transactions: Sequence[Tuple[str, str]],
+        batch_size: Optional[int] = None
+    ) -> List[Optional[TransactionAnalysis]]:
+        """Categorize many (transaction, initial category) pairs, batch_size per request.
+
+        Results line up with the input. Rows missing or malformed in a batch
+        response are retried one at a time; rows that still fail are None.
+        """
+        batch_size = max(1, batch_size or CATEGORIZATION_BATCH_SIZE)
+        results: List[Optional[TransactionAnalysis]] = [None] * len(transactions)
+
+        for start in range(0, len(transactions), batch_size):
+            batch = transactions[start:start + batch_size]
+            parsed = self._categorize_batch(batch) if len(batch) > 1 else {}
+            for offset, (transaction, category) in enumerate(batch):
+                analysis = parsed.get(offset)
+                if analysis is None:
+                    analysis = self.enhance_transaction_categorization(transaction, category)
+                results[start + offset] = analysis
+
+        return results
+
+    def _categorize_batch(self, batch: Sequence[Tuple[str, str]]) -> Dict[int, TransactionAnalysis]:
+        """One request for the whole batch; returns the rows that parsed, keyed by position."""
+        try:
+            content = self._complete(self._create_batch_categorization_prompt(batch))
+        except Exception as e:
+            logger.error(f"Error in batch transaction enhancement: {str(e)}")
+            return {}
+        return self._parse_batch_response(content, len(batch))
+
+    @staticmethod
+    def _parse_batch_response(content: str, size: int) -> Dict[int, TransactionAnalysis]:
+        items = extract_json(content)
+        if not isinstance(items, list):
+            logger.warning("Batch categorization response was not a JSON array")
+            return {}
+
+        parsed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.pop('id'))
+                if 0 <= index < size and index not in parsed:
+                    parsed[index] = TransactionAnalysis.model_validate(item)
+            except Exception:
+                continue
+        if len(parsed) < size:
+            logger.info(f"Batch categorization parsed {len(parsed)}/{size} rows; retrying the rest individually")
+        return parsed
+
+    def _create_batch_categorization_prompt(self, batch: Sequence[Tuple[str, str]]) -> str:
+        """Prompt asking for one JSON object per transaction, matched back by id."""
+        rows = json.dumps([
+            {'id': i, 'transaction': transaction, 'initial_category': category}
+            for i, (transaction, category) in enumerate(batch)
+        ])
+        return f"""
+        For each transaction below, verify or correct its initial category and respond
+        with ONLY a JSON array containing one object per transaction, in any order:
+        {{"id": <id from input>, "category": str, "confidence": float 0-1,
+          "insights": str (purpose and savings opportunities), "budget_impact": str}}
+
+        Transactions: {rows}
+        """
+
     def _create_categorization_prompt(self, transaction: str, category: str) -> str:
         """Create detailed prompt for transaction categorization."""
         return f"""
@@ -259,4 +362,8 @@ class AIFinancialAdvisor:
 
         Transaction: {transaction}
         Initial Category: {category}
+
+        Respond with ONLY a JSON object:
+        {{"category": str, "confidence": float, "insights": str (purpose and savings opportunities),
+          "budget_impact": str}}
         """
\ No newline at end of file
@@ -2,5 +2,6 @@ from .advisor import FinancialAdvisor
 from .transaction_analyzer import TransactionAnalyzer
 from .budget_advisor import BudgetAdvisor
 from .sentiment_analyzer import SentimentAnalyzer
+from .financial_education import FinancialEducation
 
-__all__ = ['FinancialAdvisor', 'TransactionAnalyzer', 'BudgetAdvisor', 'SentimentAnalyzer']
\ No newline at end of file
+__all__ = ['FinancialAdvisor', 'TransactionAnalyzer', 'BudgetAdvisor', 'SentimentAnalyzer', 'FinancialEducation']
@@ -1,4 +1,6 @@
 from ai_services.base import BaseAIService
+from ai_services.schemas import FinancialAdvice, GoalPlan
+from ai_services.prompt_builder import compact_user_data
 from datetime import datetime
 import requests
 import os
@@ -7,13 +9,11 @@ class FinancialAdvisor(BaseAIService):
     def __init__(self):
         super().__init__()
 
-    def generate_financial_advice(self, user_data, current_time, financial_goals):
-            """Generates personalized financial advice based on spending, goals, and current time."""
-
+    def _generate_financial_advice_prompt(self, user_data, current_time, financial_goals):
             prompt = f"""
             You are an expert AI financial advisor, tasked with providing tailored advice to users. The current time is: {current_time}.
 
-            User Data: {user_data}
+            User Data: {compact_user_data(user_data)}
             
             Financial Goals: {financial_goals}
 
@@ -41,17 +41,23 @@ class FinancialAdvisor(BaseAIService):
 
              """
 
-            response = self.generate_text(prompt)
+            return prompt
 
-            return response
+    def generate_financial_advice(self, user_data, current_time, financial_goals):
+        """Generates personalized financial advice based on spending, goals, and current time."""
+        return self.generate_structured(self._generate_financial_advice_prompt(user_data, current_time, financial_goals), FinancialAdvice)
 
-    def create_goal_plan(self, user_data, financial_goal):
-            """Creates a goal plan based on the user's current financial situation and goal."""
+    async def generate_financial_advice_async(self, user_data, current_time, financial_goals, timeout=None):
+        return await self.generate_structured_async(self._generate_financial_advice_prompt(user_data, current_time, financial_goals), FinancialAdvice, timeout=timeout)
 
+    def generate_financial_advice_stream(self, user_data, current_time, financial_goals):
+        return self.generate_text_stream(self._generate_financial_advice_prompt(user_data, current_time, financial_goals), schema=FinancialAdvice)
+
+    def _create_goal_plan_prompt(self, user_data, financial_goal):
             prompt = f"""
                 You are an expert AI financial advisor tasked with creating a personalized financial plan for users.
 
-                User Data: {user_data}
+                User Data: {compact_user_data(user_data)}
                 Financial Goal: {financial_goal}
 
                 Based on the user's data and their financial goal, create a detailed financial plan for the user.
@@ -73,9 +79,17 @@ class FinancialAdvisor(BaseAIService):
                 }}
              """
 
-            response = self.generate_text(prompt)
+            return prompt
+
+    def create_goal_plan(self, user_data, financial_goal):
+        """Creates a goal plan based on the user's current financial situation and goal."""
+        return self.generate_structured(self._create_goal_plan_prompt(user_data, financial_goal), GoalPlan)
+
+    async def create_goal_plan_async(self, user_data, financial_goal, timeout=None):
+        return await self.generate_structured_async(self._create_goal_plan_prompt(user_data, financial_goal), GoalPlan, timeout=timeout)
 
-            return response
+    def create_goal_plan_stream(self, user_data, financial_goal):
+        return self.generate_text_stream(self._create_goal_plan_prompt(user_data, financial_goal), schema=GoalPlan)
 
 def get_gemini_insights(user_data):
     url = "https://api.google.com/gemini/insights"
@@ -86,4 +100,4 @@ def get_gemini_insights(user_data):
     if response.status_code == 200:
         return response.json()
     else:
-        raise Exception(f"Failed to fetch insights from Google Gemini: {response.status_code} {response.text}")
\ No newline at end of file
+        raise Exception(f"Failed to fetch insights from Google Gemini: {response.status_code} {response.text}")
@@ -1,22 +1,177 @@
-import google.generativeai as genai
+import asyncio
+import json
+import logging
 import os
 from dotenv import load_dotenv
+from ai_services.cache import get_llm_cache
+from ai_services.prompt_builder import record_prompt
+from ai_services.registry import get_generative_model
+from ai_services.structured import REPAIR_RETRIES, extract_json, repair_prompt, validate_response
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Seconds before an async generation call is abandoned.
+AI_CALL_TIMEOUT = float(os.getenv('AI_CALL_TIMEOUT', '30'))
+
+
+def parse_json_response(text, schema=None):
+    """Parsed JSON answer, validated and normalized by ``schema`` if given; None if unusable."""
+    if schema is None:
+        return extract_json(text)
+    result, _ = validate_response(text, schema)
+    return result.model_dump() if result is not None else None
+
+
 class BaseAIService:
+    model_name = 'gemini-pro'
+
     def __init__(self):
         GOOGLE_API_KEY = os.getenv("GOOGLE_GEMINI_API_KEY")
         if not GOOGLE_API_KEY:
             raise ValueError("GOOGLE_GEMINI_API_KEY not found in .env file.")
-        genai.configure(api_key=GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self._model = None
+
+    @property
+    def model(self):
+        """Gemini model shared by every service, created on first use."""
+        if self._model is None:
+            self._model = get_generative_model(self.model_name)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def generate_text(self, prompt, use_cache=True):
+        """Generates text using the Gemini model, serving repeated prompts from the LLM cache."""
+        record_prompt(type(self).__name__, prompt)
+        cache = get_llm_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(self.model_name, prompt)
+            if cached is not None:
+                return cached
+
+        text = self._generate(prompt)
+        if cache is not None and text:
+            cache.set(self.model_name, prompt, text)
+        return text
+
+    def _generate(self, prompt):
+        try:
+            return self.model.generate_content(prompt).text
+        except Exception:
+            logger.exception("Error generating text with Gemini")
+            return None
+
+    async def generate_text_async(self, prompt, use_cache=True, timeout=None):
+        """Async counterpart of generate_text; returns None on error or after ``timeout`` seconds."""
+        record_prompt(type(self).__name__, prompt)
+        cache = get_llm_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(self.model_name, prompt)
+            if cached is not None:
+                return cached
 
-    def generate_text(self, prompt):
-        """Generates text using the Gemini model."""
+        text = await self._generate_async(prompt, timeout)
+        if cache is not None and text:
+            cache.set(self.model_name, prompt, text)
+        return text
+
+    async def _generate_async(self, prompt, timeout=None):
         try:
-            response = self.model.generate_content(prompt)
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt),
+                timeout=timeout or AI_CALL_TIMEOUT
+            )
             return response.text
+        except asyncio.TimeoutError:
+            logger.warning("%s call timed out after %ss", type(self).__name__, timeout or AI_CALL_TIMEOUT)
+            return None
         except Exception as e:
-            print(f"Error generating text with Gemini: {e}")
-            return None
\ No newline at end of file
+            logger.error(f"Error generating text with Gemini: {e}")
+            return None
+
+    def generate_structured(self, prompt, schema, use_cache=True):
+        """Generate, validate against ``schema`` and return the result as a dict, or None.
+
+        A malformed answer gets up to AI_REPAIR_RETRIES repair rounds instead
+        of a full regeneration. Only validated results are cached, stored as
+        canonical JSON so later hits parse without repair.
+        """
+        record_prompt(type(self).__name__, prompt)
+        cache = get_llm_cache() if use_cache else None
+        if cache is not None:
+            result, _ = validate_response(cache.get(self.model_name, prompt), schema)
+            if result is not None:
+                return result.model_dump()
+
+        text = self._generate(prompt)
+        result, error = validate_response(text, schema)
+        for _ in range(REPAIR_RETRIES):
+            if result is not None or not text:
+                break
+            logger.info("%s returned invalid %s (%s); requesting a repair", type(self).__name__, schema.__name__, error)
+            text = self._generate(repair_prompt(text, schema, error))
+            result, error = validate_response(text, schema)
+        return self._store_structured(cache, prompt, schema, result, error)
+
+    async def generate_structured_async(self, prompt, schema, use_cache=True, timeout=None):
+        """Async counterpart of generate_structured."""
+        record_prompt(type(self).__name__, prompt)
+        cache = get_llm_cache() if use_cache else None
+        if cache is not None:
+            result, _ = validate_response(cache.get(self.model_name, prompt), schema)
+            if result is not None:
+                return result.model_dump()
+
+        text = await self._generate_async(prompt, timeout)
+        result, error = validate_response(text, schema)
+        for _ in range(REPAIR_RETRIES):
+            if result is not None or not text:
+                break
+            logger.info("%s returned invalid %s (%s); requesting a repair", type(self).__name__, schema.__name__, error)
+            text = await self._generate_async(repair_prompt(text, schema, error), timeout)
+            result, error = validate_response(text, schema)
+        return self._store_structured(cache, prompt, schema, result, error)
+
+    def _store_structured(self, cache, prompt, schema, result, error):
+        if result is None:
+            logger.warning("%s gave up on %s: %s", type(self).__name__, schema.__name__, error)
+            return None
+        data = result.model_dump()
+        if cache is not None:
+            cache.set(self.model_name, prompt, json.dumps(data))
+        return data
+
+    def generate_text_stream(self, prompt, use_cache=True, schema=None):
+        """Yield the completion as it is generated.
+
+        A cached answer is yielded in one piece. A fresh one is cached only
+        once the assembled text parses (and validates against ``schema``, if
+        given), so a truncated or malformed stream is never served from the
+        cache later.
+        """
+        record_prompt(type(self).__name__, prompt)
+        cache = get_llm_cache() if use_cache else None
+        if cache is not None:
+            cached = cache.get(self.model_name, prompt)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True):
+                text = chunk.text
+                if text:
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            logger.error(f"Error streaming text from Gemini: {e}")
+            return
+
+        text = ''.join(parts)
+        if cache is not None and parse_json_response(text, schema) is not None:
+            cache.set(self.model_name, prompt, text)
@@ -1,17 +1,17 @@
 from ai_services.base import BaseAIService
-from models import Transaction  # Ensure this import is correct based on your project structure
+from ai_services.schemas import BudgetRecommendation, BudgetSpendingAnalysis
+from ai_services.prompt_builder import compact_user_data
 
 
 class BudgetAdvisor(BaseAIService):
     def __init__(self):
         super().__init__()
 
-    def generate_budget_recommendation(self, user_data, current_month):
-          """Generates budget recommendations based on user data and current month."""
+    def _generate_budget_recommendation_prompt(self, user_data, current_month):
           prompt = f"""
             You are an expert AI financial advisor.
 
-            User Data: {user_data}
+            User Data: {compact_user_data(user_data)}
             Current Month: {current_month}
 
             Based on the user's data, and current month, provide detailed and specific budget recommendations.
@@ -38,16 +38,20 @@ class BudgetAdvisor(BaseAIService):
              ]
            }}
             """
-          response = self.generate_text(prompt)
-          return response
+          return prompt
 
-    def analyze_budget_spending(self, user_data, budget_data, current_month):
-            """Analyzes budget and spending data for current month to find if a user is overspending or underspending in a particular category."""
+    def generate_budget_recommendation(self, user_data, current_month):
+        """Generates budget recommendations based on user data and current month."""
+        return self.generate_structured(self._generate_budget_recommendation_prompt(user_data, current_month), BudgetRecommendation)
+
+    async def generate_budget_recommendation_async(self, user_data, current_month, timeout=None):
+        return await self.generate_structured_async(self._generate_budget_recommendation_prompt(user_data, current_month), BudgetRecommendation, timeout=timeout)
 
+    def _analyze_budget_spending_prompt(self, user_data, budget_data, current_month):
             prompt = f"""
             You are an expert AI financial advisor tasked with analyzing a user's budget.
 
-            User Data: {user_data}
+            User Data: {compact_user_data(user_data)}
             Budget Data: {budget_data}
             Current Month: {current_month}
 
@@ -72,8 +76,14 @@ class BudgetAdvisor(BaseAIService):
              ]
            }}
             """
-            response = self.generate_text(prompt)
-            return response
+            return prompt
+
+    def analyze_budget_spending(self, user_data, budget_data, current_month):
+        """Analyzes budget and spending data for current month to find if a user is overspending or underspending in a particular category."""
+        return self.generate_structured(self._analyze_budget_spending_prompt(user_data, budget_data, current_month), BudgetSpendingAnalysis)
+
+    async def analyze_budget_spending_async(self, user_data, budget_data, current_month, timeout=None):
+        return await self.generate_structured_async(self._analyze_budget_spending_prompt(user_data, budget_data, current_month), BudgetSpendingAnalysis, timeout=timeout)
 
     def suggest_budget_adjustments(self, current_budgets, spending_data):
         suggestions = []
@@ -104,11 +114,8 @@ def fetch_user_budgets(user_id):
     ]
 
 def fetch_user_spending_data(user_id):
-    # Example implementation: Calculate spending from transactions
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    spending_data = {}
-    for transaction in transactions:
-        if transaction.amount > 0:  # Only consider expenses
-            category = transaction.category or 'Uncategorized'
-            spending_data[category] = spending_data.get(category, 0) + transaction.amount
-    return spending_data
\ No newline at end of file
+    """Expense totals per category (positive amounts are expenses)."""
+    # Imported here so loading the app does not load numpy.
+    from transaction_frame import TransactionFrame
+
+    return TransactionFrame.for_user(user_id).expenses().category_totals()
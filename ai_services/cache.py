@@ -0,0 +1,200 @@
+"""
+Content-addressed cache for LLM completions.
+
+Entries are keyed on a SHA-256 of the model name and the whitespace-normalized
+prompt, so the same question asked by any service, user or worker maps to the
+same entry. Lookups go to an in-process LRU first and then to a SQLite file
+shared by every process on the host; SQLite hits are promoted into the LRU.
+
+Tuning: AI_CACHE_TTL (seconds), AI_CACHE_MEMORY_ENTRIES, AI_CACHE_MAX_ROWS and
+AI_CACHE_PATH. Set AI_CACHE_PATH to an empty string to disable the disk tier.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = int(os.getenv('AI_CACHE_TTL', str(7 * 24 * 3600)))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv('AI_CACHE_MEMORY_ENTRIES', '4096'))
+DEFAULT_MAX_ROWS = int(os.getenv('AI_CACHE_MAX_ROWS', '100000'))
+DEFAULT_PATH = os.getenv('AI_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'wealthai_llm_cache.sqlite3'))
+
+# Expired and overflow rows are pruned once every this many writes.
+_PRUNE_EVERY = 500
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def cache_key(model_name: str, prompt: str) -> str:
+    """Hash of the model and the prompt with runs of whitespace collapsed."""
+    normalized = _WHITESPACE.sub(' ', prompt).strip()
+    return hashlib.sha256(f"{model_name}\x00{normalized}".encode('utf-8')).hexdigest()
+
+
+class _MemoryTier:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _SQLiteTier:
+    def __init__(self, path: str, max_rows: int):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS llm_cache ('
+            ' key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL,'
+            ' created_at REAL NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at >= ?',
+                (key, time.time())
+            ).fetchone()
+        return row
+
+    def set(self, key: str, model_name: str, value: str, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, model, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (key, model_name, value, time.time(), expires_at)
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self):
+        self._conn.execute('DELETE FROM llm_cache WHERE expires_at < ?', (time.time(),))
+        self._conn.execute(
+            'DELETE FROM llm_cache WHERE key IN ('
+            ' SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_rows,)
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+
+
+class LLMCache:
+    """Two-tier prompt cache with hit/miss counters."""
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, ttl: int = DEFAULT_TTL,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES, max_rows: int = DEFAULT_MAX_ROWS):
+        self.ttl = ttl
+        self.memory = _MemoryTier(memory_entries)
+        self.disk = None
+        if path:
+            try:
+                self.disk = _SQLiteTier(path, max_rows)
+            except sqlite3.Error as e:
+                logger.warning("LLM disk cache unavailable at %s: %s", path, e)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, prompt: str) -> Optional[str]:
+        key = cache_key(model_name, prompt)
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return value
+
+        if self.disk is not None:
+            try:
+                row = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning("LLM disk cache read failed: %s", e)
+                row = None
+            if row is not None:
+                value, expires_at = row
+                self.memory.set(key, value, expires_at)
+                self._count('disk_hits')
+                return value
+
+        self._count('misses')
+        return None
+
+    def set(self, model_name: str, prompt: str, value: str, ttl: Optional[int] = None):
+        key = cache_key(model_name, prompt)
+        expires_at = time.time() + (ttl or self.ttl)
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, model_name, value, expires_at)
+            except sqlite3.Error as e:
+                logger.warning("LLM disk cache write failed: %s", e)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            'memory_entries': len(self.memory),
+            'disk_entries': len(self.disk) if self.disk is not None else 0,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': hits / total if total else 0.0
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_pid: Optional[int] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide cache, opened lazily so forked workers get their own SQLite handle."""
+    global _cache, _cache_pid
+    pid = os.getpid()
+    if _cache is None or _cache_pid != pid:
+        with _cache_lock:
+            if _cache is None or _cache_pid != pid:
+                _cache = LLMCache()
+                _cache_pid = pid
+    return _cache
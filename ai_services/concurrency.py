@@ -0,0 +1,67 @@
+"""
+Concurrent fan-out of async AI service calls from synchronous Flask views.
+
+Coroutines run on one long-lived event loop in a daemon thread. The Gemini
+SDK binds its async gRPC channel to the loop that first used it, so a fresh
+``asyncio.run`` per request would break on the second one. A view calls
+:func:`run_concurrently` with named coroutines and gets back their results
+after max(latency) instead of sum(latency). AI_MAX_CONCURRENCY bounds how
+many calls one fan-out has in flight.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', '8'))
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop thread, restarted in forked workers."""
+    global _loop, _loop_pid
+    pid = os.getpid()
+    if _loop is None or _loop_pid != pid:
+        with _loop_lock:
+            if _loop is None or _loop_pid != pid:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ai-event-loop', daemon=True).start()
+                _loop, _loop_pid = loop, pid
+    return _loop
+
+
+async def gather_limited(*aws: Awaitable, limit: int = MAX_CONCURRENCY,
+                         return_exceptions: bool = True) -> List[Any]:
+    """``asyncio.gather`` with at most ``limit`` awaitables running at once."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(bounded(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+def run_coroutine(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+
+def run_concurrently(calls: Dict[str, Awaitable], limit: int = MAX_CONCURRENCY) -> Dict[str, Any]:
+    """Await named coroutines together; a call that raised maps to None."""
+    names = list(calls)
+    results = run_coroutine(gather_limited(*calls.values(), limit=limit))
+    output = {}
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            logger.error("AI call %s failed: %s", name, result)
+            result = None
+        output[name] = result
+    return output
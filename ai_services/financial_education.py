@@ -1,15 +1,16 @@
 from ai_services.base import BaseAIService
+from ai_services.schemas import FinancialLesson
+from ai_services.prompt_builder import compact_user_data
 
 
 class FinancialEducation(BaseAIService):
     def __init__(self):
         super().__init__()
 
-    def generate_personalized_lesson(self, user_data):
-      """Generates a personalized financial lesson based on user data."""
+    def _generate_personalized_lesson_prompt(self, user_data):
       prompt = f"""
         You are an expert AI financial educator.
-        User Data: {user_data}
+        User Data: {compact_user_data(user_data)}
 
         Based on the user data, determine what financial concepts the user needs to learn about. Provide a short summary of the concepts they need to learn, and provide one specific actionable tip.
 
@@ -19,5 +20,11 @@ class FinancialEducation(BaseAIService):
           "lesson_tip": "Actionable tip for the user"
          }}
         """
-      response = self.generate_text(prompt)
-      return response
\ No newline at end of file
+      return prompt
+
+    def generate_personalized_lesson(self, user_data):
+        """Generates a personalized financial lesson based on user data."""
+        return self.generate_structured(self._generate_personalized_lesson_prompt(user_data), FinancialLesson)
+
+    async def generate_personalized_lesson_async(self, user_data, timeout=None):
+        return await self.generate_structured_async(self._generate_personalized_lesson_prompt(user_data), FinancialLesson, timeout=timeout)
@@ -0,0 +1,162 @@
+"""
+Compact, token-budgeted rendering of user data for prompts.
+
+Service prompts used to interpolate ``user_data`` verbatim, so a user with a
+few years of history sent thousands of ``to_dict()`` rows per call.
+:func:`compact_user_data` replaces any list of transactions inside
+``user_data`` with a summary: totals, per-month and per-category aggregates,
+top merchants and the largest expenses. If the rendered JSON is still over
+AI_PROMPT_TOKEN_BUDGET, the summary is regenerated at progressively coarser
+levels, and as a last resort the text is cut off.
+
+Every prompt sent through :class:`BaseAIService` is measured with
+:func:`record_prompt`. Per-service counts are available from
+:func:`prompt_stats`.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Approximate tokens allowed for the data section of a prompt.
+PROMPT_TOKEN_BUDGET = int(os.getenv('AI_PROMPT_TOKEN_BUDGET', '1500'))
+
+# (top merchants, months, categories, largest expenses), from most to least detailed.
+_DETAIL_LEVELS = [
+    (10, 24, 15, 5),
+    (5, 12, 10, 3),
+    (3, 6, 6, 0),
+    (0, 3, 4, 0),
+]
+
+_TRUNCATED = ' ...[truncated]'
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and JSON)."""
+    return (len(text) + 3) // 4
+
+
+def _is_transaction_list(value: Any) -> bool:
+    return (isinstance(value, list) and bool(value) and isinstance(value[0], dict)
+            and 'amount' in value[0] and 'date' in value[0])
+
+
+def summarize_transactions(transactions: List[Dict[str, Any]], top_merchants: int = 10, max_months: int = 24,
+                           max_categories: int = 15, largest: int = 5) -> Dict[str, Any]:
+    """Aggregate ``Transaction.to_dict()`` rows. Positive amounts are expenses."""
+    months = defaultdict(lambda: {'expenses': 0.0, 'income': 0.0})
+    categories = defaultdict(lambda: {'total': 0.0, 'count': 0})
+    merchants = defaultdict(lambda: {'total': 0.0, 'count': 0})
+    income = expenses = 0.0
+    dates = []
+
+    for tx in transactions:
+        amount = float(tx.get('amount') or 0)
+        month = str(tx.get('date') or '')[:7]
+        if month:
+            dates.append(str(tx['date'])[:10])
+        if amount < 0:
+            income -= amount
+            months[month]['income'] -= amount
+            continue
+        expenses += amount
+        months[month]['expenses'] += amount
+        category = categories[tx.get('category') or 'Uncategorized']
+        category['total'] += amount
+        category['count'] += 1
+        merchant = merchants[tx.get('merchant_name') or tx.get('name') or 'Unknown']
+        merchant['total'] += amount
+        merchant['count'] += 1
+
+    ranked_categories = sorted(categories.items(), key=lambda item: -item[1]['total'])
+    summary = {
+        'period': {'from': min(dates), 'to': max(dates)} if dates else None,
+        'transaction_count': len(transactions),
+        'total_income': round(income, 2),
+        'total_expenses': round(expenses, 2),
+        'monthly': {
+            month: {k: round(v, 2) for k, v in totals.items()}
+            for month, totals in sorted(months.items())[-max_months:]
+        },
+        'categories': {
+            name: {'total': round(data['total'], 2), 'count': data['count'],
+                   'average': round(data['total'] / data['count'], 2)}
+            for name, data in ranked_categories[:max_categories]
+        },
+    }
+    other = ranked_categories[max_categories:]
+    if other:
+        summary['categories']['Other'] = {
+            'total': round(sum(data['total'] for _, data in other), 2),
+            'count': sum(data['count'] for _, data in other),
+            'categories': len(other),
+        }
+    if top_merchants:
+        summary['top_merchants'] = [
+            {'merchant': name, 'total': round(data['total'], 2), 'count': data['count']}
+            for name, data in sorted(merchants.items(), key=lambda item: -item[1]['total'])[:top_merchants]
+        ]
+    if largest:
+        summary['largest_expenses'] = [
+            {'name': tx.get('name'), 'amount': round(float(tx['amount']), 2), 'date': str(tx.get('date'))[:10],
+             'category': tx.get('category')}
+            for tx in sorted((t for t in transactions if float(t.get('amount') or 0) > 0),
+                             key=lambda t: -float(t['amount']))[:largest]
+        ]
+    return summary
+
+
+def _compact(value: Any, level) -> Any:
+    if _is_transaction_list(value):
+        return summarize_transactions(value, *level)
+    if isinstance(value, dict):
+        return {key: _compact(item, level) for key, item in value.items()}
+    return value
+
+
+def _render(value: Any) -> str:
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def compact_user_data(user_data: Any, token_budget: int = None) -> str:
+    """Render ``user_data`` as compact JSON within ``token_budget`` tokens."""
+    budget = token_budget or PROMPT_TOKEN_BUDGET
+    text = ''
+    for level in _DETAIL_LEVELS:
+        text = _render(_compact(user_data, level))
+        if estimate_tokens(text) <= budget:
+            return text
+
+    logger.warning("User data is %d tokens at the coarsest summary level; truncating to %d",
+                   estimate_tokens(text), budget)
+    return text[:max(0, budget * 4 - len(_TRUNCATED))] + _TRUNCATED
+
+
+_stats = defaultdict(lambda: {'calls': 0, 'total_tokens': 0, 'max_tokens': 0})
+_stats_lock = threading.Lock()
+
+
+def record_prompt(service: str, prompt: str) -> int:
+    """Log and tally the estimated size of a prompt; returns its token estimate."""
+    tokens = estimate_tokens(prompt)
+    with _stats_lock:
+        stats = _stats[service]
+        stats['calls'] += 1
+        stats['total_tokens'] += tokens
+        stats['max_tokens'] = max(stats['max_tokens'], tokens)
+    logger.info("%s prompt: %d chars, ~%d tokens", service, len(prompt), tokens)
+    return tokens
+
+
+def prompt_stats() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        return {
+            service: {**stats, 'average_tokens': stats['total_tokens'] / stats['calls']}
+            for service, stats in _stats.items()
+        }
@@ -0,0 +1,66 @@
+"""
+Lazily created, process-wide AI clients and services.
+
+``google.generativeai`` and ``openai`` are imported and configured only when
+a service is first used, not when the web app is imported. After that every
+service shares one ``GenerativeModel`` per model name. Services are stateless
+apart from their model handle, so one instance per class serves all
+requests. A forked worker rebuilds its own clients on first use.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Type, TypeVar
+
+T = TypeVar('T')
+
+_lock = threading.RLock()
+_pid: Optional[int] = None
+_models: Dict[str, object] = {}
+_services: Dict[type, object] = {}
+_spending_advisor = None
+
+
+def _reset_after_fork():
+    global _pid, _spending_advisor
+    pid = os.getpid()
+    if _pid != pid:
+        _models.clear()
+        _services.clear()
+        _spending_advisor = None
+        _pid = pid
+
+
+def get_generative_model(model_name: str):
+    """Shared Gemini model, configuring the SDK on first use."""
+    with _lock:
+        _reset_after_fork()
+        model = _models.get(model_name)
+        if model is None:
+            import google.generativeai as genai
+
+            if not _models:
+                genai.configure(api_key=os.getenv("GOOGLE_GEMINI_API_KEY"))
+            model = _models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+
+def get_service(service_cls: Type[T]) -> T:
+    """The process-wide instance of a BaseAIService subclass."""
+    with _lock:
+        _reset_after_fork()
+        service = _services.get(service_cls)
+        if service is None:
+            service = _services[service_cls] = service_cls()
+        return service
+
+
+def get_spending_advisor():
+    """The process-wide OpenAI-backed ``AIFinancialAdvisor``."""
+    global _spending_advisor
+    with _lock:
+        _reset_after_fork()
+        if _spending_advisor is None:
+            from ai_integration import AIFinancialAdvisor
+            _spending_advisor = AIFinancialAdvisor()
+        return _spending_advisor
@@ -0,0 +1,74 @@
+"""Response models for the JSON each AI service method asks Gemini for."""
+
+from typing import List, Union
+
+from pydantic import BaseModel
+
+
+class AdviceItem(BaseModel):
+    title: str
+    recommendation: str
+    actionable_item: str
+
+
+class FinancialAdvice(BaseModel):
+    advice_summary: str
+    advice: List[AdviceItem]
+
+
+class GoalPlanStep(BaseModel):
+    step: str
+    actionable_item: str
+
+
+class GoalPlan(BaseModel):
+    plan_summary: str
+    plan_steps: List[GoalPlanStep]
+
+
+class SpendingInsight(BaseModel):
+    pattern: str
+    recommendation: str
+
+
+class SpendingPatternAnalysis(BaseModel):
+    analysis_summary: str
+    spending_insights: List[SpendingInsight]
+
+
+class CategorySpendingAnalysis(BaseModel):
+    analysis_summary: str
+    recommendation: str
+    reasoning: str
+
+
+class BudgetCategoryRecommendation(BaseModel):
+    category: str
+    recommended_amount: Union[float, str]
+    reasoning: str
+
+
+class BudgetRecommendation(BaseModel):
+    budget_recommendation_summary: str
+    budget_categories: List[BudgetCategoryRecommendation]
+
+
+class BudgetCategoryStatus(BaseModel):
+    category: str
+    status: str
+    reason: str
+
+
+class BudgetSpendingAnalysis(BaseModel):
+    analysis_summary: str
+    recommendations: List[BudgetCategoryStatus]
+
+
+class FinancialLesson(BaseModel):
+    lesson_summary: str
+    lesson_tip: str
+
+
+class SentimentAnalysis(BaseModel):
+    sentiment: str
+    confidence_score: float
@@ -1,13 +1,12 @@
 from ai_services.base import BaseAIService
+from ai_services.schemas import SentimentAnalysis
 
 
 class SentimentAnalyzer(BaseAIService):
     def __init__(self):
         super().__init__()
 
-    def analyze_transaction_sentiment(self, transaction_description):
-        """Analyzes the sentiment of a transaction description."""
-
+    def _analyze_transaction_sentiment_prompt(self, transaction_description):
         prompt = f"""
         You are an expert sentiment analyzer.
 
@@ -22,5 +21,11 @@ class SentimentAnalyzer(BaseAIService):
           "confidence_score": "score from 0 to 1"
          }}
         """
-        response = self.generate_text(prompt)
-        return response
\ No newline at end of file
+        return prompt
+
+    def analyze_transaction_sentiment(self, transaction_description):
+        """Analyzes the sentiment of a transaction description."""
+        return self.generate_structured(self._analyze_transaction_sentiment_prompt(transaction_description), SentimentAnalysis)
+
+    async def analyze_transaction_sentiment_async(self, transaction_description, timeout=None):
+        return await self.generate_structured_async(self._analyze_transaction_sentiment_prompt(transaction_description), SentimentAnalysis, timeout=timeout)
@@ -0,0 +1,95 @@
+"""
+Tolerant JSON extraction, schema validation and repair prompts for LLM output.
+
+Models asked for JSON often wrap it in a Markdown fence, add a sentence
+before or after it, or leave a trailing comma. :func:`extract_json` recovers
+the value in those cases. :func:`validate_response` checks it against a
+pydantic model. When that fails, :func:`repair_prompt` asks the model to fix
+its own answer. That is a much smaller request than regenerating it from the
+original prompt. AI_REPAIR_RETRIES bounds how many repair rounds a call
+may spend.
+"""
+
+import json
+import os
+import re
+from typing import Any, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+REPAIR_RETRIES = int(os.getenv('AI_REPAIR_RETRIES', '1'))
+
+_CODE_FENCE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+
+def _first_json_value(text: str) -> Optional[str]:
+    """The first balanced {...} or [...] span, skipping brackets inside strings."""
+    start = next((i for i, ch in enumerate(text) if ch in '{['), None)
+    if start is None:
+        return None
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def extract_json(text: Optional[str]) -> Any:
+    """Best-effort parse of a model's JSON answer; None if nothing parses."""
+    if not text:
+        return None
+    fenced = _CODE_FENCE.search(text)
+    candidates = [fenced.group(1)] if fenced else []
+    candidates.append(text)
+
+    for candidate in candidates:
+        candidate = candidate.strip().translate(_SMART_QUOTES)
+        span = _first_json_value(candidate)
+        for attempt in (candidate, span, _TRAILING_COMMA.sub(r'\1', span or '')):
+            if not attempt:
+                continue
+            try:
+                return json.loads(attempt)
+            except ValueError:
+                continue
+    return None
+
+
+def validate_response(text: Optional[str], schema: Type[BaseModel]) -> Tuple[Optional[BaseModel], Optional[str]]:
+    """Parse and validate ``text``; returns (instance, None) or (None, reason)."""
+    data = extract_json(text)
+    if data is None:
+        return None, 'response is not valid JSON'
+    try:
+        return schema.model_validate(data), None
+    except ValidationError as e:
+        return None, str(e)
+
+
+def repair_prompt(text: str, schema: Type[BaseModel], error: str) -> str:
+    """Ask the model to correct its previous answer rather than start over."""
+    return f"""
+    Your previous answer could not be used: {error}
+
+    Previous answer:
+    {text}
+
+    Return ONLY corrected JSON, with no commentary, that matches this JSON schema:
+    {json.dumps(schema.model_json_schema())}
+    """
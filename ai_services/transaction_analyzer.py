@@ -1,16 +1,16 @@
 from ai_services.base import BaseAIService
+from ai_services.schemas import CategorySpendingAnalysis, SpendingPatternAnalysis
+from ai_services.prompt_builder import compact_user_data
 
 
 class TransactionAnalyzer(BaseAIService):
     def __init__(self):
         super().__init__()
 
-    def analyze_spending_patterns(self, user_data, current_month):
-            """Analyzes spending patterns to identify potential areas for savings and better budgeting"""
-
+    def _analyze_spending_patterns_prompt(self, user_data, current_month):
             prompt = f"""
             You are an expert AI financial advisor tasked with analyzing a user's spending habits.
-            User Data: {user_data}
+            User Data: {compact_user_data(user_data)}
             Current Month: {current_month}
 
              Based on the user's spending history, identify any spending patterns or trends.
@@ -32,15 +32,20 @@ class TransactionAnalyzer(BaseAIService):
             }}
 
            """
-            response = self.generate_text(prompt)
-            return response
+            return prompt
 
-    def analyze_category_spending(self, user_data, category, current_month):
-          """Analyzes spending in a specific category, and provides concrete suggestions."""
+    def analyze_spending_patterns(self, user_data, current_month):
+        """Analyzes spending patterns to identify potential areas for savings and better budgeting"""
+        return self.generate_structured(self._analyze_spending_patterns_prompt(user_data, current_month), SpendingPatternAnalysis)
+
+    async def analyze_spending_patterns_async(self, user_data, current_month, timeout=None):
+        return await self.generate_structured_async(self._analyze_spending_patterns_prompt(user_data, current_month), SpendingPatternAnalysis, timeout=timeout)
+
+    def _analyze_category_spending_prompt(self, user_data, category, current_month):
           prompt = f"""
           You are an expert AI financial advisor tasked with analyzing a user's spending habits.
 
-           User Data: {user_data}
+           User Data: {compact_user_data(user_data)}
            Current Month: {current_month}
            Category: {category}
 
@@ -53,5 +58,11 @@ class TransactionAnalyzer(BaseAIService):
              "reasoning": "The reason behind this recommendation",
             }}
            """
-          response = self.generate_text(prompt)
-          return response
\ No newline at end of file
+          return prompt
+
+    def analyze_category_spending(self, user_data, category, current_month):
+        """Analyzes spending in a specific category, and provides concrete suggestions."""
+        return self.generate_structured(self._analyze_category_spending_prompt(user_data, category, current_month), CategorySpendingAnalysis)
+
+    async def analyze_category_spending_async(self, user_data, category, current_month, timeout=None):
+        return await self.generate_structured_async(self._analyze_category_spending_prompt(user_data, category, current_month), CategorySpendingAnalysis, timeout=timeout)
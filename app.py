@@ -6,16 +6,29 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_login import LoginManager, login_required, current_user
 from dotenv import load_dotenv
-from models import Transaction, User, db
+from models import Budget, MonthlyCategoryRollup, SavingsGoal, Transaction, User, db
 from routes.plaid_routes import plaid_bp
 from routes.auth_routes import auth_bp
 from routes.transactions_routes import transaction_bp
-from plaid_integration import fetch_transactions
-from ai_services import FinancialAdvisor, TransactionAnalyzer, BudgetAdvisor, SentimentAnalyzer
+from plaid_integration import fetch_transaction_updates
+from transaction_ingest import apply_transaction_updates
+from dashboard_aggregates import aggregate_transactions
+from monthly_rollup import ensure_rollup
+from recurring_charges import load_recurring
+from transaction_rows import transaction_dicts
+from response_cache import cached_response, response_cache
+from ai_services.cache import get_llm_cache
+from ai_services.prompt_builder import prompt_stats
+from ai_services import FinancialAdvisor, TransactionAnalyzer, BudgetAdvisor, SentimentAnalyzer, FinancialEducation
+from ai_services.base import parse_json_response
+from ai_services.schemas import FinancialAdvice, GoalPlan
+from ai_services.concurrency import run_concurrently
+from ai_services.registry import get_service, get_spending_advisor
+from sse import sse_response
 from routes.budget_routes import budget_bp
 from routes.savings_routes import savings_bp
 from flask_jwt_extended import JWTManager
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, func, text
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Dict, Any, Optional, Tuple
 from decimal import Decimal
@@ -73,12 +86,6 @@ migrate = Migrate(app, db)
 login_manager = LoginManager(app)
 login_manager.login_view = 'auth.login'
 
-# Initialize AI Services
-ai_advisor = FinancialAdvisor()
-transaction_analyzer = TransactionAnalyzer()
-budget_advisor = BudgetAdvisor()
-sentiment_analyzer = SentimentAnalyzer()
-
 # Add CORS configuration
 CORS(app,
      resources={r"/api/*": {"origins": ["http://localhost:3000"]}},
@@ -109,22 +116,21 @@ def sync_transactions():
         if not current_user.plaid_access_token:
             return jsonify({'error': 'No bank account connected'}), 400
 
-        transactions = fetch_transactions(current_user.plaid_access_token)
-        new_transactions = []
-
-        for transaction in transactions:
-            if not Transaction.query.filter_by(transaction_id=transaction['transaction_id']).first():
-                new_transaction = Transaction(
-                    user_id=current_user.id,
-                    **transaction
-                )
-                db.session.add(new_transaction)
-                new_transactions.append(new_transaction)
+        updates = fetch_transaction_updates(
+            current_user.plaid_access_token,
+            current_user.plaid_transactions_cursor
+        )
+        result = apply_transaction_updates(current_user.id, updates)
+        current_user.plaid_transactions_cursor = updates['next_cursor']
 
         db.session.commit()
         return jsonify({
             'message': 'Transactions synced successfully',
-            'new_transactions': len(new_transactions)
+            'new_transactions': result.inserted,
+            'updated_transactions': result.updated,
+            'unchanged_transactions': result.unchanged,
+            'conflicting_transactions': result.conflicts,
+            'removed_transactions': result.removed
         }), 200
 
     except Exception as e:
@@ -134,19 +140,19 @@ def sync_transactions():
 
 @app.route('/api/ai_advice', methods=['GET'])
 @login_required
+@cached_response('ai_advice')
 def get_ai_advice():
     try:
         start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-        transactions = Transaction.query.filter_by(user_id=current_user.id)\
-            .filter(Transaction.date >= start_date)\
-            .all()
+        transaction_data = transaction_dicts(
+            Transaction.query.filter_by(user_id=current_user.id).filter(Transaction.date >= start_date)
+        )
 
-        if not transactions:
+        if not transaction_data:
             return jsonify({'advice': 'No transactions to analyze.'}), 200
 
-        transaction_data = [t.to_dict() for t in transactions]
-        analysis = transaction_analyzer.analyze_spending_patterns(transaction_data)
-        advice = ai_advisor.get_financial_advice(analysis)
+        analysis = get_service(TransactionAnalyzer).analyze_spending_patterns(transaction_data)
+        advice = get_service(FinancialAdvisor).get_financial_advice(analysis)
 
         return jsonify({
             'advice': advice,
@@ -157,6 +163,128 @@ def get_ai_advice():
         logger.error(f"Error generating AI advice: {e}")
         return jsonify({'error': 'Failed to generate AI advice'}), 500
 
+def _ai_user_context(user_id: int, aggregates) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]]:
+    """Spending summary, budget status and savings goals passed to the AI services."""
+    user_data = {
+        'total_income': round(aggregates.total_income, 2),
+        'total_expenses': round(aggregates.total_expenses, 2),
+        'month_income': round(aggregates.month_income, 2),
+        'month_expenses': round(aggregates.month_expenses, 2),
+        'category_totals': {k: round(v, 2) for k, v in aggregates.category_totals.items()},
+    }
+    budget_data = {
+        budget.category: {
+            'limit': budget.budget_limit,
+            'spent': round(aggregates.month_to_date_categories.get(budget.category, 0), 2)
+        }
+        for budget in Budget.query.filter_by(user_id=user_id)
+    }
+    goals = [
+        {'name': goal.goal_name, 'target': goal.target_amount, 'saved': goal.current_amount,
+         'due': goal.due_date.strftime('%Y-%m-%d') if goal.due_date else None}
+        for goal in SavingsGoal.query.filter_by(user_id=user_id)
+    ]
+    return user_data, budget_data, goals
+
+@app.route('/api/ai/overview', methods=['GET'])
+@login_required
+@cached_response('ai_overview')
+def get_ai_overview():
+    """Advice, budget analysis and a lesson, generated concurrently."""
+    try:
+        aggregates = aggregate_transactions(current_user.id)
+        if not aggregates.transaction_count:
+            return jsonify({'message': 'No transactions to analyze.'}), 200
+
+        now = datetime.now()
+        user_data, budget_data, goals = _ai_user_context(current_user.id, aggregates)
+        results = run_concurrently({
+            'advice': get_service(FinancialAdvisor).generate_financial_advice_async(user_data, now.isoformat(), goals),
+            'budget_analysis': get_service(BudgetAdvisor).analyze_budget_spending_async(user_data, budget_data, now.strftime('%Y-%m')),
+            'lesson': get_service(FinancialEducation).generate_personalized_lesson_async(user_data),
+        })
+        response = jsonify({**results, 'timestamp': now.isoformat()})
+        if any(value is None for value in results.values()):
+            # A call failed or timed out: serve what we have, but don't cache it until data_version changes.
+            response.cache_control.no_store = True
+        return response, 200
+    except Exception as e:
+        logger.error(f"Error generating AI overview: {e}")
+        return jsonify({'error': 'Failed to generate AI overview'}), 500
+
+def _json_result(key: str, schema):
+    """SSE finalizer: wrap the validated answer under ``key``; None if it does not validate."""
+    def finalize(text):
+        parsed = parse_json_response(text, schema)
+        if parsed is None:
+            return None
+        return {key: parsed, 'timestamp': datetime.now().isoformat()}
+    return finalize
+
+@app.route('/api/ai_advice/stream', methods=['GET'])
+@login_required
+def stream_ai_advice():
+    """Financial advice as server-sent events; the final event carries the parsed JSON."""
+    try:
+        aggregates = aggregate_transactions(current_user.id)
+        if not aggregates.transaction_count:
+            return jsonify({'message': 'No transactions to analyze.'}), 200
+
+        user_data, _, goals = _ai_user_context(current_user.id, aggregates)
+        chunks = get_service(FinancialAdvisor).generate_financial_advice_stream(user_data, datetime.now().isoformat(), goals)
+        return sse_response(chunks, _json_result('advice', FinancialAdvice))
+    except Exception as e:
+        logger.error(f"Error streaming AI advice: {e}")
+        return jsonify({'error': 'Failed to generate AI advice'}), 500
+
+@app.route('/api/goal_plan/stream', methods=['POST'])
+@login_required
+def stream_goal_plan():
+    """Plan for a financial goal as server-sent events."""
+    try:
+        goal = (request.get_json(silent=True) or {}).get('goal')
+        if not goal:
+            return jsonify({'error': 'Goal is required'}), 400
+
+        user_data, _, _ = _ai_user_context(current_user.id, aggregate_transactions(current_user.id))
+        chunks = get_service(FinancialAdvisor).create_goal_plan_stream(user_data, goal)
+        return sse_response(chunks, _json_result('plan', GoalPlan))
+    except Exception as e:
+        logger.error(f"Error streaming goal plan: {e}")
+        return jsonify({'error': 'Failed to create goal plan'}), 500
+
+@app.route('/api/analyze-spending/stream', methods=['POST'])
+@login_required
+def stream_spending_analysis():
+    """GPT-4 spending analysis as server-sent events; metrics arrive with the final event."""
+    try:
+        transactions = (request.get_json(silent=True) or {}).get('transactions', [])
+        spending_advisor = get_spending_advisor()
+        metrics = spending_advisor.spending_metrics(transactions)
+        chunks = spending_advisor.analyze_spending_patterns_stream(metrics)
+        return sse_response(chunks, lambda text: {
+            'analysis': text, **metrics, 'timestamp': datetime.now().isoformat()
+        } if text else None)
+    except Exception as e:
+        logger.error(f"Error streaming spending analysis: {e}")
+        return jsonify({'error': 'Failed to analyze spending'}), 500
+
+@app.route('/api/recurring_charges', methods=['GET'])
+@login_required
+@cached_response('recurring_charges')
+def get_recurring_charges():
+    """Stored subscriptions and bills; ``?all=true`` includes lapsed ones."""
+    try:
+        include_lapsed = request.args.get('all', 'false').lower() == 'true'
+        charges = load_recurring(current_user.id, active_only=not include_lapsed)
+        return jsonify({
+            'recurring_charges': charges,
+            'monthly_total': round(sum(c['monthly_cost'] for c in charges if c['active']), 2)
+        }), 200
+    except Exception as e:
+        logger.error(f"Error loading recurring charges: {e}")
+        return jsonify({'error': 'Failed to load recurring charges'}), 500
+
 @app.route('/api/analyze_sentiment', methods=['POST'])
 @login_required
 def analyze_sentiment():
@@ -165,7 +293,7 @@ def analyze_sentiment():
         if not description:
             return jsonify({'error': 'No description provided'}), 400
         
-        sentiment = sentiment_analyzer.analyze_transaction_sentiment(description)
+        sentiment = get_service(SentimentAnalyzer).analyze_transaction_sentiment(description)
         return jsonify(sentiment), 200
     except Exception as e:
         logger.error(f"Error analyzing sentiment: {e}")
@@ -173,18 +301,17 @@ def analyze_sentiment():
 
 @app.route('/api/budget_recommendations', methods=['GET'])
 @login_required
+@cached_response('budget_recommendations')
 def get_budget_recommendations():
     try:
-        transactions = Transaction.query.filter_by(user_id=current_user.id)\
-            .order_by(Transaction.date.desc())\
-            .limit(100)\
-            .all()
+        spending_history = transaction_dicts(
+            Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).limit(100)
+        )
         
-        if not transactions:
+        if not spending_history:
             return jsonify({'recommendations': 'No transaction history available'}), 200
             
-        spending_history = [t.to_dict() for t in transactions]
-        recommendations = budget_advisor.get_budget_recommendations(spending_history)
+        recommendations = get_service(BudgetAdvisor).get_budget_recommendations(spending_history)
         
         return jsonify({'recommendations': recommendations}), 200
     except Exception as e:
@@ -204,7 +331,7 @@ def get_category_color(category):
     }
     return colors.get(category, '#8c8c8c')
 
-def get_budget_progress(user_id):
+def get_budget_progress(aggregates):
     """Get budget progress for each category."""
     try:
         # Get user's budget limits (you'll need to implement budget storage)
@@ -215,20 +342,9 @@ def get_budget_progress(user_id):
             'Entertainment': 150
         }
         
-        # Get current month's transactions
-        current_month = datetime.now().replace(day=1)
-        transactions = Transaction.query.filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= current_month
-        ).all()
-        
-        # Calculate spending by category
-        category_spending = {}
-        for transaction in transactions:
-            if transaction.amount > 0:  # Only consider expenses
-                category = transaction.category or 'Uncategorized'
-                category_spending[category] = category_spending.get(category, 0) + transaction.amount
-        
+        # Current month's spending by category
+        category_spending = aggregates.month_to_date_categories
+
         # Format for frontend
         return [
             {
@@ -243,23 +359,23 @@ def get_budget_progress(user_id):
         logger.error(f"Error getting budget progress: {e}")
         return []
 
-def calculate_financial_health_score(transactions):
+def calculate_financial_health_score(aggregates):
     """Calculate financial health score based on various metrics."""
-    if not transactions:
+    if not aggregates.transaction_count:
         logger.info("No transactions provided for health score calculation")
         return 0
         
     try:
         # Get total income and expenses
-        income = sum(abs(t.amount) for t in transactions if t.amount < 0)
-        expenses = sum(t.amount for t in transactions if t.amount > 0)
+        income = aggregates.total_income
+        expenses = aggregates.total_expenses
         
         logger.debug(f"Health score calculation - Income: {income}, Expenses: {expenses}")
         
         # Calculate metrics
         savings_rate = ((income - expenses) / income * 100) if income > 0 else 0
-        expense_diversity = len(set(t.category for t in transactions if t.category))
-        large_expenses = sum(1 for t in transactions if t.amount > income * 0.1) if income > 0 else 0
+        expense_diversity = len(aggregates.categories)
+        large_expenses = aggregates.large_expense_count
         
         # Calculate score components
         savings_score = min(savings_rate, 100) * 0.4
@@ -274,9 +390,9 @@ def calculate_financial_health_score(transactions):
         logger.error(f"Error calculating health score: {e}", exc_info=True)
         return 0
 
-def calculate_monthly_stats(transactions):
+def calculate_monthly_stats(aggregates):
     """Calculate monthly financial statistics."""
-    if not transactions:
+    if not aggregates.transaction_count:
         return {
             'net': 0,
             'income': 0,
@@ -284,14 +400,8 @@ def calculate_monthly_stats(transactions):
         }
         
     try:
-        current_month = datetime.now().replace(day=1)
-        monthly_transactions = [
-            t for t in transactions 
-            if t.date.year == current_month.year and t.date.month == current_month.month
-        ]
-        
-        income = sum(abs(t.amount) for t in monthly_transactions if t.amount < 0)
-        expenses = sum(t.amount for t in monthly_transactions if t.amount > 0)
+        income = aggregates.month_income
+        expenses = aggregates.month_expenses
         
         return {
             'net': income - expenses,
@@ -306,9 +416,9 @@ def calculate_monthly_stats(transactions):
             'expenses': 0
         }
 
-def calculate_spending_patterns(transactions):
+def calculate_spending_patterns(aggregates):
     """Calculate comprehensive spending patterns and trends."""
-    if not transactions:
+    if not aggregates.transaction_count:
         return {
             'trend': 0,
             'categories': {},
@@ -317,42 +427,14 @@ def calculate_spending_patterns(transactions):
             'spending_velocity': 0
         }
     
-    # Convert transactions to dicts if they aren't already
-    transaction_dicts = [t.to_dict() if hasattr(t, 'to_dict') else t for t in transactions]
-    
-    # Group transactions by month and category
-    monthly_data = {}
-    categories = {}
-    
-    for t in transaction_dicts:
-        if t['amount'] > 0:  # Only consider expenses
-            # Monthly grouping
-            date = datetime.strptime(t['date'], '%Y-%m-%d') if isinstance(t['date'], str) else t['date']
-            month_key = date.strftime('%Y-%m')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {
-                    'total': 0,
-                    'categories': {}
-                }
-            monthly_data[month_key]['total'] += t['amount']
-            
-            # Category grouping
-            category = t['category'] or 'Uncategorized'
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(t['amount'])
-            
-            # Update monthly category data
-            if category not in monthly_data[month_key]['categories']:
-                monthly_data[month_key]['categories'][category] = 0
-            monthly_data[month_key]['categories'][category] += t['amount']
+    monthly_data = aggregates.monthly
     
     # Calculate category averages and trends
     category_analysis = {}
-    for category, amounts in categories.items():
-        if amounts:  # Only process if there are amounts
-            avg = sum(amounts) / len(amounts)
-            std_dev = calculate_std_dev(amounts, avg)
+    for category, stats in aggregates.category_stats.items():
+        if stats.count:  # Only process if there are amounts
+            avg = stats.average
+            std_dev = stats.std_dev
             category_analysis[category] = {
                 'average': avg,
                 'std_dev': std_dev,
@@ -450,41 +532,25 @@ def calculate_prediction_confidence(growth_rates):
     confidence = 1 / (1 + std_dev)
     return min(max(confidence, 0), 1)  # Normalize to 0-1
 
-def generate_insights(transactions):
+def generate_insights(aggregates):
     """Generate comprehensive financial insights from transactions."""
-    if not transactions:
+    if not aggregates.transaction_count:
         return []
         
     insights = []
     
-    # Convert transactions to dicts if they aren't already
-    transaction_dicts = [t.to_dict() if hasattr(t, 'to_dict') else t for t in transactions]
+    total_spending = aggregates.total_expenses
+    total_income = aggregates.total_income
     
-    # Calculate total spending and income
-    total_spending = sum(t['amount'] for t in transaction_dicts if t['amount'] > 0)
-    total_income = abs(sum(t['amount'] for t in transaction_dicts if t['amount'] < 0))
-    
-    # Calculate spending by category with trends
-    category_spending = {}
+    # Calculate category trends from the older and newer half of each category
     category_trends = {}
-    for t in transaction_dicts:
-        if t['amount'] > 0:  # Only consider expenses
-            category = t['category'] or 'Uncategorized'
-            if category not in category_spending:
-                category_spending[category] = []
-            category_spending[category].append({
-                'amount': t['amount'],
-                'date': datetime.strptime(t['date'], '%Y-%m-%d') if isinstance(t['date'], str) else t['date']
-            })
-    
-    # Calculate category trends and averages
-    for category, transactions in category_spending.items():
-        sorted_trans = sorted(transactions, key=lambda x: x['date'])
-        if len(sorted_trans) >= 2:
-            first_half = sum(t['amount'] for t in sorted_trans[:len(sorted_trans)//2])
-            second_half = sum(t['amount'] for t in sorted_trans[len(sorted_trans)//2:])
+    for category, stats in aggregates.category_stats.items():
+        if stats.count >= 2:
+            first_half = stats.first_half
+            second_half = stats.second_half
             trend = ((second_half - first_half) / first_half) if first_half else 0
             category_trends[category] = trend
+    category_totals = aggregates.category_totals
     
     # Generate summary insights
     savings_rate = ((total_income - total_spending) / total_income * 100) if total_income else 0
@@ -500,8 +566,7 @@ def generate_insights(transactions):
     
     # Top spending categories with trends
     top_categories = sorted(
-        [(cat, sum(t['amount'] for t in trans)) 
-         for cat, trans in category_spending.items()],
+        category_totals.items(),
         key=lambda x: x[1],
         reverse=True
     )[:3]
@@ -517,14 +582,14 @@ def generate_insights(transactions):
         })
     
     # Large transactions
-    large_transactions = [t for t in transaction_dicts if t['amount'] > 100]
+    large_transactions = aggregates.large_transactions
     if large_transactions:
         insights.append({
             'type': 'large_transactions',
             'message': 'Recent Large Transactions:',
             'details': [
                 f"{t['name']}: ${t['amount']:.2f} on {t['date']}"
-                for t in sorted(large_transactions, key=lambda x: x['date'], reverse=True)[:3]
+                for t in large_transactions
             ]
         })
     
@@ -532,7 +597,7 @@ def generate_insights(transactions):
     recommendations = generate_recommendations(
         total_spending, 
         total_income, 
-        category_spending, 
+        category_totals, 
         category_trends
     )
     if recommendations:
@@ -553,7 +618,7 @@ def get_trend_indicator(trend):
     else:
         return '→ Stable'
 
-def generate_recommendations(total_spending, total_income, category_spending, category_trends):
+def generate_recommendations(total_spending, total_income, category_totals, category_trends):
     """Generate personalized financial recommendations."""
     recommendations = []
     
@@ -573,11 +638,6 @@ def generate_recommendations(total_spending, total_income, category_spending, ca
             )
     
     # Check for high-spending categories
-    category_totals = {
-        cat: sum(t['amount'] for t in trans)
-        for cat, trans in category_spending.items()
-    }
-    
     if 'Entertainment' in category_totals and category_totals['Entertainment'] > total_income * 0.1:
         recommendations.append(
             "Entertainment spending is over 10% of income. "
@@ -586,58 +646,42 @@ def generate_recommendations(total_spending, total_income, category_spending, ca
     
     return recommendations
 
-def get_category_distribution(transactions):
+def get_category_distribution(aggregates):
     """Get spending distribution across categories."""
-    if not transactions:
+    if not aggregates.transaction_count:
         return []
         
     try:
-        category_totals = {}
-        for transaction in transactions:
-            if transaction.amount > 0:  # Only consider expenses
-                category = transaction.category or 'Uncategorized'
-                category_totals[category] = category_totals.get(category, 0) + transaction.amount
-                
         return [
             {'category': category, 'amount': total}
-            for category, total in sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
+            for category, total in sorted(aggregates.category_totals.items(), key=lambda x: x[1], reverse=True)
         ]
     except Exception as e:
         logger.error(f"Error getting category distribution: {e}")
         return []
 
-def get_spending_over_time(transactions):
+def get_spending_over_time(aggregates):
     """Get spending trends over time."""
-    if not transactions:
+    if not aggregates.transaction_count:
         return []
         
     try:
-        # Group by month
-        monthly_spending = {}
-        for transaction in transactions:
-            if transaction.amount > 0:  # Only consider expenses
-                month_key = transaction.date.strftime('%Y-%m')
-                monthly_spending[month_key] = monthly_spending.get(month_key, 0) + transaction.amount
-                
         return [
-            {'date': month, 'amount': amount}
-            for month, amount in sorted(monthly_spending.items())
+            {'date': month, 'amount': data['total']}
+            for month, data in sorted(aggregates.monthly.items())
         ]
     except Exception as e:
         logger.error(f"Error getting spending over time: {e}")
         return []
 
-def calculate_savings_progress(user_id):
+def calculate_savings_progress(aggregates):
     """Calculate progress towards savings goal."""
     try:
         # Get user's savings goal (you'll need to implement this)
         savings_goal = 10000  # Example goal
         
         # Calculate total savings from transactions
-        transactions = Transaction.query.filter_by(user_id=user_id).all()
-        income = sum(abs(t.amount) for t in transactions if t.amount < 0)
-        expenses = sum(t.amount for t in transactions if t.amount > 0)
-        savings = income - expenses
+        savings = aggregates.total_income - aggregates.total_expenses
         
         # Calculate percentage
         progress = (savings / savings_goal * 100) if savings_goal > 0 else 0
@@ -648,45 +692,46 @@ def calculate_savings_progress(user_id):
 
 @app.route('/api/dashboard/insights', methods=['GET'])
 @login_required
+@cached_response('dashboard_insights')
 def get_dashboard_insights():
     try:
         logger.info(f"Starting dashboard insights request for user {current_user.id}")
         
-        # Get user's transactions
-        transactions = Transaction.query.filter_by(user_id=current_user.id).all()
-        logger.info(f"Found {len(transactions)} transactions")
+        # Aggregate the user's transactions in one pass, shared by every calculator
+        aggregates = aggregate_transactions(current_user.id)
+        logger.info(f"Found {aggregates.transaction_count} transactions")
         
         try:
             # Calculate health score
-            health_score = calculate_financial_health_score(transactions)
+            health_score = calculate_financial_health_score(aggregates)
             logger.info(f"Health score calculated: {health_score}")
             
             # Calculate monthly stats
-            monthly_stats = calculate_monthly_stats(transactions)
+            monthly_stats = calculate_monthly_stats(aggregates)
             logger.info(f"Monthly stats calculated: {monthly_stats}")
             
             # Generate insights
-            insights = generate_insights(transactions)
+            insights = generate_insights(aggregates)
             logger.info(f"Insights generated: {len(insights)} insights")
             
             # Get spending patterns (changed from calculate_spending_trends)
-            spending_patterns = calculate_spending_patterns(transactions)
+            spending_patterns = calculate_spending_patterns(aggregates)
             logger.info(f"Spending patterns calculated")
             
             # Get budget progress
-            budget_progress = get_budget_progress(current_user.id)
+            budget_progress = get_budget_progress(aggregates)
             logger.info(f"Budget progress calculated: {len(budget_progress)} categories")
             
             # Get category distribution
-            category_dist = get_category_distribution(transactions)
+            category_dist = get_category_distribution(aggregates)
             logger.info(f"Category distribution calculated: {len(category_dist)} categories")
             
             # Get spending over time
-            spending_time = get_spending_over_time(transactions)
+            spending_time = get_spending_over_time(aggregates)
             logger.info(f"Spending over time calculated: {len(spending_time)} periods")
             
             # Calculate savings progress
-            savings_prog = calculate_savings_progress(current_user.id)
+            savings_prog = calculate_savings_progress(aggregates)
             logger.info(f"Savings progress calculated: {savings_prog}%")
             
             response_data = {
@@ -701,7 +746,8 @@ def get_dashboard_insights():
                 'category_distribution': category_dist,
                 'spending_over_time': spending_time,
                 'spending_velocity': spending_patterns['spending_velocity'],
-                'category_analysis': spending_patterns['categories']
+                'category_analysis': spending_patterns['categories'],
+                'recurring_charges': load_recurring(current_user.id, active_only=True)
             }
             
             logger.info("Successfully prepared dashboard response")
@@ -715,6 +761,48 @@ def get_dashboard_insights():
         logger.error(f"Error in dashboard insights endpoint: {e}", exc_info=True)
         return jsonify({'error': 'Failed to get insights'}), 500
 
+@app.route('/api/spending_forecast', methods=['GET'])
+@login_required
+def get_spending_forecast():
+    try:
+        # Monthly expense totals straight from the rollup table
+        ensure_rollup(current_user.id)
+        monthly_spending = db.session.query(
+            MonthlyCategoryRollup.month,
+            func.sum(MonthlyCategoryRollup.expense_total)
+        ).filter(
+            MonthlyCategoryRollup.user_id == current_user.id,
+            MonthlyCategoryRollup.expense_count > 0
+        ).group_by(MonthlyCategoryRollup.month).order_by(MonthlyCategoryRollup.month).all()
+
+        if not monthly_spending:
+            return jsonify({'error': 'No transaction history available'}), 400
+
+        months = [month for month, _ in monthly_spending]
+        spending_values = [float(total) for _, total in monthly_spending]
+
+        # Simple linear trend over the monthly totals
+        if len(spending_values) > 1:
+            import numpy as np
+            trend = np.poly1d(np.polyfit(np.arange(len(spending_values)), spending_values, 1))
+            forecast_values = trend(np.arange(len(spending_values), len(spending_values) + 3)).tolist()
+        else:
+            forecast_values = spending_values * 3
+
+        return jsonify({
+            'historical': {
+                'months': months,
+                'values': spending_values
+            },
+            'forecast': {
+                'months': [increment_month(months[-1], i) for i in range(1, 4)],
+                'values': forecast_values
+            }
+        }), 200
+    except Exception as e:
+        logger.error(f"Error generating spending forecast: {e}")
+        return jsonify({'error': 'Failed to generate forecast'}), 500
+
 @app.route('/api/debug/db-status', methods=['GET'])
 @login_required
 def check_db_status():
@@ -745,6 +833,18 @@ def check_db_status():
         logger.error(f"Error checking database status: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/debug/cache-stats', methods=['GET'])
+@login_required
+def cache_stats():
+    # Hit rates and keys span every user of the process, so only debug runs expose them.
+    if not app.debug:
+        return jsonify({'error': 'API route not found'}), 404
+    return jsonify({
+        'responses': response_cache.stats(),
+        'llm': get_llm_cache().stats(),
+        'prompts': prompt_stats()
+    }), 200
+
 @app.route('/api/debug/auth-check', methods=['GET'])
 @login_required
 def auth_check():
@@ -799,22 +899,6 @@ def verify_schema():
         logger.error(f"Schema verification error: {e}")
         return jsonify({'error': str(e)}), 500
 
-# Add this temporary route to fix the schema
-@app.route('/api/debug/fix-schema', methods=['GET'])
-@login_required
-def fix_schema():
-    try:
-        with db.engine.connect() as conn:
-            conn.execute(text("""
-                ALTER TABLE transaction 
-                ADD COLUMN IF NOT EXISTS account_id VARCHAR(100)
-            """))
-            conn.commit()
-        return jsonify({'message': 'Schema fixed successfully'}), 200
-    except Exception as e:
-        logger.error(f"Schema fix error: {e}")
-        return jsonify({'error': str(e)}), 500
-
 # Add this temporary route to recreate the table
 @app.route('/api/debug/recreate-table', methods=['GET'])
 @login_required
@@ -876,13 +960,13 @@ def set_budget():
 
 @app.route('/api/budget/suggestions', methods=['GET'])
 @login_required
+@cached_response('budget_suggestions')
 def get_budget_suggestions():
     try:
         current_budgets = fetch_user_budgets(current_user.id)
         spending_data = fetch_user_spending_data(current_user.id)
 
-        advisor = BudgetAdvisor()
-        suggestions = advisor.suggest_budget_adjustments(current_budgets, spending_data)
+        suggestions = get_service(BudgetAdvisor).suggest_budget_adjustments(current_budgets, spending_data)
 
         user_data = {"budgets": current_budgets, "spending": spending_data}
         gemini_insights = get_gemini_insights(user_data)
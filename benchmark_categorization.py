@@ -0,0 +1,127 @@
+"""
+Compare per-transaction and batched LLM categorization.
+
+Runs the same set of transactions through ``enhance_transaction_categorization``
+one at a time and through ``enhance_transaction_categorizations`` at each
+requested batch size, then reports requests, tokens, wall time, throughput
+and estimated cost per 1k transactions.
+
+Live runs need OPENAI_API_KEY and cost money. ``--simulate`` swaps in a
+local stand-in for the chat endpoint with a fixed per-request latency and a
+chars/4 token estimate, which is enough to compare request counts and
+prompt overhead offline.
+
+    python benchmark_categorization.py --count 200 --batch-sizes 1 10 25 50 --simulate
+"""
+
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from ai_integration import AIFinancialAdvisor
+
+MERCHANTS = [
+    ('STARBUCKS STORE 1234', 'Food and Drink'),
+    ('UBER *TRIP HELP.UBER.COM', 'Travel'),
+    ('AMAZON MKTPLACE PMTS', 'Shops'),
+    ('NETFLIX.COM', 'Uncategorized'),
+    ('SHELL OIL 5744', 'Transportation'),
+    ('WHOLEFDS MKT 10203', 'Food and Drink'),
+    ('COMCAST CABLE COMM', 'Uncategorized'),
+    ('CVS/PHARMACY #0456', 'Healthcare'),
+    ('DELTA AIR 0062341', 'Travel'),
+    ('SPOTIFY USA', 'Uncategorized'),
+]
+
+
+def sample_transactions(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        name, category = rng.choice(MERCHANTS)
+        rows.append((f"{name} ${rng.uniform(3, 250):.2f}", category))
+    return rows
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class SimulatedCompletions:
+    """Answers categorization prompts locally after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def create(self, model, messages):
+        prompt = messages[-1]['content']
+        time.sleep(self.latency)
+        analysis = {'category': 'Shops', 'confidence': 0.9,
+                    'insights': 'Routine discretionary purchase.',
+                    'budget_impact': 'Low impact on the monthly budget.'}
+        if 'Transactions: [' in prompt:
+            rows = json.loads(prompt.split('Transactions: ', 1)[1].strip())
+            content = json.dumps([dict(analysis, id=row['id']) for row in rows])
+        else:
+            content = json.dumps(analysis)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=_estimate_tokens(prompt),
+                                  completion_tokens=_estimate_tokens(content))
+        )
+
+
+def make_advisor(simulate: bool, latency: float) -> AIFinancialAdvisor:
+    advisor = AIFinancialAdvisor(api_key='simulated' if simulate else None)
+    if simulate:
+        advisor.client = SimpleNamespace(chat=SimpleNamespace(completions=SimulatedCompletions(latency)))
+    return advisor
+
+
+def run(rows, batch_size: int, args) -> dict:
+    advisor = make_advisor(args.simulate, args.latency)
+    started = time.perf_counter()
+    if batch_size == 1:
+        results = [advisor.enhance_transaction_categorization(name, category, use_cache=False)
+                   for name, category in rows]
+    else:
+        results = advisor.enhance_transaction_categorizations(rows, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+
+    usage = advisor.usage
+    cost = (usage['prompt_tokens'] * args.input_price + usage['completion_tokens'] * args.output_price) / 1000
+    per_k = 1000 / len(rows)
+    return {
+        'batch_size': batch_size,
+        'requests': usage['requests'],
+        'parsed': sum(1 for r in results if r is not None),
+        'prompt_tokens': usage['prompt_tokens'],
+        'completion_tokens': usage['completion_tokens'],
+        'seconds': elapsed,
+        'tx_per_second': len(rows) / elapsed if elapsed else float('inf'),
+        'cost_per_1k': cost * per_k,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched LLM transaction categorization.")
+    parser.add_argument("--count", type=int, default=100, help="Transactions to categorize per run.")
+    parser.add_argument("--batch-sizes", type=int, nargs='+', default=[1, 10, 25, 50],
+                        help="Batch sizes to compare; 1 means one request per transaction.")
+    parser.add_argument("--simulate", action="store_true", help="Use a local stand-in instead of the API.")
+    parser.add_argument("--latency", type=float, default=0.8,
+                        help="Seconds per simulated request.")
+    parser.add_argument("--input-price", type=float, default=0.03, help="USD per 1k prompt tokens.")
+    parser.add_argument("--output-price", type=float, default=0.06, help="USD per 1k completion tokens.")
+    args = parser.parse_args()
+
+    rows = sample_transactions(args.count)
+    print(f"{'batch':>5} {'reqs':>5} {'parsed':>7} {'prompt_tok':>10} {'compl_tok':>10} "
+          f"{'seconds':>8} {'tx/s':>7} {'$/1k tx':>8}")
+    for size in args.batch_sizes:
+        r = run(rows, size, args)
+        print(f"{r['batch_size']:>5} {r['requests']:>5} {r['parsed']:>7} {r['prompt_tokens']:>10} "
+              f"{r['completion_tokens']:>10} {r['seconds']:>8.2f} {r['tx_per_second']:>7.1f} "
+              f"{r['cost_per_1k']:>8.3f}")
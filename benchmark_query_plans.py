@@ -0,0 +1,165 @@
+"""
+Show query plans and timings for the app's hottest per-user queries.
+
+The script builds a synthetic database from the models (or uses ``--url``),
+then runs each query shape from the app with and without the indexes
+declared in models.py. It prints the plan the database chose and the
+median latency. On SQLite, "USING COVERING INDEX" is an index-only scan.
+On PostgreSQL, look for "Index Only Scan". The script runs VACUUM ANALYZE
+there after each change, so the visibility map allows one.
+
+    python benchmark_query_plans.py --users 20 --per-user 20000
+    python benchmark_query_plans.py --url postgresql://localhost/finance_bench --users 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from models import db, Budget, CustomIncome, SavingsGoal, Transaction, User, UserCategoryPreference, UserIncome
+
+CATEGORIES = ['Food and Drink', 'Travel', 'Shops', 'Transportation', 'Healthcare', 'Recreation',
+              'Service', 'Payment', 'Transfer', None]
+
+INDEXED_MODELS = (Transaction, Budget, SavingsGoal, UserIncome, CustomIncome, UserCategoryPreference)
+# Present in both runs: the schema had these before the per-user indexes were added.
+BASELINE_INDEXES = {'ix_transaction_date'}
+
+
+def month_expression(dialect: str) -> str:
+    if dialect == 'postgresql':
+        return "to_char(date_trunc('month', date), 'YYYY-MM')"
+    return "strftime('%Y-%m', date)"
+
+
+def query_shapes(dialect: str):
+    """(label, SQL) pairs mirroring the ORM queries in app.py, the routes and the ingest path."""
+    month = month_expression(dialect)
+    return [
+        ('recent transactions (budget recommendations)',
+         'SELECT * FROM "transaction" WHERE user_id = :user_id ORDER BY date DESC LIMIT 100'),
+        ('last 90 days (AI advice)',
+         'SELECT * FROM "transaction" WHERE user_id = :user_id AND date >= :since'),
+        ('large expenses (dashboard)',
+         'SELECT name, amount, date FROM "transaction" WHERE user_id = :user_id AND amount > 100 '
+         'ORDER BY date DESC, id DESC LIMIT 3'),
+        ('category halves (dashboard)',
+         "SELECT category, SUM(CASE WHEN rn * 2 <= cnt THEN amount ELSE 0 END), "
+         "SUM(CASE WHEN rn * 2 <= cnt THEN 0 ELSE amount END) FROM ("
+         "SELECT coalesce(category, 'Uncategorized') AS category, amount, "
+         "row_number() OVER (PARTITION BY coalesce(category, 'Uncategorized') ORDER BY date, id) AS rn, "
+         "count(*) OVER (PARTITION BY coalesce(category, 'Uncategorized')) AS cnt "
+         'FROM "transaction" WHERE user_id = :user_id AND amount > 0) AS ranked GROUP BY category'),
+        ('rollup refresh for a month range',
+         f"SELECT {month} AS month, coalesce(category, '') AS category, count(id), "
+         "sum(CASE WHEN amount > 0 THEN amount ELSE 0 END) "
+         'FROM "transaction" WHERE user_id = :user_id AND date >= :since '
+         f"GROUP BY {month}, coalesce(category, '')"),
+        ('budgets', 'SELECT * FROM budget WHERE user_id = :user_id'),
+        ('savings goals', 'SELECT * FROM savings_goal WHERE user_id = :user_id'),
+    ]
+
+
+def populate(engine, users: int, per_user: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': uid, 'username': f'bench{uid}', 'email': f'bench{uid}@example.com', 'data_version': 0}
+            for uid in range(1, users + 1)
+        ])
+        for uid in range(1, users + 1):
+            rows = []
+            for i in range(per_user):
+                rows.append({
+                    'user_id': uid,
+                    'transaction_id': f'bench-{uid}-{i}',
+                    'date': start + timedelta(minutes=rng.randrange(60 * 24 * 1000)),
+                    'name': f'MERCHANT {rng.randrange(500)}',
+                    'amount': round(rng.lognormvariate(3, 1), 2) if rng.random() < 0.9 else -2500.0,
+                    'category': rng.choice(CATEGORIES),
+                    'pending': False,
+                })
+            conn.execute(Transaction.__table__.insert(), rows)
+            conn.execute(Budget.__table__.insert(), [
+                {'user_id': uid, 'category': c, 'budget_limit': 500.0} for c in CATEGORIES if c
+            ])
+            conn.execute(SavingsGoal.__table__.insert(), [
+                {'user_id': uid, 'goal_name': f'Goal {g}', 'target_amount': 1000.0} for g in range(3)
+            ])
+    analyze(engine)
+
+
+def analyze(engine):
+    """Refresh planner statistics (and, on PostgreSQL, the visibility map)."""
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM ANALYZE'))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text('ANALYZE'))
+
+
+def set_indexes(engine, enabled: bool):
+    """Create or drop the indexes under test; indexes that predate them stay in place."""
+    with engine.begin() as conn:
+        for model in INDEXED_MODELS:
+            for index in model.__table__.indexes:
+                if index.name in BASELINE_INDEXES:
+                    continue
+                if enabled:
+                    index.create(bind=conn, checkfirst=True)
+                else:
+                    index.drop(bind=conn, checkfirst=True)
+    analyze(engine)
+
+
+def explain(conn, sql: str, params) -> str:
+    if conn.dialect.name == 'postgresql':
+        return '\n'.join(row[0] for row in conn.execute(text('EXPLAIN ' + sql), params))
+    return '\n'.join(row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql), params))
+
+
+def median_ms(conn, sql: str, params, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query plans for per-user queries, with and without indexes.")
+    parser.add_argument("--url", default=None, help="Empty database to load; defaults to a temporary SQLite file.")
+    parser.add_argument("--users", type=int, default=20, help="Users to generate.")
+    parser.add_argument("--per-user", type=int, default=20000, help="Transactions per user.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query.")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+    engine = create_engine(url)
+    print(f"Loading {args.users} users x {args.per_user} transactions into {engine.url.render_as_string()}")
+    populate(engine, args.users, args.per_user)
+
+    params = {'user_id': args.users // 2 or 1, 'since': str(datetime(2024, 7, 1))}
+    results = {}
+    for enabled in (False, True):
+        set_indexes(engine, enabled)
+        with engine.connect() as conn:
+            for label, sql in query_shapes(engine.dialect.name):
+                results[(label, enabled)] = (explain(conn, sql, params), median_ms(conn, sql, params, args.repeat))
+
+    for label, _ in query_shapes(engine.dialect.name):
+        (plan_without, without_ms), (plan_with, with_ms) = results[(label, False)], results[(label, True)]
+        print(f"\n{label}: {without_ms:.2f}ms without indexes, {with_ms:.2f}ms with "
+              f"({without_ms / with_ms if with_ms else float('inf'):.0f}x)")
+        print('  with indexes:    ' + plan_with.replace('\n', '\n                   '))
+        print('  without indexes: ' + plan_without.replace('\n', '\n                   '))
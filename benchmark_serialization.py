@@ -0,0 +1,99 @@
+"""
+Compare ORM ``to_dict`` serialization with the projected row path.
+
+For each row count, one user's transactions are loaded into a temporary
+SQLite database. They are then listed two ways: hydrated ORM objects
+through ``Transaction.to_dict`` and ``jsonify``, and projected tuples
+through ``row_to_dict`` and ``json_response``. The query, dict-building
+and JSON-encoding stages are timed separately. Both paths must produce the
+same dicts.
+
+    python benchmark_serialization.py --rows 10000 100000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify
+
+from models import db, Transaction, User
+from transaction_rows import json_response, orjson, project, row_to_dict
+
+
+def make_app(rows: int) -> Flask:
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialize.db')}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='bench', email='bench@example.com'))
+        db.session.flush()
+        start = datetime(2020, 1, 1)
+        for offset in range(0, rows, 10000):
+            db.session.execute(Transaction.__table__.insert(), [
+                {'user_id': 1, 'transaction_id': f'bench-{i}', 'account_id': f'acct-{i % 3}',
+                 'date': start + timedelta(minutes=17 * i), 'name': f'MERCHANT {i % 500}',
+                 'amount': round((i * 7919 % 20000) / 100 - 20, 2), 'category': None if i % 11 == 0 else 'Shops',
+                 'merchant_name': f'Merchant {i % 500}' if i % 4 else None, 'pending': i % 50 == 0}
+                for i in range(offset, min(rows, offset + 10000))
+            ])
+        db.session.commit()
+    return app
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def orm_path(query):
+    transactions, query_ms = timed(lambda: query.all())
+    dicts, dict_ms = timed(lambda: [t.to_dict() for t in transactions])
+    response, encode_ms = timed(lambda: jsonify(transactions=dicts))
+    return dicts, (query_ms, dict_ms, encode_ms), len(response.get_data())
+
+
+def projected_path(query):
+    rows, query_ms = timed(lambda: project(query).all())
+    dicts, dict_ms = timed(lambda: [row_to_dict(row) for row in rows])
+    response, encode_ms = timed(lambda: json_response({'transactions': dicts}))
+    return dicts, (query_ms, dict_ms, encode_ms), len(response.get_data())
+
+
+def best_of(path, query, repeat: int):
+    runs = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        runs.append(path(query))
+    dicts, _, size = runs[-1]
+    stages = [statistics.median(run[1][i] for run in runs) for i in range(3)]
+    return dicts, stages, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark transaction list serialization paths.")
+    parser.add_argument("--rows", type=int, nargs='+', default=[10000, 100000], help="Row counts to compare.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; medians are reported.")
+    args = parser.parse_args()
+
+    print(f"JSON encoder: {'orjson' if orjson is not None else 'stdlib json (C encoder)'}")
+    print(f"{'rows':>7} {'path':<10} {'query':>9} {'to dict':>9} {'encode':>9} {'total':>9} {'bytes':>10}")
+    for count in args.rows:
+        app = make_app(count)
+        with app.test_request_context():
+            query = Transaction.query.filter_by(user_id=1).order_by(Transaction.date.desc())
+            expected, orm_stages, orm_size = best_of(orm_path, query, args.repeat)
+            actual, lean_stages, lean_size = best_of(projected_path, query, args.repeat)
+            for label, stages, size in (('to_dict', orm_stages, orm_size), ('projected', lean_stages, lean_size)):
+                print(f"{count:>7} {label:<10} " + ' '.join(f"{ms:>7.1f}ms" for ms in stages)
+                      + f" {sum(stages):>7.1f}ms {size:>10}")
+            print(f"{'':>7} {'speed-up':<10} {sum(orm_stages) / sum(lean_stages):>8.1f}x"
+                  f"  (outputs {'match' if expected == actual else 'DIFFER'})")
@@ -0,0 +1,179 @@
+"""
+Time ``AIFinancialAdvisor.spending_metrics`` on large synthetic histories.
+
+The per-dict implementations the columnar code replaced are kept below as
+the baseline. Their z-score pass recomputes the category mean and std for
+every transaction (O(n^2)), so they only run on the first ``--baseline-max``
+rows. On that sample both versions must produce the same metrics.
+
+    python benchmark_spending_metrics.py --count 100000 --baseline-max 10000
+"""
+
+import argparse
+import math
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from ai_integration import AIFinancialAdvisor, _spending_frame
+
+CATEGORIES = ['Food and Drink', 'Travel', 'Shops', 'Transportation', 'Healthcare', 'Recreation',
+              'Service', 'Payment', 'Transfer', 'Uncategorized']
+SUBSCRIPTIONS = [('NETFLIX.COM', 15.49), ('SPOTIFY USA', 10.99), ('COMCAST CABLE', 89.99), ('PLANET FITNESS', 24.99)]
+
+
+def sample_transactions(count: int, seed: int = 7):
+    """About ``count`` transactions in date order: card spend, some income and monthly subscriptions."""
+    rng = random.Random(seed)
+    start = date(2021, 1, 1)
+    rows, months = [], set()
+    for i in range(count):
+        day = start + timedelta(days=i * 1095 // max(count, 1))
+        if (day.year, day.month) not in months:
+            months.add((day.year, day.month))
+            rows.extend({'name': name, 'merchant_name': name, 'amount': -amount,
+                         'category': 'Service', 'date': day.isoformat()} for name, amount in SUBSCRIPTIONS)
+        amount = -round(rng.lognormvariate(3, 1), 2) if rng.random() < 0.9 else round(rng.uniform(500, 4000), 2)
+        rows.append({'name': f"MERCHANT {rng.randrange(2000)}", 'merchant_name': f"Merchant {rng.randrange(2000)}",
+                     'amount': amount, 'category': rng.choice(CATEGORIES), 'date': day.isoformat()})
+    return rows
+
+
+# Baseline: the per-transaction implementations before the columnar rewrite.
+
+def baseline_calculate_spending(transactions):
+    spending = defaultdict(lambda: {'total': 0, 'count': 0, 'average': 0, 'max': 0, 'min': float('inf')})
+    for transaction in transactions:
+        if transaction['amount'] < 0:
+            cat_data = spending[transaction.get('category', 'Uncategorized')]
+            amount = abs(transaction['amount'])
+            cat_data['total'] += amount
+            cat_data['count'] += 1
+            cat_data['max'] = max(cat_data['max'], amount)
+            cat_data['min'] = min(cat_data['min'], amount)
+            cat_data['average'] = cat_data['total'] / cat_data['count']
+    return dict(spending)
+
+
+def baseline_spending_trends(transactions):
+    monthly_spending = defaultdict(float)
+    for transaction in transactions:
+        if transaction['amount'] < 0:
+            month_key = datetime.strptime(transaction['date'], '%Y-%m-%d').strftime('%Y-%m')
+            monthly_spending[month_key] += abs(transaction['amount'])
+    months = sorted(monthly_spending)
+    trends = {}
+    for prev_month, current_month in zip(months, months[1:]):
+        change = (monthly_spending[current_month] - monthly_spending[prev_month]) / monthly_spending[prev_month] * 100
+        trends[current_month] = {'change_percentage': round(change, 2),
+                                 'current_spending': round(monthly_spending[current_month], 2),
+                                 'previous_spending': round(monthly_spending[prev_month], 2)}
+    return trends
+
+
+def baseline_unusual_transactions(transactions):
+    category_stats = defaultdict(list)
+    for transaction in transactions:
+        if transaction['amount'] < 0:
+            category_stats[transaction.get('category', 'Uncategorized')].append(abs(transaction['amount']))
+    unusual = []
+    for transaction in transactions:
+        if transaction['amount'] < 0:
+            amounts = category_stats[transaction.get('category', 'Uncategorized')]
+            mean, std = np.mean(amounts), np.std(amounts)
+            z_score = (abs(transaction['amount']) - mean) / std if std > 0 else 0
+            if abs(z_score) > 2:
+                unusual.append({'transaction': transaction, 'z_score': z_score, 'average_for_category': mean})
+    return unusual
+
+
+def baseline_recurring_expenses(transactions):
+    merchant_transactions = defaultdict(list)
+    for transaction in transactions:
+        if transaction['amount'] < 0:
+            merchant = transaction.get('merchant_name', transaction.get('name', ''))
+            merchant_transactions[merchant].append((abs(transaction['amount']),
+                                                    datetime.strptime(transaction['date'], '%Y-%m-%d')))
+    recurring = []
+    for merchant, trans in merchant_transactions.items():
+        if len(trans) >= 2:
+            amounts = [amount for amount, _ in trans]
+            dates = [d for _, d in trans]
+            if np.std(amounts) < 1:
+                date_diffs = [(dates[i] - dates[i - 1]).days for i in range(1, len(dates))]
+                interval_std = np.std(date_diffs)
+                if interval_std < 5:
+                    recurring.append({'merchant': merchant, 'amount': np.mean(amounts),
+                                      'interval_days': np.mean(date_diffs),
+                                      'confidence': 'high' if interval_std < 2 else 'medium'})
+    return recurring
+
+
+def baseline_metrics(transactions):
+    return {
+        'spending_data': baseline_calculate_spending(transactions),
+        'trends': baseline_spending_trends(transactions),
+        'unusual_transactions': baseline_unusual_transactions(transactions),
+        'recurring_expenses': baseline_recurring_expenses(transactions),
+    }
+
+
+def columnar_metrics(advisor, transactions):
+    spending = _spending_frame(transactions)
+    return {
+        'spending_data': advisor._calculate_spending(spending),
+        'trends': advisor._analyze_spending_trends(spending),
+        'unusual_transactions': advisor._identify_unusual_transactions(spending),
+        'recurring_expenses': advisor._identify_recurring_expenses(spending),
+    }
+
+
+def same(a, b) -> bool:
+    """Structural equality with a relative tolerance for floats."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    return a == b
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark columnar spending metrics.")
+    parser.add_argument("--count", type=int, default=100000, help="Transactions in the synthetic history.")
+    parser.add_argument("--baseline-max", type=int, default=10000,
+                        help="Rows given to the O(n^2) baseline; 0 skips it.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement; best is kept.")
+    args = parser.parse_args()
+
+    advisor = AIFinancialAdvisor(api_key='benchmark')
+    transactions = sample_transactions(args.count)
+
+    spending, build_ms = timed(_spending_frame, transactions)
+    print(f"{args.count} transactions ({len(spending)} spending rows)")
+    print(f"  build frame            {build_ms:9.1f}ms")
+    for name in ('_calculate_spending', '_analyze_spending_trends',
+                 '_identify_unusual_transactions', '_identify_recurring_expenses'):
+        best = min(timed(getattr(advisor, name), spending)[1] for _ in range(args.repeat))
+        print(f"  {name:<30} {best:9.1f}ms")
+    best = min(timed(advisor.spending_metrics, transactions)[1] for _ in range(args.repeat))
+    print(f"  spending_metrics total {best:9.1f}ms")
+
+    if args.baseline_max:
+        sample = transactions[:args.baseline_max]
+        expected, baseline_ms = timed(baseline_metrics, sample)
+        actual, columnar_ms = timed(columnar_metrics, advisor, sample)
+        print(f"\nBaseline on {len(sample)} rows: {baseline_ms:.1f}ms vs columnar {columnar_ms:.1f}ms "
+              f"({baseline_ms / columnar_ms:.0f}x)")
+        for key in expected:
+            print(f"  {key:<22} {'match' if same(expected[key], actual[key]) else 'MISMATCH'}")
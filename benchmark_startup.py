@@ -0,0 +1,79 @@
+"""
+Measure how long a fresh interpreter takes to import the web app.
+
+Each run imports the module in a new subprocess with ``-X importtime`` and
+reports the median total, the slowest direct imports, and whether any SDK
+that is meant to load on first use (LAZY_MODULES) was imported at start-up.
+The exit status is non-zero if one was, so the check can run in CI.
+
+    python benchmark_startup.py --runs 5 --module app
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+LAZY_MODULES = ('google.generativeai', 'openai', 'plaid', 'numpy')
+
+_PROBE = "import sys, {module}; print(','.join(m for m in {lazy!r} if m in sys.modules))"
+
+
+def import_once(module: str):
+    """Import ``module`` in a new interpreter.
+
+    Returns (total ms, {direct import: cumulative ms}, lazy SDKs that were loaded).
+    """
+    env = dict(os.environ)
+    # The services refuse to start without a key; its value is never used for an import.
+    env.setdefault('GOOGLE_GEMINI_API_KEY', 'benchmark')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(module=module, lazy=LAZY_MODULES)],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total, children = 0.0, {}
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if not line.startswith('import time:') or len(parts) != 3 or 'cumulative' in line:
+            continue
+        cumulative, name = int(parts[1]) / 1000, parts[2]
+        # Nesting is shown as two extra spaces per level.
+        if name.strip() == module and not name.startswith('  '):
+            total = cumulative
+        elif name.startswith('   ') and not name.startswith('    '):
+            children[name.strip()] = cumulative
+    loaded = [m for m in result.stdout.strip().split(',') if m]
+    return total, children, loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold import time of the web app.")
+    parser.add_argument("--module", default="app", help="Module to import.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports to list.")
+    args = parser.parse_args()
+
+    totals, per_module, loaded = [], defaultdict(list), set()
+    for _ in range(args.runs):
+        total, children, eager = import_once(args.module)
+        totals.append(total)
+        for name, ms in children.items():
+            per_module[name].append(ms)
+        loaded.update(eager)
+
+    print(f"import {args.module}: median {statistics.median(totals):.0f}ms "
+          f"(min {min(totals):.0f}ms, max {max(totals):.0f}ms, {args.runs} runs)")
+    print("\nSlowest direct imports (median):")
+    ranked = sorted(per_module.items(), key=lambda item: -statistics.median(item[1]))
+    for name, values in ranked[:args.top]:
+        print(f"  {statistics.median(values):8.1f}ms  {name}")
+
+    if loaded:
+        print(f"\nLoaded at import time but expected to be lazy: {', '.join(sorted(loaded))}")
+        sys.exit(1)
+    print(f"\nNone of {', '.join(LAZY_MODULES)} loaded at import time")
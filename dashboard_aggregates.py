@@ -0,0 +1,159 @@
+"""
+SQL-side aggregation of a user's transactions for the dashboard.
+
+The dashboard calculators used to walk the full list of ORM objects one after
+another, and the budget and savings helpers each re-queried the table.
+``aggregate_transactions`` reads month and category totals from the
+``monthly_category_rollup`` table in O(months x categories), backfilling it
+on first read for users whose data predates the table. It then adds a
+windowed split for category trends and two small LIMIT/COUNT lookups
+against ``transaction``. The result is a :class:`TransactionAggregates`
+shared by every calculator.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import case, func
+
+from models import db, MonthlyCategoryRollup, Transaction
+from monthly_rollup import ensure_rollup
+
+logger = logging.getLogger(__name__)
+
+# Expenses above this amount are listed as "large" on the dashboard.
+LARGE_TRANSACTION_THRESHOLD = 100
+LARGE_TRANSACTION_LIMIT = 3
+# Expenses above this share of total income count against the health score.
+LARGE_EXPENSE_INCOME_SHARE = 0.1
+
+
+@dataclass
+class CategoryStats:
+    """Expense totals for one category."""
+    total: float = 0.0
+    count: int = 0
+    sum_squares: float = 0.0
+    # Sums of the older and newer half of the category's expenses by date.
+    first_half: float = 0.0
+    second_half: float = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        """Sample standard deviation recovered from the sum and sum of squares."""
+        if self.count < 2:
+            return 0.0
+        variance = (self.sum_squares - self.total * self.total / self.count) / (self.count - 1)
+        return max(variance, 0.0) ** 0.5
+
+
+@dataclass
+class TransactionAggregates:
+    """Totals shared by every dashboard calculator. Expenses are positive amounts."""
+    month_start: datetime
+    transaction_count: int = 0
+    total_income: float = 0.0
+    total_expenses: float = 0.0
+    month_income: float = 0.0
+    month_expenses: float = 0.0
+    categories: Set[str] = field(default_factory=set)
+    category_stats: Dict[str, CategoryStats] = field(default_factory=dict)
+    # {'YYYY-MM': {'total': float, 'categories': {category: float}}}
+    monthly: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Expenses per category dated on or after ``month_start``.
+    month_to_date_categories: Dict[str, float] = field(default_factory=dict)
+    large_expense_count: int = 0
+    large_transactions: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def category_totals(self) -> Dict[str, float]:
+        return {category: stats.total for category, stats in self.category_stats.items()}
+
+
+def _category_halves(user_id: int):
+    """Expense sums for the older and newer half of each category, split by date order."""
+    category = func.coalesce(Transaction.category, 'Uncategorized')
+    ranked = db.session.query(
+        category.label('category'),
+        Transaction.amount.label('amount'),
+        func.row_number().over(partition_by=category, order_by=(Transaction.date, Transaction.id)).label('rn'),
+        func.count().over(partition_by=category).label('cnt'),
+    ).filter(Transaction.user_id == user_id, Transaction.amount > 0).subquery()
+
+    in_first_half = ranked.c.rn * 2 <= ranked.c.cnt
+    return db.session.query(
+        ranked.c.category,
+        func.sum(case((in_first_half, ranked.c.amount), else_=0)),
+        func.sum(case((in_first_half, 0), else_=ranked.c.amount)),
+    ).group_by(ranked.c.category)
+
+
+def aggregate_transactions(user_id: int, now: Optional[datetime] = None) -> TransactionAggregates:
+    """Build the shared dashboard aggregates from the rollup plus a few small queries."""
+    month_start = (now or datetime.now()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    current_month = month_start.strftime('%Y-%m')
+    aggregates = TransactionAggregates(month_start=month_start)
+
+    ensure_rollup(user_id)
+    rollup = MonthlyCategoryRollup.query.filter(MonthlyCategoryRollup.user_id == user_id)\
+        .order_by(MonthlyCategoryRollup.month, MonthlyCategoryRollup.category)
+    for row in rollup:
+        month = row.month
+        aggregates.transaction_count += row.row_count
+        aggregates.total_income += row.income_total
+        if month == current_month:
+            aggregates.month_income += row.income_total
+            aggregates.month_expenses += row.expense_total
+        if row.category:
+            aggregates.categories.add(row.category)
+        if not row.expense_count:
+            continue
+
+        expenses = row.expense_total
+        aggregates.total_expenses += expenses
+        category = row.category or 'Uncategorized'
+        stats = aggregates.category_stats.setdefault(category, CategoryStats())
+        stats.total += expenses
+        stats.count += row.expense_count
+        stats.sum_squares += row.expense_sum_squares
+
+        month_data = aggregates.monthly.setdefault(month, {'total': 0, 'categories': {}})
+        month_data['total'] += expenses
+        month_data['categories'][category] = month_data['categories'].get(category, 0) + expenses
+
+        if month >= current_month:
+            aggregates.month_to_date_categories[category] = (
+                aggregates.month_to_date_categories.get(category, 0) + expenses
+            )
+
+    if not aggregates.transaction_count:
+        return aggregates
+
+    for category, first_half, second_half in _category_halves(user_id):
+        stats = aggregates.category_stats.get(category)
+        if stats is not None:
+            stats.first_half, stats.second_half = first_half or 0.0, second_half or 0.0
+
+    if aggregates.total_income > 0:
+        aggregates.large_expense_count = db.session.query(func.count(Transaction.id)).filter(
+            Transaction.user_id == user_id,
+            Transaction.amount > aggregates.total_income * LARGE_EXPENSE_INCOME_SHARE
+        ).scalar()
+
+    large = db.session.query(Transaction.name, Transaction.amount, Transaction.date).filter(
+        Transaction.user_id == user_id,
+        Transaction.amount > LARGE_TRANSACTION_THRESHOLD
+    ).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(LARGE_TRANSACTION_LIMIT)
+    aggregates.large_transactions = [
+        {'name': name or '', 'amount': amount, 'date': tx_date.strftime('%Y-%m-%d')}
+        for name, amount, tx_date in large
+    ]
+
+    logger.debug("Aggregated %d transactions for user %s", aggregates.transaction_count, user_id)
+    return aggregates
@@ -1,6 +1,11 @@
 import React from 'react';
 import { usePlaidLink } from 'react-plaid-link';
 
+const PENDING_JOB_STATUSES = ['queued', 'running', 'waiting'];
+const POLL_INTERVAL_MS = 1500;
+// Consecutive failed status polls tolerated before giving up.
+const MAX_POLL_MISSES = 20;
+
 interface PlaidLinkProps {
   onSuccess: () => void;
 }
@@ -36,13 +41,30 @@ export default function PlaidLink({ onSuccess }: PlaidLinkProps) {
         });
         
         if (exchangeResponse.ok) {
-          // Sync transactions after successful connection
-          const syncResponse = await fetch('/api/plaid/sync_transactions', {
-            method: 'POST',
-            credentials: 'include'
-          });
+          // The historical import runs in the background, waiting first for
+          // Plaid to pull the account's history; poll until it finishes.
+          const { sync_job } = await exchangeResponse.json();
+          let job = sync_job;
+          let misses = 0;
+          while (job && PENDING_JOB_STATUSES.includes(job.status) && misses < MAX_POLL_MISSES) {
+            await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+            try {
+              const jobResponse = await fetch(`/api/plaid/sync_jobs/${job.id}`, {
+                credentials: 'include'
+              });
+              if (!jobResponse.ok) {
+                // A 404 or 5xx can be transient; keep polling rather than failing the import
+                misses += 1;
+                continue;
+              }
+              job = await jobResponse.json();
+              misses = 0;
+            } catch (err) {
+              misses += 1;
+            }
+          }
 
-          if (syncResponse.ok) {
+          if (job && job.status === 'succeeded') {
             console.log('Transactions synced successfully');
             onSuccess();
           } else {
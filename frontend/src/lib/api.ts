@@ -40,11 +40,16 @@ export const plaid = {
 export const transactions = {
   getRecent: () => api.get('/transactions/recent'),
   getAll: (params?: {
-    page?: number;
-    per_page?: number;
+    cursor?: string;
+    limit?: number;
     start_date?: string;
     end_date?: string;
-  }) => api.get('/transactions', { params }),
+    category?: string[];
+    min_amount?: number;
+    max_amount?: number;
+    merchant?: string;
+    include_total?: boolean;
+  }) => api.get('/transactions', { params, paramsSerializer: { indexes: null } }),
   sync: () => api.post('/transactions/sync'),
 };
 
@@ -67,9 +67,9 @@ export const plaidApi = {
     }
   },
 
-  exchangePublicToken: async (publicToken: string): Promise<{ success: boolean }> => {
+  exchangePublicToken: async (publicToken: string): Promise<{ success: boolean; sync_job: { id: string; status: string } }> => {
     try {
-      const response = await api.post<{ success: boolean }>('/plaid/exchange_public_token', {
+      const response = await api.post<{ success: boolean; sync_job: { id: string; status: string } }>('/plaid/exchange_public_token', {
         public_token: publicToken,
       });
       return response;
@@ -30,24 +30,25 @@ export default function Transactions() {
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedCategory, setSelectedCategory] = useState('all');
   const [sortOrder, setSortOrder] = useState<'asc' | 'desc'>('desc');
-  const [page, setPage] = useState(1);
-  const [totalPages, setTotalPages] = useState(1);
+  // Cursor of each page visited so far; the last entry is the current page.
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [selectedTransaction, setSelectedTransaction] = useState<Transaction | null>(null);
   const [aiLoading, setAiLoading] = useState(false);
 
   useEffect(() => {
     fetchTransactions();
-  }, [page, sortOrder]);
+  }, [cursors, sortOrder]);
 
   const fetchTransactions = async () => {
     try {
       setLoading(true);
       const response = await transactions.getAll({
-        page,
-        per_page: 10,
+        cursor: cursors[cursors.length - 1],
+        limit: 10,
       });
       setTransactionList(response.data.transactions);
-      setTotalPages(response.data.total_pages);
+      setNextCursor(response.data.has_more ? response.data.next_cursor : null);
     } catch (error) {
       console.error('Error fetching transactions:', error);
     } finally {
@@ -219,15 +220,15 @@ export default function Transactions() {
               <div className="flex items-center justify-between px-4 py-3 bg-white border-t border-gray-200 sm:px-6">
                 <div className="flex justify-between flex-1">
                   <button
-                    onClick={() => setPage(p => Math.max(1, p - 1))}
-                    disabled={page === 1}
+                    onClick={() => setCursors(c => c.slice(0, -1))}
+                    disabled={cursors.length === 1}
                     className="relative inline-flex items-center px-4 py-2 border border-gray-300 text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
                   >
                     Previous
                   </button>
                   <button
-                    onClick={() => setPage(p => Math.min(totalPages, p + 1))}
-                    disabled={page === totalPages}
+                    onClick={() => nextCursor && setCursors(c => [...c, nextCursor])}
+                    disabled={!nextCursor}
                     className="ml-3 relative inline-flex items-center px-4 py-2 border border-gray-300 text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
                   >
                     Next
@@ -0,0 +1,262 @@
+"""
+Offline merchant-to-category classifier trained on already-categorized rows.
+
+Each uncategorized row is looked up first in the user's own history: the
+categories of their stored rows with the same ``transaction.merchant_key``,
+counted in one grouped query per sync batch. Other users' labels are only
+consulted when that is not confident, through a shared classifier fitted on
+``merchant_name`` alone. Raw ``name`` often holds personal payee text, such
+as person-to-person transfers, so it never leaves the user's own account.
+The shared classifier has two parts:
+
+* an index from normalized merchant name to category counts, which settles
+  the common case of a merchant seen before, and
+* a sparse token / character-trigram vote for names not in the index, with
+  each feature weighted by its inverse document frequency.
+
+:func:`categorize_transactions` runs over a whole sync batch before it is
+written. It fills ``Uncategorized`` rows whose prediction clears
+MERCHANT_CLASSIFIER_MIN_CONFIDENCE, and sends only the remainder to the LLM
+in one batched call. The shared classifier is cached per process and is
+rebuilt every MERCHANT_CLASSIFIER_TTL seconds.
+"""
+
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+
+from models import db, Transaction
+
+logger = logging.getLogger(__name__)
+
+UNCATEGORIZED = 'Uncategorized'
+MIN_CONFIDENCE = float(os.getenv('MERCHANT_CLASSIFIER_MIN_CONFIDENCE', '0.6'))
+CLASSIFIER_TTL = int(os.getenv('MERCHANT_CLASSIFIER_TTL', '3600'))
+# Most recent categorized rows used for training.
+MAX_TRAINING_ROWS = int(os.getenv('MERCHANT_CLASSIFIER_MAX_ROWS', '200000'))
+
+_NOISE = re.compile(r"#?\d[\d\-/.*]*|[^a-z&'\s]")
+_SPACES = re.compile(r'\s+')
+# Card processor and bank prefixes that say nothing about the merchant.
+_PREFIXES = ('sq ', 'tst ', 'pos ', 'paypal ', 'pp ', 'ach ', 'debit ', 'purchase ',
+             'checkcard ', 'recurring ', 'card ')
+
+
+def normalize_merchant(name: Optional[str]) -> str:
+    """Lowercase, drop store numbers, punctuation and processor prefixes."""
+    if not name:
+        return ''
+    text = _SPACES.sub(' ', _NOISE.sub(' ', name.lower())).strip()
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in _PREFIXES:
+            if text.startswith(prefix):
+                text = text[len(prefix):]
+                stripped = True
+    return text
+
+
+@lru_cache(maxsize=50000)
+def merchant_key(name: Optional[str], merchant_name: Optional[str] = None) -> str:
+    """Key for a transaction's merchant: the normalized merchant, falling back to the name."""
+    return normalize_merchant(merchant_name) or normalize_merchant(name)
+
+
+def _features(text: str) -> List[str]:
+    tokens = [t for t in text.split() if len(t) > 1]
+    padded = f" {text} "
+    grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return [f"w:{t}" for t in tokens] + [f"g:{g}" for g in grams]
+
+
+@dataclass
+class Prediction:
+    category: Optional[str]
+    confidence: float
+    source: str  # 'user', 'merchant', 'ngram' or 'none'
+
+
+def _index_prediction(counts: Optional[Counter], source: str) -> Optional[Prediction]:
+    """The most common category among ``counts``, or None if there are none."""
+    if not counts:
+        return None
+    category, top = counts.most_common(1)[0]
+    # One pseudo-count of doubt, so a merchant seen once is not trusted outright.
+    return Prediction(category, top / (sum(counts.values()) + 1), source)
+
+
+class MerchantClassifier:
+    """Merchant-name index with an n-gram fallback; fit once, predict in bulk."""
+
+    def __init__(self):
+        self.merchants: Dict[str, Counter] = defaultdict(Counter)
+        self.features: Dict[str, Counter] = defaultdict(Counter)
+        self.documents = 0
+
+    def fit(self, rows: Iterable[Tuple[Optional[str], Optional[str]]]) -> 'MerchantClassifier':
+        """Train on (merchant_name, category) pairs; uncategorized or unnamed rows are ignored."""
+        for merchant_name, category in rows:
+            key = normalize_merchant(merchant_name)
+            if not key or not category or category == UNCATEGORIZED:
+                continue
+            self.merchants[key][category] += 1
+            for feature in set(_features(key)):
+                self.features[feature][category] += 1
+            self.documents += 1
+        return self
+
+    def __len__(self) -> int:
+        return self.documents
+
+    def predict(self, name: Optional[str], merchant_name: Optional[str] = None) -> Prediction:
+        for key in (normalize_merchant(merchant_name), normalize_merchant(name)):
+            prediction = _index_prediction(self.merchants.get(key) if key else None, 'merchant')
+            if prediction is not None:
+                return prediction
+
+        features = _features(normalize_merchant(merchant_name or name))
+        if not features or not self.documents:
+            return Prediction(None, 0.0, 'none')
+
+        scores: Dict[str, float] = defaultdict(float)
+        known = 0
+        for feature in features:
+            counts = self.features.get(feature)
+            if not counts:
+                continue
+            known += 1
+            total = sum(counts.values())
+            weight = math.log(1 + self.documents / total)
+            for category, count in counts.items():
+                scores[category] += weight * count / total
+        if not scores:
+            return Prediction(None, 0.0, 'none')
+
+        category = max(scores, key=scores.get)
+        share = scores[category] / sum(scores.values())
+        return Prediction(category, share * known / len(features), 'ngram')
+
+    def predict_many(self, rows: Iterable[Tuple[Optional[str], Optional[str]]]) -> List[Prediction]:
+        """Predict (name, merchant_name) pairs, computing each distinct pair once."""
+        memo: Dict[Tuple[Optional[str], Optional[str]], Prediction] = {}
+        predictions = []
+        for row in rows:
+            prediction = memo.get(row)
+            if prediction is None:
+                prediction = memo[row] = self.predict(*row)
+            predictions.append(prediction)
+        return predictions
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def user_merchant_index(user_id: int, keys: Set[str]) -> Dict[str, Counter]:
+    """Category counts of a user's own categorized rows, for the given merchant keys."""
+    index: Dict[str, Counter] = defaultdict(Counter)
+    for chunk in _chunks(sorted(k for k in keys if k), 500):
+        rows = db.session.query(Transaction.merchant_key, Transaction.category, func.count())\
+            .filter(Transaction.user_id == user_id,
+                    Transaction.merchant_key.in_(chunk),
+                    Transaction.category.isnot(None),
+                    Transaction.category != UNCATEGORIZED)\
+            .group_by(Transaction.merchant_key, Transaction.category)
+        for key, category, count in rows:
+            index[key][category] = count
+    return index
+
+
+def build_classifier(max_rows: int = MAX_TRAINING_ROWS) -> MerchantClassifier:
+    """Fit the shared classifier on the merchant names of the most recent categorized transactions."""
+    started = time.perf_counter()
+    rows = db.session.query(Transaction.merchant_name, Transaction.category)\
+        .filter(Transaction.merchant_name.isnot(None),
+                Transaction.category.isnot(None),
+                Transaction.category != UNCATEGORIZED)\
+        .order_by(Transaction.id.desc())\
+        .limit(max_rows)\
+        .yield_per(5000)
+    classifier = MerchantClassifier().fit(rows)
+    logger.info("Fitted merchant classifier on %d rows (%d merchants) in %.0fms",
+                len(classifier), len(classifier.merchants), (time.perf_counter() - started) * 1000)
+    return classifier
+
+
+_classifier: Optional[MerchantClassifier] = None
+_classifier_built_at = 0.0
+_classifier_pid: Optional[int] = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> MerchantClassifier:
+    """Process-wide classifier, refitted once it is older than MERCHANT_CLASSIFIER_TTL."""
+    global _classifier, _classifier_built_at, _classifier_pid
+    pid = os.getpid()
+    if _classifier is None or _classifier_pid != pid or time.time() - _classifier_built_at > CLASSIFIER_TTL:
+        with _classifier_lock:
+            if _classifier is None or _classifier_pid != pid or time.time() - _classifier_built_at > CLASSIFIER_TTL:
+                _classifier = build_classifier()
+                _classifier_built_at = time.time()
+                _classifier_pid = pid
+    return _classifier
+
+
+def categorize_transactions(user_id: int, transactions: List[Dict[str, Any]], advisor=None,
+                            min_confidence: float = MIN_CONFIDENCE) -> Dict[str, int]:
+    """Fill in the category of a user's uncategorized processed transactions, in place.
+
+    The user's own history is tried first, then the shared classifier. Rows
+    either is confident about are labelled directly. If an
+    ``AIFinancialAdvisor`` is given, the rest go to it in one batched request.
+    Returns how many rows each stage resolved.
+    """
+    pending = [t for t in transactions if not t.get('category') or t.get('category') == UNCATEGORIZED]
+    stats = {'uncategorized': len(pending), 'user': 0, 'local': 0, 'llm': 0}
+    if not pending:
+        return stats
+
+    keys = [merchant_key(t.get('name'), t.get('merchant_name')) for t in pending]
+    own = user_merchant_index(user_id, set(keys))
+    predictions = [_index_prediction(own.get(key), 'user') for key in keys]
+    unsure = [i for i, p in enumerate(predictions) if p is None or p.confidence < min_confidence]
+    if unsure:
+        shared = get_classifier().predict_many((pending[i].get('name'), pending[i].get('merchant_name')) for i in unsure)
+        for i, prediction in zip(unsure, shared):
+            if predictions[i] is None or prediction.confidence > predictions[i].confidence:
+                predictions[i] = prediction
+
+    low_confidence = []
+    for transaction, prediction in zip(pending, predictions):
+        if prediction.category and prediction.confidence >= min_confidence:
+            transaction['category'] = prediction.category
+            stats['local'] += 1
+            if prediction.source == 'user':
+                stats['user'] += 1
+        else:
+            low_confidence.append((transaction, prediction))
+
+    if advisor is not None and low_confidence:
+        analyses = advisor.enhance_transaction_categorizations([
+            (t.get('merchant_name') or t.get('name') or '', p.category or UNCATEGORIZED)
+            for t, p in low_confidence
+        ])
+        for (transaction, _), analysis in zip(low_confidence, analyses):
+            if analysis is not None and analysis.category:
+                transaction['category'] = analysis.category
+                stats['llm'] += 1
+
+    logger.info("Categorized %d/%d uncategorized transactions locally (%d from the user's history), %d via LLM",
+                stats['local'], stats['uncategorized'], stats['user'], stats['llm'])
+    return stats
@@ -0,0 +1,56 @@
+"""Add per-user indexes for the hot query shapes
+
+Revision ID: 3f1c2a7d9b10
+Revises: a0c5e1f4d2b7
+Create Date: 2026-10-17 00:00:00
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY, so
+writes to ``transaction`` keep flowing while they build. That cannot run
+inside a transaction, hence the autocommit block.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7d9b10'
+down_revision = 'a0c5e1f4d2b7'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns), matching the declarations in models.py.
+INDEXES = [
+    ('ix_transaction_user_date', 'transaction', ['user_id', 'date']),
+    ('ix_transaction_user_category_date', 'transaction', ['user_id', 'category', 'date', 'amount']),
+    ('ix_budget_user_id', 'budget', ['user_id']),
+    ('ix_savings_goal_user_id', 'savings_goal', ['user_id']),
+    ('ix_user_income_user_id', 'user_income', ['user_id']),
+    ('ix_custom_income_user_id', 'custom_income', ['user_id']),
+    ('ix_user_category_preference_user_id', 'user_category_preference', ['user_id']),
+]
+
+
+def _invalid_indexes(bind):
+    """Indexes left INVALID by an interrupted concurrent build; IF NOT EXISTS would skip them."""
+    if bind.dialect.name != 'postgresql':
+        return set()
+    rows = bind.execute(sa.text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+    ), {'names': [name for name, _, _ in INDEXES]})
+    return {name for name, in rows}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        invalid = _invalid_indexes(op.get_bind())
+        for name, table, columns in INDEXES:
+            if name in invalid:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,117 @@
+"""Baseline schema
+
+Revision ID: a0c5e1f4d2b7
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+The tables as they stood before the project adopted migrations. Databases
+created earlier by ``db.create_all()`` already have them, so each table is
+only created if it is missing, and ``flask db upgrade`` works on both.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0c5e1f4d2b7'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(name, *columns):
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def _timestamps():
+    return [sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True)]
+
+
+def upgrade():
+    _create_table(
+        'user',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('username', sa.String(length=80), nullable=False, unique=True),
+        sa.Column('email', sa.String(length=120), nullable=False, unique=True),
+        sa.Column('password_hash', sa.String(length=128), nullable=True),
+        sa.Column('plaid_access_token', sa.String(length=200), nullable=True),
+        sa.Column('plaid_item_id', sa.String(length=200), nullable=True),
+        sa.Column('has_plaid_connection', sa.Boolean(), nullable=True),
+        *_timestamps(),
+    )
+    if not sa.inspect(op.get_bind()).has_table('transaction'):
+        op.create_table(
+            'transaction',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('transaction_id', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('account_id', sa.String(length=100), nullable=True),
+            sa.Column('date', sa.DateTime(), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            sa.Column('merchant_name', sa.String(length=200), nullable=True),
+            sa.Column('pending', sa.Boolean(), server_default='false', nullable=True),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.current_timestamp(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.func.current_timestamp(), nullable=True),
+        )
+        op.create_index('ix_transaction_date', 'transaction', ['date'])
+    _create_table(
+        'user_income',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('income_type', sa.String(length=100), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('frequency', sa.String(length=20), nullable=False),
+        sa.Column('start_date', sa.DateTime(), nullable=True),
+        sa.Column('end_date', sa.DateTime(), nullable=True),
+        *_timestamps(),
+    )
+    _create_table(
+        'custom_income',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('source_name', sa.String(length=100), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('frequency', sa.String(length=20), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=False),
+        sa.Column('start_date', sa.DateTime(), nullable=True),
+        sa.Column('end_date', sa.DateTime(), nullable=True),
+        *_timestamps(),
+    )
+    _create_table(
+        'savings_goal',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('goal_name', sa.String(length=100), nullable=False),
+        sa.Column('target_amount', sa.Float(), nullable=False),
+        sa.Column('current_amount', sa.Float(), nullable=True),
+        sa.Column('due_date', sa.DateTime(), nullable=True),
+        *_timestamps(),
+    )
+    _create_table(
+        'budget',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('budget_limit', sa.Float(), nullable=False),
+        *_timestamps(),
+    )
+    _create_table(
+        'user_category_preference',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('preference_score', sa.Float(), nullable=False),
+        *_timestamps(),
+    )
+
+
+def downgrade():
+    for name in ('user_category_preference', 'budget', 'savings_goal', 'custom_income', 'user_income'):
+        op.drop_table(name)
+    op.drop_index('ix_transaction_date', table_name='transaction')
+    op.drop_table('transaction')
+    op.drop_table('user')
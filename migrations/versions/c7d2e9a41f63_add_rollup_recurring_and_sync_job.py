@@ -0,0 +1,102 @@
+"""Add rollup, recurring-charge and sync-job tables
+
+Revision ID: c7d2e9a41f63
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-17 00:00:00
+
+Adds ``monthly_category_rollup``, ``recurring_charge`` and ``sync_job``,
+plus ``user.plaid_transactions_cursor`` and ``user.data_version``. Tables
+and columns that ``db.create_all()`` or the old /api/debug/fix-schema route
+already added are skipped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e9a41f63'
+down_revision = '3f1c2a7d9b10'
+branch_labels = None
+depends_on = None
+
+
+def _user_fk():
+    return sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    user_columns = {column['name'] for column in inspector.get_columns('user')}
+    with op.batch_alter_table('user') as batch:
+        if 'plaid_transactions_cursor' not in user_columns:
+            batch.add_column(sa.Column('plaid_transactions_cursor', sa.Text(), nullable=True))
+        if 'data_version' not in user_columns:
+            batch.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+    if not inspector.has_table('monthly_category_rollup'):
+        op.create_table(
+            'monthly_category_rollup',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            _user_fk(),
+            sa.Column('month', sa.String(length=7), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('row_count', sa.Integer(), nullable=False),
+            sa.Column('income_total', sa.Float(), nullable=False),
+            sa.Column('expense_count', sa.Integer(), nullable=False),
+            sa.Column('expense_total', sa.Float(), nullable=False),
+            sa.Column('expense_min', sa.Float(), nullable=True),
+            sa.Column('expense_max', sa.Float(), nullable=True),
+            sa.Column('expense_sum_squares', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('user_id', 'month', 'category', name='uq_monthly_category_rollup'),
+        )
+
+    if not inspector.has_table('recurring_charge'):
+        op.create_table(
+            'recurring_charge',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            _user_fk(),
+            sa.Column('merchant_key', sa.String(length=200), nullable=False),
+            sa.Column('merchant_name', sa.String(length=200), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            sa.Column('period', sa.String(length=20), nullable=False),
+            sa.Column('interval_days', sa.Float(), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('typical_amount', sa.Float(), nullable=False),
+            sa.Column('amount_change', sa.Float(), nullable=False),
+            sa.Column('occurrences', sa.Integer(), nullable=False),
+            sa.Column('first_date', sa.DateTime(), nullable=False),
+            sa.Column('last_date', sa.DateTime(), nullable=False),
+            sa.Column('next_expected', sa.DateTime(), nullable=False),
+            sa.Column('confidence', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.UniqueConstraint('user_id', 'merchant_key', name='uq_recurring_charge'),
+        )
+
+    if not inspector.has_table('sync_job'):
+        op.create_table(
+            'sync_job',
+            sa.Column('id', sa.String(length=32), primary_key=True),
+            _user_fk(),
+            sa.Column('item_id', sa.String(length=200), nullable=False),
+            sa.Column('kind', sa.String(length=30), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('result', sa.JSON(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_sync_job_user_id', 'sync_job', ['user_id'])
+        op.create_index('ix_sync_job_item_id', 'sync_job', ['item_id'])
+
+
+def downgrade():
+    op.drop_index('ix_sync_job_item_id', table_name='sync_job')
+    op.drop_index('ix_sync_job_user_id', table_name='sync_job')
+    op.drop_table('sync_job')
+    op.drop_table('recurring_charge')
+    op.drop_table('monthly_category_rollup')
+    with op.batch_alter_table('user') as batch:
+        batch.drop_column('data_version')
+        batch.drop_column('plaid_transactions_cursor')
@@ -0,0 +1,39 @@
+"""Add transaction.merchant_key
+
+Revision ID: e4b8f2c6a913
+Revises: c7d2e9a41f63
+Create Date: 2026-10-17 00:00:00
+
+The normalized merchant of each transaction, indexed with user_id so
+recurring-charge refreshes can select a few merchants' rows in SQL.
+Existing rows are left NULL; recurring_charges.ensure_merchant_keys fills
+them per user on first use. The index is built concurrently on PostgreSQL,
+as in 3f1c2a7d9b10.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8f2c6a913'
+down_revision = 'c7d2e9a41f63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('transaction')}
+    if 'merchant_key' not in columns:
+        with op.batch_alter_table('transaction') as batch:
+            batch.add_column(sa.Column('merchant_key', sa.String(length=200), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_transaction_user_merchant_key', 'transaction', ['user_id', 'merchant_key'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_transaction_user_merchant_key', table_name='transaction',
+                      postgresql_concurrently=True, if_exists=True)
+    with op.batch_alter_table('transaction') as batch:
+        batch.drop_column('merchant_key')
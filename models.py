@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from extensions import db
@@ -15,6 +15,9 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(128))
     plaid_access_token = db.Column(db.String(200))
     plaid_item_id = db.Column(db.String(200))
+    plaid_transactions_cursor = db.Column(db.Text)
+    # Bumped whenever transactions, budgets or savings goals change; keys response_cache entries.
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     has_plaid_connection = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -37,7 +40,16 @@ class User(UserMixin, db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transaction'
-    
+    __table_args__ = (
+        # Per-user date ranges and ORDER BY date DESC LIMIT n.
+        db.Index('ix_transaction_user_date', 'user_id', 'date'),
+        # Per-user category scans in date order; amount is included so the
+        # dashboard's category windows are answered from the index alone.
+        db.Index('ix_transaction_user_category_date', 'user_id', 'category', 'date', 'amount'),
+        # Per-user merchant lookups by recurring_charges and merchant_classifier.
+        db.Index('ix_transaction_user_merchant_key', 'user_id', 'merchant_key'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     transaction_id = db.Column(db.String(100), unique=True, nullable=False)
@@ -47,6 +59,8 @@ class Transaction(db.Model):
     amount = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(100), nullable=True)
     merchant_name = db.Column(db.String(200), nullable=True)
+    # merchant_classifier.merchant_key(name, merchant_name); '' if neither normalizes to anything
+    merchant_key = db.Column(db.String(200), nullable=True)
     pending = db.Column(db.Boolean, server_default='false')
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
@@ -81,7 +95,7 @@ class Transaction(db.Model):
 class UserIncome(db.Model):
     __tablename__ = 'user_income'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     income_type = db.Column(db.String(100), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     frequency = db.Column(db.String(20), nullable=False)
@@ -103,7 +117,7 @@ class UserIncome(db.Model):
 class CustomIncome(db.Model):
     __tablename__ = 'custom_income'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     source_name = db.Column(db.String(100), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     frequency = db.Column(db.String(20), nullable=False)
@@ -129,7 +143,7 @@ class CustomIncome(db.Model):
 class SavingsGoal(db.Model):
     __tablename__ = 'savings_goal'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     goal_name = db.Column(db.String(100), nullable=False)
     target_amount = db.Column(db.Float, nullable=False)
     current_amount = db.Column(db.Float, default=0.0)
@@ -152,7 +166,7 @@ class SavingsGoal(db.Model):
 class Budget(db.Model):
     __tablename__ = 'budget'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     category = db.Column(db.String(100), nullable=False)
     budget_limit = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now(UTC))
@@ -171,7 +185,7 @@ class Budget(db.Model):
 class UserCategoryPreference(db.Model):
     __tablename__ = 'user_category_preference'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     category = db.Column(db.String(100), nullable=False)
     preference_score = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now(UTC))
@@ -184,4 +198,111 @@ class UserCategoryPreference(db.Model):
             'category': self.category,
             'preference_score': self.preference_score,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+
+class MonthlyCategoryRollup(db.Model):
+    """Per-user monthly totals by category, maintained by monthly_rollup on ingest and delete."""
+    __tablename__ = 'monthly_category_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'month', 'category', name='uq_monthly_category_rollup'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM'
+    category = db.Column(db.String(100), nullable=False, default='')  # '' for uncategorized rows
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    income_total = db.Column(db.Float, nullable=False, default=0.0)
+    expense_count = db.Column(db.Integer, nullable=False, default=0)
+    expense_total = db.Column(db.Float, nullable=False, default=0.0)
+    expense_min = db.Column(db.Float, nullable=True)
+    expense_max = db.Column(db.Float, nullable=True)
+    expense_sum_squares = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'month': self.month,
+            'category': self.category or 'Uncategorized',
+            'row_count': self.row_count,
+            'income_total': self.income_total,
+            'expense_count': self.expense_count,
+            'expense_total': self.expense_total,
+            'expense_min': self.expense_min,
+            'expense_max': self.expense_max,
+            'expense_sum_squares': self.expense_sum_squares
+        }
+
+class RecurringCharge(db.Model):
+    """A detected subscription or bill per user and merchant, maintained by recurring_charges on ingest and delete."""
+    __tablename__ = 'recurring_charge'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'merchant_key', name='uq_recurring_charge'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    merchant_key = db.Column(db.String(200), nullable=False)  # normalize_merchant() of the merchant
+    merchant_name = db.Column(db.String(200), nullable=False)
+    category = db.Column(db.String(100), nullable=True)
+    period = db.Column(db.String(20), nullable=False)  # 'weekly', 'biweekly', 'monthly', 'quarterly' or 'annual'
+    interval_days = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Float, nullable=False)  # most recent charge
+    typical_amount = db.Column(db.Float, nullable=False)
+    amount_change = db.Column(db.Float, nullable=False, default=0.0)  # relative change, first to latest charge
+    occurrences = db.Column(db.Integer, nullable=False)
+    first_date = db.Column(db.DateTime, nullable=False)
+    last_date = db.Column(db.DateTime, nullable=False)
+    next_expected = db.Column(db.DateTime, nullable=False)
+    confidence = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'merchant': self.merchant_name,
+            'category': self.category or 'Uncategorized',
+            'period': self.period,
+            'interval_days': round(self.interval_days, 1),
+            'amount': self.amount,
+            'typical_amount': self.typical_amount,
+            'amount_change': round(self.amount_change, 4),
+            'monthly_cost': round(self.amount * 30.44 / self.interval_days, 2),
+            'occurrences': self.occurrences,
+            'first_date': self.first_date.strftime('%Y-%m-%d'),
+            'last_date': self.last_date.strftime('%Y-%m-%d'),
+            'next_expected': self.next_expected.strftime('%Y-%m-%d'),
+            # Lapsed once a charge is half a period overdue.
+            'active': self.next_expected + timedelta(days=self.interval_days / 2) >= datetime.utcnow(),
+            'confidence': self.confidence
+        }
+
+
+class SyncJob(db.Model):
+    """Status of a tracked background Plaid sync, readable from any worker process."""
+    __tablename__ = 'sync_job'
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    item_id = db.Column(db.String(200), nullable=False, index=True)
+    kind = db.Column(db.String(30), nullable=False)
+    # 'queued', 'running', 'waiting' (for Plaid's initial pull), 'succeeded' or 'failed'
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    result = db.Column(db.JSON, nullable=True)  # IngestResult.to_dict(), summed over runs
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
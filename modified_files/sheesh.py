@@ -194,12 +194,14 @@ def recent_transactions():
         .limit(5)\
         .all()
     
-    # Add AI categorization for uncategorized transactions
-    for transaction in transactions:
-        if transaction.category == 'Uncategorized':
-            advisor = AIFinancialAdvisor()
-            ai_category = advisor.enhance_transaction_categorization(transaction.name)
-            transaction.ai_category = ai_category
+    # Add AI categorization for uncategorized transactions, in one batched request
+    uncategorized = [t for t in transactions if t.category == 'Uncategorized']
+    if uncategorized:
+        analyses = ai_advisor.enhance_transaction_categorizations(
+            [(t.name, t.category) for t in uncategorized]
+        )
+        for transaction, analysis in zip(uncategorized, analyses):
+            transaction.ai_category = analysis.category if analysis else None
     
     transaction_dicts = [t.to_dict() for t in transactions]
     logger.debug(f"Recent Transactions for User {current_user.id}: {transaction_dicts}")
@@ -0,0 +1,211 @@
+"""
+Maintenance of the ``monthly_category_rollup`` table.
+
+Each row holds one user's totals for one month and category: row count,
+income, and the expense count, sum, min, max and sum of squares. Analytics
+read these rows in O(months x categories) instead of scanning raw
+transactions.
+
+Ingest and delete paths call :func:`refresh_rollup` with the months they
+touched. Only those months are recomputed, with one grouped query over the
+date ranges they cover in ``transaction``. Recomputing a month, rather than
+adding deltas, keeps min and max exact when rows are modified or removed.
+Writers take :func:`lock_user` first, so a webhook sync and a request-thread
+sync for the same user cannot interleave their delete and insert.
+
+Readers call :func:`ensure_rollup`, which backfills a user who has
+transactions but no rollup rows yet (data from before the table existed).
+:func:`rebuild_all` backfills everyone up front.
+"""
+
+import argparse
+import logging
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, func, or_
+
+from models import db, MonthlyCategoryRollup, Transaction, User
+
+logger = logging.getLogger(__name__)
+
+
+def month_of(value) -> str:
+    """'YYYY-MM' for a date, datetime or ISO date string."""
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m')
+    return str(value)[:7]
+
+
+def month_key(column):
+    """SQL expression formatting a timestamp column as 'YYYY-MM' on the bound dialect."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return func.to_char(func.date_trunc('month', column), 'YYYY-MM')
+    if dialect == 'mysql':
+        return func.date_format(column, '%Y-%m')
+    return func.strftime('%Y-%m', column)
+
+
+def _month_start(month: str) -> datetime:
+    year, month_number = map(int, month.split('-'))
+    return datetime(year, month_number, 1)
+
+
+def _next_month_start(month: str) -> datetime:
+    year, month_number = map(int, month.split('-'))
+    return datetime(year + month_number // 12, month_number % 12 + 1, 1)
+
+
+def lock_user(user_id: int):
+    """Serialize a user's derived-table writers until the current transaction ends.
+
+    Takes a row lock on the user (SELECT ... FOR UPDATE) on databases that
+    support it. SQLite already allows only one writer at a time.
+    """
+    db.session.query(User.id).filter(User.id == user_id).with_for_update().scalar()
+
+
+def _month_runs(months: List[str]) -> List[Tuple[str, str]]:
+    """Sorted months grouped into (first, last) runs of consecutive months."""
+    runs = []
+    for month in months:
+        if runs and _next_month_start(runs[-1][1]) == _month_start(month):
+            runs[-1] = (runs[-1][0], month)
+        else:
+            runs.append((month, month))
+    return runs
+
+
+def refresh_rollup(user_id: int, months: Iterable[str]) -> int:
+    """Recompute a user's rollup rows for exactly ``months``.
+
+    The caller owns the session and commits together with the transaction
+    writes that made the months stale. Returns the number of rows written.
+    """
+    months = sorted({m for m in months if m})
+    if not months:
+        return 0
+
+    lock_user(user_id)
+    rollup = MonthlyCategoryRollup.query.filter(
+        MonthlyCategoryRollup.user_id == user_id,
+        MonthlyCategoryRollup.month.in_(months)
+    )
+    in_months = or_(*[
+        and_(Transaction.date >= _month_start(first), Transaction.date < _next_month_start(last))
+        for first, last in _month_runs(months)
+    ])
+    return _replace_rows(user_id, rollup, in_months)
+
+
+def rebuild_rollup(user_id: int) -> int:
+    """Recompute every rollup row for a user from scratch."""
+    lock_user(user_id)
+    rollup = MonthlyCategoryRollup.query.filter(MonthlyCategoryRollup.user_id == user_id)
+    return _replace_rows(user_id, rollup)
+
+
+def ensure_rollup(user_id: int) -> bool:
+    """Backfill and commit a user's rollup if they have transactions but no rollup rows.
+
+    Returns True if it rebuilt. Call it before reading the rollup; once a
+    user has rows it costs one indexed lookup.
+    """
+    def has_rows():
+        return db.session.query(MonthlyCategoryRollup.id)\
+            .filter(MonthlyCategoryRollup.user_id == user_id).first() is not None
+
+    if has_rows():
+        return False
+    if db.session.query(Transaction.id).filter(Transaction.user_id == user_id).first() is None:
+        return False
+
+    lock_user(user_id)
+    # Another request may have backfilled while this one waited for the lock.
+    if has_rows():
+        db.session.commit()
+        return False
+    written = rebuild_rollup(user_id)
+    db.session.commit()
+    logger.info("Backfilled %d rollup rows for user %s", written, user_id)
+    return True
+
+
+def _replace_rows(user_id: int, rollup, *date_filters) -> int:
+    rollup.delete(synchronize_session=False)
+
+    expense = Transaction.amount > 0
+    month = month_key(Transaction.date).label('month')
+    category = func.coalesce(Transaction.category, '').label('category')
+    grouped = db.session.query(
+        month,
+        category,
+        func.count(Transaction.id),
+        func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0)),
+        func.count(case((expense, 1))),
+        func.sum(case((expense, Transaction.amount), else_=0)),
+        func.min(case((expense, Transaction.amount))),
+        func.max(case((expense, Transaction.amount))),
+        func.sum(case((expense, Transaction.amount * Transaction.amount), else_=0)),
+    ).filter(Transaction.user_id == user_id, *date_filters).group_by(month, category)
+
+    rows = [
+        {
+            'user_id': user_id,
+            'month': month_value,
+            'category': category_value,
+            'row_count': row_count,
+            'income_total': income or 0.0,
+            'expense_count': expense_count,
+            'expense_total': expense_total or 0.0,
+            'expense_min': expense_min,
+            'expense_max': expense_max,
+            'expense_sum_squares': sum_squares or 0.0,
+            'updated_at': datetime.utcnow()
+        }
+        for (month_value, category_value, row_count, income, expense_count,
+             expense_total, expense_min, expense_max, sum_squares) in grouped
+    ]
+    if rows:
+        db.session.execute(MonthlyCategoryRollup.__table__.insert(), rows)
+    return len(rows)
+
+
+def transaction_months(user_id: int, transaction_ids: Iterable[str]) -> Set[str]:
+    """Months of the given stored transactions, looked up before they change."""
+    ids = list(transaction_ids)
+    if not ids:
+        return set()
+    dates = db.session.query(Transaction.date).filter(
+        Transaction.user_id == user_id,
+        Transaction.transaction_id.in_(ids)
+    )
+    return {month_of(tx_date) for tx_date, in dates}
+
+
+def rebuild_all(user_id: Optional[int] = None) -> int:
+    """Backfill the rollup for one user, or every user with transactions."""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [uid for uid, in db.session.query(User.id).filter(User.transactions.any())]
+
+    written = 0
+    for uid in user_ids:
+        written += rebuild_rollup(uid)
+        db.session.commit()
+    logger.info("Rebuilt %d rollup rows for %d users", written, len(user_ids))
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the monthly_category_rollup table.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user.")
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        print(f"Wrote {rebuild_all(args.user_id)} rollup rows")
@@ -1,45 +1,166 @@
-from plaid.api import plaid_api
-from plaid.model.transactions_get_request import TransactionsGetRequest
-from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
-from plaid.model.link_token_create_request import LinkTokenCreateRequest
-from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-from plaid.model.products import Products
-from plaid.model.country_code import CountryCode
-from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
-from plaid.configuration import Configuration
-from plaid.api_client import ApiClient
+# The Plaid SDK takes a few hundred milliseconds to import, so it is imported
+# inside the functions that call it rather than when a web worker starts.
 from datetime import datetime, timedelta
+import hashlib
+import hmac
+import json
 import os
 import logging
-from typing import List, Dict, Any
+import random
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+import jwt
 
 logger = logging.getLogger(__name__)
 
+# Largest page Plaid accepts for /transactions/get and /transactions/sync.
+TRANSACTIONS_GET_PAGE_SIZE = 500
+TRANSACTIONS_SYNC_PAGE_SIZE = 500
+
+# Transient Plaid failures that are retried with exponential backoff.
+RETRYABLE_ERROR_CODES = {
+    'PRODUCT_NOT_READY',
+    'RATE_LIMIT_EXCEEDED',
+    'INTERNAL_SERVER_ERROR',
+    'PLANNED_MAINTENANCE',
+    'INSTITUTION_DOWN',
+    'INSTITUTION_NOT_RESPONDING',
+}
+PLAID_MAX_RETRIES = int(os.getenv('PLAID_MAX_RETRIES', '4'))
+PLAID_RETRY_BASE_DELAY = float(os.getenv('PLAID_RETRY_BASE_DELAY', '1.0'))
+# transactions_update_status while Plaid is still pulling a new item's first
+# 30 days; /transactions/sync returns empty pages rather than an error then.
+UPDATE_STATUS_NOT_READY = 'NOT_READY'
+
+# Times a /transactions/sync run restarts after the item changed mid-pagination.
+PLAID_SYNC_MAX_RESTARTS = int(os.getenv('PLAID_SYNC_MAX_RESTARTS', '3'))
+
+# Shared connection pool and per-call timeouts for the process-wide client.
+PLAID_POOL_SIZE = int(os.getenv('PLAID_POOL_SIZE', '10'))
+PLAID_CONNECT_TIMEOUT = float(os.getenv('PLAID_CONNECT_TIMEOUT', '5'))
+PLAID_READ_TIMEOUT = float(os.getenv('PLAID_READ_TIMEOUT', '30'))
+
+# Oldest Plaid-Verification token accepted, in seconds, as Plaid recommends.
+WEBHOOK_MAX_AGE = 5 * 60
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every rate-limited Plaid call in the process."""
+
+    def __init__(self, per_minute: float, burst: Optional[int] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or max(1, int(self.rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request slot is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+_rate_limiter: Optional[RateLimiter] = None
+
+def set_rate_limit(per_minute: Optional[float], burst: Optional[int] = None):
+    """Cap Plaid calls made through call_with_backoff; None removes the cap."""
+    global _rate_limiter
+    _rate_limiter = RateLimiter(per_minute, burst) if per_minute else None
+
+if os.getenv('PLAID_RATE_LIMIT_PER_MINUTE'):
+    set_rate_limit(float(os.getenv('PLAID_RATE_LIMIT_PER_MINUTE')))
+
+_pooled_client_class = None
+
+def _pooled_api_client(configuration, request_timeout):
+    """ApiClient that applies a default (connect, read) timeout to every call."""
+    global _pooled_client_class
+    if _pooled_client_class is None:
+        from plaid.api_client import ApiClient
+
+        class _PooledApiClient(ApiClient):
+            def __init__(self, configuration, request_timeout):
+                super().__init__(configuration)
+                self.request_timeout = request_timeout
+
+            def call_api(self, *args, **kwargs):
+                if kwargs.get('_request_timeout') is None:
+                    kwargs['_request_timeout'] = self.request_timeout
+                return super().call_api(*args, **kwargs)
+
+        _pooled_client_class = _PooledApiClient
+    return _pooled_client_class(configuration, request_timeout)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def plaid_host() -> str:
+    """Plaid API base URL; point PLAID_ENV at a local fake server for testing."""
+    return os.getenv('PLAID_ENV', 'https://sandbox.plaid.com')
+
 def create_plaid_client():
-    """Create and configure Plaid client."""
-    try:
-        client_id = os.getenv('PLAID_CLIENT_ID')
-        secret = os.getenv('PLAID_SECRET')
-        
-        if not client_id or not secret:
-            raise ValueError("Missing Plaid credentials")
-            
-        configuration = Configuration(
-            host=os.getenv('PLAID_ENV', 'https://sandbox.plaid.com'),
-            api_key={
-                'clientId': client_id,
-                'secret': secret
-            }
-        )
-        
-        api_client = ApiClient(configuration)
-        return plaid_api.PlaidApi(api_client)
-    except Exception as e:
-        logger.error("Error creating Plaid client: %s", e, exc_info=True)
-        raise
+    """Return the process-wide Plaid client, building it on first use.
+
+    The client shares one keep-alive urllib3 connection pool across threads
+    (urllib3's PoolManager is thread-safe), so calls reuse TLS connections
+    instead of handshaking per request. Pool size and timeouts come from
+    PLAID_POOL_SIZE, PLAID_CONNECT_TIMEOUT and PLAID_READ_TIMEOUT. A forked
+    worker builds its own client rather than sharing the parent's sockets.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is not None and _client_pid == pid:
+            return _client
+        try:
+            from plaid.api import plaid_api
+            from plaid.configuration import Configuration
+
+            client_id = os.getenv('PLAID_CLIENT_ID')
+            secret = os.getenv('PLAID_SECRET')
+
+            if not client_id or not secret:
+                raise ValueError("Missing Plaid credentials")
+
+            configuration = Configuration(
+                host=plaid_host(),
+                api_key={
+                    'clientId': client_id,
+                    'secret': secret
+                }
+            )
+            configuration.connection_pool_maxsize = PLAID_POOL_SIZE
+
+            api_client = _pooled_api_client(
+                configuration,
+                request_timeout=(PLAID_CONNECT_TIMEOUT, PLAID_READ_TIMEOUT)
+            )
+            _client = plaid_api.PlaidApi(api_client)
+            _client_pid = pid
+            return _client
+        except Exception as e:
+            logger.error("Error creating Plaid client: %s", e, exc_info=True)
+            raise
 
 def create_link_token(user_id: str) -> str:
     """Create a link token for Plaid Link."""
+    from plaid.model.country_code import CountryCode
+    from plaid.model.link_token_create_request import LinkTokenCreateRequest
+    from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
+    from plaid.model.products import Products
+
     try:
         client = create_plaid_client()
         
@@ -61,6 +182,8 @@ def create_link_token(user_id: str) -> str:
 
 def exchange_public_token(public_token: str) -> tuple[str, str]:
     """Exchange a public token for an access token."""
+    from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+
     try:
         client = create_plaid_client()
         exchange_request = ItemPublicTokenExchangeRequest(
@@ -74,7 +197,10 @@ def exchange_public_token(public_token: str) -> tuple[str, str]:
         raise
 
 def fetch_transactions(access_token: str, start_date=None, end_date=None) -> List[Dict[str, Any]]:
-    """Fetch transactions from Plaid."""
+    """Fetch every transaction in a date window from Plaid, following pagination."""
+    from plaid.model.transactions_get_request import TransactionsGetRequest
+    from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
+
     try:
         client = create_plaid_client()
         
@@ -83,19 +209,27 @@ def fetch_transactions(access_token: str, start_date=None, end_date=None) -> Lis
         if not end_date:
             end_date = datetime.now().date()
 
-        options = TransactionsGetRequestOptions(
-            include_personal_finance_category=True
-        )
-        
-        request = TransactionsGetRequest(
-            access_token=access_token,
-            start_date=start_date,
-            end_date=end_date,
-            options=options
-        )
-        
-        response = client.transactions_get(request)
-        transactions = response.transactions
+        transactions = []
+        total_transactions = None
+        while total_transactions is None or len(transactions) < total_transactions:
+            options = TransactionsGetRequestOptions(
+                include_personal_finance_category=True,
+                count=TRANSACTIONS_GET_PAGE_SIZE,
+                offset=len(transactions)
+            )
+            request = TransactionsGetRequest(
+                access_token=access_token,
+                start_date=start_date,
+                end_date=end_date,
+                options=options
+            )
+
+            response = client.transactions_get(request)
+            total_transactions = response.total_transactions
+            if not response.transactions:
+                break
+            transactions.extend(response.transactions)
+
         logger.info(f"Successfully fetched {len(transactions)} transactions")
         
         return [process_transaction(tx) for tx in transactions]
@@ -103,20 +237,202 @@ def fetch_transactions(access_token: str, start_date=None, end_date=None) -> Lis
         logger.error("Error fetching transactions: %s", e, exc_info=True)
         raise
 
+def plaid_error_code(error: 'plaid.exceptions.ApiException') -> Optional[str]:
+    """Extract Plaid's error_code from an API exception body."""
+    try:
+        return json.loads(error.body).get('error_code')
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def is_retryable_error(error: 'plaid.exceptions.ApiException') -> bool:
+    """Whether a Plaid API error is transient and worth retrying."""
+    status = getattr(error, 'status', None) or 0
+    return status == 429 or status >= 500 or plaid_error_code(error) in RETRYABLE_ERROR_CODES
+
+def call_with_backoff(func, *args, max_retries: int = PLAID_MAX_RETRIES,
+                      base_delay: float = PLAID_RETRY_BASE_DELAY, **kwargs):
+    """Call a Plaid API method, retrying transient errors with jittered exponential backoff.
+
+    Each attempt first waits on the process-wide rate limiter, if one is set.
+    """
+    from plaid import exceptions as plaid_exceptions
+
+    attempt = 0
+    while True:
+        if _rate_limiter is not None:
+            _rate_limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except plaid_exceptions.ApiException as e:
+            if attempt >= max_retries or not is_retryable_error(e):
+                raise
+            delay = base_delay * (2 ** attempt) * (1 + random.random() / 2)
+            logger.warning(
+                "Plaid call failed with %s; retrying in %.1fs (attempt %d/%d)",
+                plaid_error_code(e) or getattr(e, 'status', None), delay, attempt + 1, max_retries
+            )
+            time.sleep(delay)
+            attempt += 1
+
+def fetch_transaction_updates(access_token: str, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Fetch added/modified/removed transactions since ``cursor`` via /transactions/sync.
+
+    Pages until ``has_more`` is false. ``update_status`` in the result is
+    Plaid's ``transactions_update_status`` from the last page;
+    UPDATE_STATUS_NOT_READY means the item's initial pull has not finished, so
+    an empty result says nothing about its history yet.
+
+    If Plaid reports that the data changed
+    mid-pagination, the whole run restarts from the original cursor as Plaid
+    requires, after a backoff, at most PLAID_SYNC_MAX_RESTARTS times; then the
+    error is raised. Transient errors on a page are retried with backoff. An
+    empty cursor returns the item's full history.
+    """
+    from plaid import exceptions as plaid_exceptions
+    from plaid.model.transactions_sync_request import TransactionsSyncRequest
+    from plaid.model.transactions_sync_request_options import TransactionsSyncRequestOptions
+
+    client = create_plaid_client()
+    options = TransactionsSyncRequestOptions(include_personal_finance_category=True)
+
+    restarts = 0
+    while True:
+        added, modified, removed = [], [], []
+        next_cursor = cursor
+        update_status = None
+        try:
+            has_more = True
+            while has_more:
+                request_args = {
+                    'access_token': access_token,
+                    'count': TRANSACTIONS_SYNC_PAGE_SIZE,
+                    'options': options
+                }
+                if next_cursor:
+                    request_args['cursor'] = next_cursor
+
+                response = call_with_backoff(
+                    client.transactions_sync, TransactionsSyncRequest(**request_args)
+                )
+                added.extend(process_transaction(tx) for tx in response.added)
+                modified.extend(process_transaction(tx) for tx in response.modified)
+                removed.extend(str(tx.transaction_id) for tx in response.removed)
+                next_cursor = response.next_cursor
+                has_more = response.has_more
+                update_status = getattr(response, 'transactions_update_status', None)
+        except plaid_exceptions.ApiException as e:
+            if (plaid_error_code(e) == 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION'
+                    and restarts < PLAID_SYNC_MAX_RESTARTS):
+                delay = PLAID_RETRY_BASE_DELAY * (2 ** restarts) * (1 + random.random() / 2)
+                restarts += 1
+                logger.warning(
+                    "Transactions changed during sync pagination; restarting from cursor in %.1fs (%d/%d)",
+                    delay, restarts, PLAID_SYNC_MAX_RESTARTS
+                )
+                time.sleep(delay)
+                continue
+            logger.error("Error syncing transactions: %s", e, exc_info=True)
+            raise
+
+        logger.info(
+            "Fetched transaction updates: %d added, %d modified, %d removed",
+            len(added), len(modified), len(removed)
+        )
+        return {
+            'added': added,
+            'modified': modified,
+            'removed': removed,
+            'next_cursor': next_cursor,
+            'update_status': str(update_status or 'TRANSACTIONS_UPDATE_STATUS_UNKNOWN')
+        }
+
+def _transaction_category(transaction) -> str:
+    """Prefer Plaid's legacy category names, which the dashboard colours are keyed on."""
+    legacy = getattr(transaction, 'category', None)
+    if legacy:
+        return legacy[0]
+    personal_finance_category = getattr(transaction, 'personal_finance_category', None)
+    if personal_finance_category:
+        return personal_finance_category.primary
+    return 'Uncategorized'
+
 def process_transaction(transaction) -> Dict[str, Any]:
     """Process a single transaction."""
     try:
+        merchant_name = getattr(transaction, 'merchant_name', None)
         return {
             'transaction_id': str(transaction.transaction_id),
+            'account_id': getattr(transaction, 'account_id', None),
             'date': transaction.date,
             'name': str(transaction.name),
             'amount': float(transaction.amount),
-            'category': (transaction.personal_finance_category.primary 
-                       if hasattr(transaction, 'personal_finance_category') 
-                       else 'Uncategorized'),
-            'merchant_name': str(transaction.merchant_name) if hasattr(transaction, 'merchant_name') else None,
+            'category': _transaction_category(transaction),
+            'merchant_name': str(merchant_name) if merchant_name else None,
             'pending': bool(transaction.pending)
         }
     except Exception as e:
         logger.error(f"Error processing transaction: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+class WebhookVerificationError(Exception):
+    """A webhook's Plaid-Verification header is missing, invalid or does not match its body."""
+
+_webhook_keys: Dict[str, Dict[str, Any]] = {}
+_webhook_keys_lock = threading.Lock()
+
+def _webhook_verification_key(key_id: str) -> Dict[str, Any]:
+    """The JWK Plaid signs webhooks with under ``key_id``, fetched once per process."""
+    from plaid import exceptions as plaid_exceptions
+    from plaid.model.webhook_verification_key_get_request import WebhookVerificationKeyGetRequest
+
+    with _webhook_keys_lock:
+        key = _webhook_keys.get(key_id)
+    if key is not None:
+        return key
+
+    try:
+        response = call_with_backoff(
+            create_plaid_client().webhook_verification_key_get,
+            WebhookVerificationKeyGetRequest(key_id=key_id)
+        )
+    except plaid_exceptions.ApiException as e:
+        if 400 <= (getattr(e, 'status', None) or 0) < 500:
+            raise WebhookVerificationError(f"unknown verification key {key_id}") from e
+        raise
+    key = response.key.to_dict()
+    with _webhook_keys_lock:
+        _webhook_keys[key_id] = key
+    return key
+
+def verify_webhook(body: bytes, token: Optional[str]):
+    """Check a webhook's Plaid-Verification JWT and that it was issued for exactly ``body``.
+
+    The token must be an ES256 JWT signed with a current Plaid webhook key,
+    issued within WEBHOOK_MAX_AGE, whose ``request_body_sha256`` claim is
+    the SHA-256 of the raw request body. Raises WebhookVerificationError
+    otherwise.
+    """
+    if not token:
+        raise WebhookVerificationError("missing Plaid-Verification header")
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as e:
+        raise WebhookVerificationError("malformed verification token") from e
+    if header.get('alg') != 'ES256' or not header.get('kid'):
+        raise WebhookVerificationError("verification token is not an ES256 token with a key id")
+
+    key = _webhook_verification_key(header['kid'])
+    if key.get('expired_at'):
+        raise WebhookVerificationError(f"verification key {header['kid']} has expired")
+    try:
+        claims = jwt.decode(token, jwt.PyJWK(key, algorithm='ES256').key, algorithms=['ES256'],
+                            options={'require': ['iat']})
+    except jwt.PyJWTError as e:
+        raise WebhookVerificationError(f"invalid verification token: {e}") from e
+
+    if time.time() - claims['iat'] > WEBHOOK_MAX_AGE:
+        raise WebhookVerificationError("verification token is too old")
+    expected = hashlib.sha256(body).hexdigest()
+    if not hmac.compare_digest(str(claims.get('request_body_sha256', '')), expected):
+        raise WebhookVerificationError("request body does not match the verification token")
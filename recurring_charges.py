@@ -0,0 +1,283 @@
+"""
+Detection and maintenance of recurring charges in the ``recurring_charge`` table.
+
+A user's expenses are bucketed by :func:`normalize_merchant`, so
+"NETFLIX.COM 8472" and "Netflix.com" count as one merchant. Each bucket is
+sorted by date and tested against weekly, biweekly, monthly, quarterly and
+annual periods. An interval counts as on schedule if it is within the
+period's tolerance of a whole number of periods, so one skipped cycle does
+not break a match. Amounts may drift. Consecutive charges only need to stay
+within RECURRING_AMOUNT_TOLERANCE of each other most of the time, so a
+price increase keeps the subscription and is reported as ``amount_change``.
+
+Ingest and delete paths call :func:`refresh_recurring` with the merchants
+they touched. Only those buckets are re-detected, from the user's last
+RECURRING_LOOKBACK_DAYS of expenses. They are selected in SQL through
+``transaction.merchant_key``, which ingest stores alongside each row.
+Dashboards read the stored rows.
+:func:`rebuild_recurring` backfills a user from scratch.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from merchant_classifier import merchant_key
+from models import db, RecurringCharge, Transaction, User
+from monthly_rollup import lock_user
+
+logger = logging.getLogger(__name__)
+
+# History considered per detection; long enough to see an annual charge three times.
+LOOKBACK_DAYS = int(os.getenv('RECURRING_LOOKBACK_DAYS', '1100'))
+# Largest relative change between consecutive charges that still counts as the same price.
+AMOUNT_TOLERANCE = float(os.getenv('RECURRING_AMOUNT_TOLERANCE', '0.15'))
+MIN_CONFIDENCE = float(os.getenv('RECURRING_MIN_CONFIDENCE', '0.5'))
+
+# Share of intervals that must be on schedule, and of consecutive charges at a stable price.
+MIN_REGULARITY = 0.75
+MIN_AMOUNT_STABILITY = 0.5
+# Interval multiples that count as on schedule; 2 tolerates one skipped or unsynced charge.
+MAX_SKIPPED_CYCLES = 2
+
+
+@dataclass(frozen=True)
+class Period:
+    name: str
+    days: float
+    tolerance: float  # days either side of a whole number of periods
+    min_occurrences: int
+
+
+PERIODS = (
+    Period('weekly', 7, 1, 4),
+    Period('biweekly', 14, 2, 3),
+    Period('monthly', 30.44, 4, 3),
+    Period('quarterly', 91.31, 10, 3),
+    Period('annual', 365.25, 20, 2),
+)
+
+
+def _match_period(intervals: List[int]) -> Optional[Tuple[Period, float]]:
+    """The period most intervals fit, and the share of intervals that fit it."""
+    typical = statistics.median(intervals)
+    best = None
+    for period in PERIODS:
+        if abs(typical - period.days) > period.tolerance:
+            continue
+        on_schedule = 0
+        for interval in intervals:
+            cycles = round(interval / period.days)
+            if 1 <= cycles <= MAX_SKIPPED_CYCLES and abs(interval - cycles * period.days) <= period.tolerance * cycles:
+                on_schedule += 1
+        regularity = on_schedule / len(intervals)
+        if best is None or regularity > best[1]:
+            best = (period, regularity)
+    return best
+
+
+def detect_charge(charges: List[Tuple[datetime, float]]) -> Optional[Dict]:
+    """Recurring-charge fields for one merchant's (date, amount) expenses, or None.
+
+    Charges on the same day are added together before intervals are measured.
+    """
+    by_day: Dict[datetime, float] = defaultdict(float)
+    for charge_date, amount in charges:
+        by_day[datetime(charge_date.year, charge_date.month, charge_date.day)] += amount
+    days = sorted(by_day)
+    if len(days) < 2:
+        return None
+
+    intervals = [(b - a).days for a, b in zip(days, days[1:])]
+    match = _match_period(intervals)
+    if match is None:
+        return None
+    period, regularity = match
+    if len(days) < period.min_occurrences or regularity < MIN_REGULARITY:
+        return None
+
+    amounts = [by_day[day] for day in days]
+    stable = sum(
+        1 for previous, current in zip(amounts, amounts[1:])
+        if abs(current - previous) <= AMOUNT_TOLERANCE * max(abs(previous), 0.01)
+    )
+    amount_stability = stable / (len(amounts) - 1)
+    if amount_stability < MIN_AMOUNT_STABILITY:
+        return None
+
+    # Confidence grows with the evidence, up to two occurrences beyond the minimum.
+    confidence = regularity * amount_stability * min(1.0, len(days) / (period.min_occurrences + 2))
+    if confidence < MIN_CONFIDENCE:
+        return None
+
+    on_schedule = [i for i in intervals if i <= period.days * MAX_SKIPPED_CYCLES + period.tolerance]
+    interval_days = statistics.median(on_schedule) if on_schedule else period.days
+    return {
+        'period': period.name,
+        'interval_days': float(interval_days),
+        'amount': round(amounts[-1], 2),
+        'typical_amount': round(statistics.median(amounts), 2),
+        'amount_change': (amounts[-1] - amounts[0]) / amounts[0] if amounts[0] else 0.0,
+        'occurrences': len(days),
+        'first_date': days[0],
+        'last_date': days[-1],
+        'next_expected': days[-1] + timedelta(days=round(interval_days)),
+        'confidence': round(confidence, 2),
+    }
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ensure_merchant_keys(user_id: int) -> int:
+    """Fill ``transaction.merchant_key`` for a user's rows written before the column existed.
+
+    The check is one index probe on (user_id, merchant_key), so it is cheap
+    to call before every keyed read. Returns the number of rows filled.
+    """
+    missing = Transaction.query.filter(Transaction.user_id == user_id, Transaction.merchant_key.is_(None))
+    if not db.session.query(missing.exists()).scalar():
+        return 0
+    rows = [
+        {'id': transaction_id, 'merchant_key': merchant_key(name, merchant)}
+        for transaction_id, name, merchant in missing.with_entities(
+            Transaction.id, Transaction.name, Transaction.merchant_name)
+    ]
+    for chunk in _chunks(rows, 1000):
+        db.session.bulk_update_mappings(Transaction, chunk)
+    logger.info("Filled merchant keys for %d transactions of user %s", len(rows), user_id)
+    return len(rows)
+
+
+def _expense_buckets(user_id: int, keys: Optional[Set[str]] = None, now: Optional[datetime] = None):
+    """A user's recent expenses grouped by merchant key, limited to ``keys`` if given.
+
+    ``keys`` are matched in SQL against the indexed ``merchant_key`` column,
+    so a refresh reads only the touched merchants' rows.
+    """
+    since = (now or datetime.utcnow()) - timedelta(days=LOOKBACK_DAYS)
+    query = db.session.query(
+        Transaction.merchant_key, Transaction.name, Transaction.merchant_name, Transaction.category,
+        Transaction.date, Transaction.amount
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.amount > 0,
+        Transaction.date >= since
+    )
+    if keys is None:
+        batches = [query.filter(Transaction.merchant_key != '')]
+    else:
+        batches = [query.filter(Transaction.merchant_key.in_(chunk)) for chunk in _chunks(sorted(keys), 500)]
+
+    buckets = defaultdict(lambda: {'charges': [], 'names': [], 'categories': []})
+    for batch in batches:
+        for key, name, merchant, category, tx_date, amount in batch.order_by(Transaction.date):
+            bucket = buckets[key]
+            bucket['charges'].append((tx_date, amount))
+            bucket['names'].append(merchant or name)
+            bucket['categories'].append(category)
+    return buckets
+
+
+def _replace_charges(user_id: int, charges, keys: Optional[Set[str]], now: Optional[datetime]) -> int:
+    if keys is not None:
+        for chunk in _chunks(sorted(keys), 500):
+            charges.filter(RecurringCharge.merchant_key.in_(chunk)).delete(synchronize_session=False)
+    else:
+        charges.delete(synchronize_session=False)
+
+    rows = []
+    for key, bucket in _expense_buckets(user_id, keys, now).items():
+        detected = detect_charge(bucket['charges'])
+        if detected is None:
+            continue
+        categories = [c for c in bucket['categories'] if c]
+        rows.append({
+            'user_id': user_id,
+            'merchant_key': key,
+            # The most recent spelling and the most common category.
+            'merchant_name': bucket['names'][-1],
+            'category': max(set(categories), key=categories.count) if categories else None,
+            **detected,
+            'updated_at': datetime.utcnow()
+        })
+    if rows:
+        db.session.execute(RecurringCharge.__table__.insert(), rows)
+    return len(rows)
+
+
+def refresh_recurring(user_id: int, keys: Iterable[str], now: Optional[datetime] = None) -> int:
+    """Re-detect a user's recurring charges for the given merchant keys.
+
+    The caller owns the session and commits together with the transaction
+    writes that touched the merchants. Returns the number of charges stored.
+    """
+    keys = {k for k in keys if k}
+    if not keys:
+        return 0
+    lock_user(user_id)
+    ensure_merchant_keys(user_id)
+    charges = RecurringCharge.query.filter(RecurringCharge.user_id == user_id)
+    return _replace_charges(user_id, charges, keys, now)
+
+
+def rebuild_recurring(user_id: int, now: Optional[datetime] = None) -> int:
+    """Re-detect every recurring charge for a user from scratch."""
+    lock_user(user_id)
+    ensure_merchant_keys(user_id)
+    charges = RecurringCharge.query.filter(RecurringCharge.user_id == user_id)
+    return _replace_charges(user_id, charges, None, now)
+
+
+def transaction_merchants(user_id: int, transaction_ids: Iterable[str]) -> Set[str]:
+    """Merchant keys of the given stored transactions, looked up before they change."""
+    ids = list(transaction_ids)
+    if not ids:
+        return set()
+    rows = db.session.query(Transaction.name, Transaction.merchant_name).filter(
+        Transaction.user_id == user_id,
+        Transaction.transaction_id.in_(ids)
+    )
+    return {merchant_key(name, merchant) for name, merchant in rows}
+
+
+def load_recurring(user_id: int, active_only: bool = False) -> List[Dict]:
+    """Stored recurring charges for a user, most expensive per month first."""
+    charges = [c.to_dict() for c in RecurringCharge.query.filter(RecurringCharge.user_id == user_id)]
+    if active_only:
+        charges = [c for c in charges if c['active']]
+    return sorted(charges, key=lambda c: -c['monthly_cost'])
+
+
+def rebuild_all(user_id: Optional[int] = None) -> int:
+    """Backfill recurring charges for one user, or every user with transactions."""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [uid for uid, in db.session.query(User.id).filter(User.transactions.any())]
+
+    written = 0
+    for uid in user_ids:
+        written += rebuild_recurring(uid)
+        db.session.commit()
+    logger.info("Detected %d recurring charges for %d users", written, len(user_ids))
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the recurring_charge table.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user.")
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        db.create_all()
+        print(f"Stored {rebuild_all(args.user_id)} recurring charges")
@@ -0,0 +1,251 @@
+"""
+Per-user cache for expensive analytics and AI responses.
+
+Cache keys embed ``User.data_version``, which is bumped in the same database
+transaction as any change to a user's transactions, budgets or savings goals
+(see :func:`bump_data_version`). A write therefore invalidates every cached
+response for that user at once, across all worker processes, without
+deleting anything; stale entries just age out under TTL and size eviction.
+
+Two backends are provided: an in-process LRU (``memory``) and a directory
+of JSON files shared by every worker on the host (``filesystem``). Select
+one with RESPONSE_CACHE_BACKEND; RESPONSE_CACHE_TTL,
+RESPONSE_CACHE_MAX_ENTRIES and RESPONSE_CACHE_DIR tune them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from flask import jsonify, request
+from flask_login import current_user
+
+from models import db, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+DEFAULT_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2048'))
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Storage interface; values must be JSON-serializable."""
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the cached value, or ``_MISSING`` if absent or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryLRUBackend(CacheBackend):
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FileSystemBackend(CacheBackend):
+    """JSON files in one directory, shared by every process on the host.
+
+    Reads touch the file's mtime so eviction, which removes the
+    least recently used files once ``max_entries`` is exceeded, is LRU.
+    """
+
+    def __init__(self, directory: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return _MISSING
+        if entry['expires_at'] < time.time():
+            self._remove(path)
+            return _MISSING
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry['value']
+
+    def set(self, key: str, value: Any, ttl: int):
+        # Write to a temp file and rename so readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'expires_at': time.time() + ttl, 'value': value}, f)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith('.json')]
+            overflow = len(entries) - self.max_entries
+            if overflow <= 0:
+                return
+            entries.sort(key=lambda e: e.stat().st_mtime)
+            for entry in entries[:overflow]:
+                self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                self._remove(entry.path)
+
+    def __len__(self) -> int:
+        return sum(1 for e in os.scandir(self.directory) if e.name.endswith('.json'))
+
+
+class ResponseCache:
+    """Versioned per-user cache with hit/miss counters."""
+
+    def __init__(self, backend: CacheBackend, default_ttl: int = DEFAULT_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(namespace: str, user_id: int, version: int, variant: str = '') -> str:
+        return f"{namespace}:u{user_id}:v{version}:{variant}"
+
+    def get(self, key: str) -> Any:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        try:
+            self.backend.set(key, value, ttl or self.default_ttl)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("Could not cache %s: %s", key, e)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+def _create_cache() -> ResponseCache:
+    backend_name = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    if backend_name == 'filesystem':
+        directory = os.getenv('RESPONSE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'wealthai-cache'))
+        backend = FileSystemBackend(directory)
+    else:
+        backend = MemoryLRUBackend()
+    return ResponseCache(backend)
+
+
+response_cache = _create_cache()
+
+
+def bump_data_version(user_id: int):
+    """Invalidate a user's cached responses; commits with the caller's session."""
+    users = User.__table__
+    db.session.execute(
+        users.update()
+        .where(users.c.id == user_id)
+        .values(data_version=db.func.coalesce(users.c.data_version, 0) + 1)
+    )
+
+
+def cached_response(namespace: str, ttl: Optional[int] = None):
+    """Cache a login_required view's 200 JSON body per user and data version.
+
+    The query string is part of the key, so filtered variants are cached
+    separately. A response marked ``Cache-Control: no-store`` is not
+    cached. Place it below ``@login_required``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = ResponseCache.make_key(
+                namespace,
+                current_user.id,
+                current_user.data_version or 0,
+                request.query_string.decode('utf-8')
+            )
+            cached = response_cache.get(key)
+            if cached is not _MISSING:
+                return jsonify(cached), 200
+
+            response = view(*args, **kwargs)
+            body, status = response if isinstance(response, tuple) else (response, 200)
+            if status == 200 and getattr(body, 'is_json', False) and not body.cache_control.no_store:
+                response_cache.set(key, body.get_json(), ttl)
+            return response
+        return wrapper
+    return decorator
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from models import Budget, db
+from response_cache import bump_data_version
 from datetime import datetime
 
 budget_bp = Blueprint('budget', __name__)
@@ -26,6 +27,7 @@ def create_budget():
             created_at=datetime.now()
         )
         db.session.add(budget)
+        bump_data_version(current_user.id)
         db.session.commit()
         return jsonify(budget.to_dict()), 201
     except Exception as e:
@@ -38,6 +40,7 @@ def update_budget(budget_id):
         data = request.json
         budget = Budget.query.filter_by(id=budget_id, user_id=current_user.id).first_or_404()
         budget.budget_limit = data['budget_limit']
+        bump_data_version(current_user.id)
         db.session.commit()
         return jsonify(budget.to_dict()), 200
     except Exception as e:
@@ -49,6 +52,7 @@ def delete_budget(budget_id):
     try:
         budget = Budget.query.filter_by(id=budget_id, user_id=current_user.id).first_or_404()
         db.session.delete(budget)
+        bump_data_version(current_user.id)
         db.session.commit()
         return jsonify({'message': 'Budget deleted'}), 200
     except Exception as e:
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from models import SavingsGoal, db
+from response_cache import bump_data_version
 from datetime import datetime
 
 savings_bp = Blueprint('savings', __name__)
@@ -27,6 +28,7 @@ def create_savings_goal():
             due_date=datetime.fromisoformat(data['due_date']) if 'due_date' in data else None
         )
         db.session.add(goal)
+        bump_data_version(current_user.id)
         db.session.commit()
         return jsonify(goal.to_dict()), 201
     except Exception as e:
@@ -40,6 +42,7 @@ def update_savings_goal(goal_id):
         goal = SavingsGoal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
         goal.current_amount = data.get('current_amount', goal.current_amount)
         goal.target_amount = data.get('target_amount', goal.target_amount)
+        bump_data_version(current_user.id)
         db.session.commit()
         return jsonify(goal.to_dict()), 200
     except Exception as e:
@@ -51,6 +54,7 @@ def delete_savings_goal(goal_id):
     try:
         goal = SavingsGoal.query.filter_by(id=goal_id, user_id=current_user.id).first_or_404()
         db.session.delete(goal)
+        bump_data_version(current_user.id)
         db.session.commit()
         return jsonify({'message': 'Savings goal deleted'}), 200
     except Exception as e:
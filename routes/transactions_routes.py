@@ -1,27 +1,198 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, Transaction, db
+from models import MonthlyCategoryRollup, User, Transaction, db
+from monthly_rollup import ensure_rollup
+from response_cache import bump_data_version
+from transaction_export import FORMATS, export_transactions
+from transaction_rows import json_response, project, row_to_dict, transaction_dicts
+from ai_services.registry import get_service
 from ai_services.transaction_analyzer import TransactionAnalyzer
-from datetime import datetime
+from sqlalchemy import func, or_
+from datetime import datetime, timedelta
+import base64
+import json
 import logging
 
 transaction_bp = Blueprint('transactions', __name__, url_prefix='/api/transactions')
 logger = logging.getLogger(__name__)
 
+# Page sizes for GET /api/transactions.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Filtered totals are counted up to this many rows, then reported as an estimate.
+TOTAL_COUNT_CAP = 10000
+
+
+def _encode_cursor(row):
+    """Opaque cursor pointing just past ``row`` in (date, id) DESC order."""
+    position = json.dumps([row.date.isoformat(), row.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_value, transaction_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(date_value), int(transaction_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def _parse_date(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:10], '%Y-%m-%d')
+    except ValueError as e:
+        raise ValueError(f'{name} must be YYYY-MM-DD') from e
+
+
+def _parse_float(name):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError as e:
+        raise ValueError(f'{name} must be a number') from e
+
+
+def _transaction_filters(user_id):
+    """Filter clauses from the query string, and whether any go beyond date and category."""
+    clauses = [Transaction.user_id == user_id]
+    start_date, end_date = _parse_date('start_date'), _parse_date('end_date')
+    if start_date:
+        clauses.append(Transaction.date >= start_date)
+    if end_date:
+        # end_date is inclusive of the whole day
+        clauses.append(Transaction.date < end_date + timedelta(days=1))
+
+    categories = [c for c in request.args.getlist('category') if c]
+    if categories:
+        condition = Transaction.category.in_(categories)
+        if 'Uncategorized' in categories:
+            condition = or_(condition, Transaction.category.is_(None))
+        clauses.append(condition)
+
+    min_amount, max_amount = _parse_float('min_amount'), _parse_float('max_amount')
+    if min_amount is not None:
+        clauses.append(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        clauses.append(Transaction.amount <= max_amount)
+
+    merchant = request.args.get('merchant', '').strip()
+    if merchant:
+        pattern = f"%{merchant}%"
+        clauses.append(or_(Transaction.merchant_name.ilike(pattern), Transaction.name.ilike(pattern)))
+
+    detailed = min_amount is not None or max_amount is not None or bool(merchant)
+    return clauses, (start_date, end_date, categories, detailed)
+
+
+def _approximate_total(user_id, clauses, start_date, end_date, categories, detailed):
+    """(total, is_estimate) without an unbounded COUNT(*) over the user's history.
+
+    Date and category filters are answered from ``monthly_category_rollup``;
+    a date range counts whole months at its edges. Other filters are
+    counted directly, up to TOTAL_COUNT_CAP rows.
+    """
+    if detailed:
+        capped = db.session.query(Transaction.id).filter(*clauses).limit(TOTAL_COUNT_CAP + 1).subquery()
+        count = db.session.query(func.count()).select_from(capped).scalar()
+        return min(count, TOTAL_COUNT_CAP), count > TOTAL_COUNT_CAP
+
+    ensure_rollup(user_id)
+    query = db.session.query(func.coalesce(func.sum(MonthlyCategoryRollup.row_count), 0))\
+        .filter(MonthlyCategoryRollup.user_id == user_id)
+    if start_date:
+        query = query.filter(MonthlyCategoryRollup.month >= start_date.strftime('%Y-%m'))
+    if end_date:
+        query = query.filter(MonthlyCategoryRollup.month <= end_date.strftime('%Y-%m'))
+    if categories:
+        # The rollup stores uncategorized rows under ''.
+        query = query.filter(MonthlyCategoryRollup.category.in_(
+            ['' if c == 'Uncategorized' else c for c in categories]
+        ))
+    return int(query.scalar()), bool(start_date or end_date)
+
+
 @transaction_bp.route('', methods=['GET'])
 @jwt_required()
 def get_transactions():
-    """Get all transactions for the current user."""
+    """Get a page of the current user's transactions, newest first.
+
+    Pages are keyset-paginated on (date, id): pass the previous response's
+    ``next_cursor`` as ``cursor``, so each page costs the same however deep
+    it is. Optional filters are ``start_date`` and ``end_date`` (YYYY-MM-DD,
+    inclusive), repeatable ``category``, ``min_amount``, ``max_amount`` and
+    ``merchant`` (substring of the merchant or transaction name).
+    ``include_total=true`` adds a total that may be approximate.
+    """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
 
     if not user:
         return jsonify({'msg': 'User not found'}), 404
 
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    transaction_list = [t.to_dict() for t in transactions]
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        clauses, summary = _transaction_filters(user.id)
+        cursor = request.args.get('cursor')
+        page_clauses = list(clauses)
+        if cursor:
+            after_date, after_id = _decode_cursor(cursor)
+            # The redundant date bound lets the (user_id, date) index seek to the cursor.
+            page_clauses += [Transaction.date <= after_date,
+                             or_(Transaction.date < after_date, Transaction.id < after_id)]
+    except ValueError as e:
+        return jsonify({'msg': str(e)}), 400
+
+    rows = project(Transaction.query.filter(*page_clauses)
+                   .order_by(Transaction.date.desc(), Transaction.id.desc())
+                   .limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    response = {
+        'transactions': [row_to_dict(row) for row in rows],
+        'next_cursor': _encode_cursor(rows[-1]) if has_more else None,
+        'has_more': has_more
+    }
+    if request.args.get('include_total', 'false').lower() == 'true':
+        response['total'], response['total_is_estimate'] = _approximate_total(user.id, clauses, *summary)
+
+    return json_response(response)
+
+@transaction_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_user_transactions():
+    """Stream all of the current user's transactions as NDJSON, CSV or Parquet.
+
+    ``format`` defaults to ndjson; ``start_date`` and ``end_date`` are
+    optional inclusive YYYY-MM-DD bounds.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not user:
+        return jsonify({'msg': 'User not found'}), 404
+
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in FORMATS:
+        return jsonify({'msg': f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        start_date, end_date = _parse_date('start_date'), _parse_date('end_date')
+    except ValueError as e:
+        return jsonify({'msg': str(e)}), 400
 
-    return jsonify(transactions=transaction_list), 200
+    mimetype, extension = FORMATS[fmt]
+    chunks = export_transactions(user.id, fmt, start_date, end_date)
+    # The request context, and with it the database session, stays open while the body streams.
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="transactions.{extension}"',
+        'X-Accel-Buffering': 'no',
+    })
 
 @transaction_bp.route('', methods=['POST'])
 @jwt_required()
@@ -39,6 +210,7 @@ def add_transaction():
             category=data['category']
         )
         db.session.add(new_transaction)
+        bump_data_version(user_id)
         db.session.commit()
         return jsonify(msg="Transaction added successfully"), 201
     except Exception as e:
@@ -56,16 +228,14 @@ def get_transaction_insights():
     if not user:
         return jsonify({'msg': 'User not found'}), 404
 
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    transaction_data = [t.to_dict() for t in transactions]
+    transaction_data = transaction_dicts(Transaction.query.filter_by(user_id=user_id))
 
     if not transaction_data:
         return jsonify(message="No transactions to analyze"), 404
 
     try:
-        analyzer = TransactionAnalyzer()
         current_month = datetime.now().strftime("%Y-%m")
-        insights = analyzer.analyze_spending_patterns(transaction_data, current_month)
+        insights = get_service(TransactionAnalyzer).analyze_spending_patterns(transaction_data, current_month)
         
         if insights is None:
             return jsonify(message="Could not generate insights"), 500
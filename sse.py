@@ -0,0 +1,48 @@
+"""
+Server-sent events for streamed LLM completions.
+
+:func:`sse_response` forwards text chunks to the browser as ``delta`` events
+as soon as the model produces them. When the stream ends, the assembled text
+goes through ``finalize``. Its result is sent as a ``done`` event; if it
+returns None, meaning the output failed validation, an ``error`` event is
+sent instead. Clients read the stream with ``EventSource`` (GET) or
+``fetch`` plus a stream reader (POST).
+"""
+
+import json
+import logging
+from typing import Any, Callable, Iterable, Optional
+
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(data: Any, event: Optional[str] = None) -> str:
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def sse_response(chunks: Iterable[str], finalize: Callable[[str], Any]) -> Response:
+    def generate():
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield format_event({'delta': chunk}, 'delta')
+            result = finalize(''.join(parts))
+        except Exception as e:
+            logger.error(f"Error while streaming response: {e}")
+            yield format_event({'error': 'Stream interrupted'}, 'error')
+            return
+        if result is None:
+            yield format_event({'error': 'Model returned an invalid response'}, 'error')
+        else:
+            yield format_event(result, 'done')
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx from buffering the stream, which would defeat the early first byte.
+        'X-Accel-Buffering': 'no',
+    })
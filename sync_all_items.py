@@ -0,0 +1,162 @@
+"""
+Nightly reconciliation: sync every connected Plaid item concurrently.
+
+Items are synced on a bounded thread pool, and every Plaid call goes through
+a global token-bucket rate limiter so the run stays under Plaid's per-client
+limits. Each finished item is appended to a JSONL checkpoint file; rerunning
+with the same checkpoint skips items that already succeeded, so a crashed
+run resumes where it stopped.
+
+    python sync_all_items.py --workers 16 --rate-limit 600 --checkpoint nightly.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Optional, Set
+
+from plaid import exceptions as plaid_exceptions
+
+from app import app
+from models import db, User
+from plaid_integration import plaid_error_code, set_rate_limit
+from sync_worker import sync_user_item
+
+logger = logging.getLogger(__name__)
+
+
+def load_completed(checkpoint_path: str) -> Set[str]:
+    """Item ids recorded as successfully synced in an earlier run."""
+    completed = set()
+    if not os.path.exists(checkpoint_path):
+        return completed
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a partial last line behind.
+                continue
+            if record.get('status') == 'ok':
+                completed.add(record['item_id'])
+    return completed
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished items, flushed after every record."""
+
+    def __init__(self, path: Optional[str]):
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+        self._lock = threading.Lock()
+
+    def record(self, entry: Dict[str, Any]):
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def sync_item(user_id: int, item_id: str) -> Dict[str, Any]:
+    """Sync one item in its own app context and return a timing/status record."""
+    started = time.perf_counter()
+    entry: Dict[str, Any] = {'item_id': item_id, 'user_id': user_id}
+    with app.app_context():
+        try:
+            user = db.session.get(User, user_id)
+            result = sync_user_item(user)
+            entry.update(status='ok', **result.to_dict())
+        except plaid_exceptions.ApiException as e:
+            db.session.rollback()
+            entry.update(status='error', error_code=plaid_error_code(e) or f'HTTP_{e.status}')
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Sync failed for item %s: %s", item_id, e, exc_info=True)
+            entry.update(status='error', error_code=type(e).__name__)
+        finally:
+            db.session.remove()
+    entry['seconds'] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(workers: int, checkpoint_path: Optional[str], limit: Optional[int] = None) -> int:
+    completed = load_completed(checkpoint_path) if checkpoint_path else set()
+
+    with app.app_context():
+        items = [
+            (user_id, item_id)
+            for user_id, item_id in db.session.query(User.id, User.plaid_item_id)
+            .filter(User.plaid_access_token.isnot(None), User.plaid_item_id.isnot(None))
+            .order_by(User.id)
+            if item_id not in completed
+        ]
+    if limit:
+        items = items[:limit]
+
+    print(f"Syncing {len(items)} items with {workers} workers "
+          f"({len(completed)} already completed in checkpoint)")
+
+    checkpoint = Checkpoint(checkpoint_path)
+    timings = []
+    errors = Counter()
+    totals = Counter()
+    run_started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='nightly-sync') as executor:
+            futures = [executor.submit(sync_item, user_id, item_id) for user_id, item_id in items]
+            for future in as_completed(futures):
+                entry = future.result()
+                checkpoint.record(entry)
+                timings.append(entry['seconds'])
+                if entry['status'] == 'ok':
+                    totals.update({k: entry[k] for k in ('inserted', 'updated', 'unchanged', 'conflicts', 'removed')})
+                    print(f"ok    {entry['item_id']}  {entry['seconds']:.2f}s  "
+                          f"+{entry['inserted']} ~{entry['updated']} -{entry['removed']}")
+                else:
+                    errors[entry['error_code']] += 1
+                    print(f"error {entry['item_id']}  {entry['seconds']:.2f}s  {entry['error_code']}")
+    finally:
+        checkpoint.close()
+
+    elapsed = time.perf_counter() - run_started
+    failed = sum(errors.values())
+    print(f"\nSynced {len(timings) - failed}/{len(items)} items in {elapsed:.1f}s")
+    print(f"Per-item seconds: p50={percentile(timings, 0.5):.2f} "
+          f"p95={percentile(timings, 0.95):.2f} max={max(timings, default=0):.2f}")
+    print(f"Transactions: {dict(totals)}")
+    if errors:
+        print(f"Errors: {dict(errors.most_common())}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync every connected Plaid item concurrently.")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent item syncs.")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="Max Plaid calls per minute across all workers.")
+    parser.add_argument("--checkpoint", default=None,
+                        help="JSONL file used to resume an interrupted run.")
+    parser.add_argument("--limit", type=int, default=None, help="Only sync the first N pending items.")
+    args = parser.parse_args()
+
+    if args.rate_limit:
+        set_rate_limit(args.rate_limit)
+    sys.exit(run(args.workers, args.checkpoint, args.limit))
@@ -0,0 +1,267 @@
+"""
+In-process background worker for Plaid transaction syncs.
+
+Webhooks enqueue work per ``plaid_item_id`` instead of syncing on the request
+thread. Jobs for the same item are coalesced: while one is queued or running,
+further webhooks only mark the item dirty (and collect removed transaction
+ids), and the running job loops once more to pick them up. A burst of
+webhooks for one item therefore costs a single fetch at a time.
+
+Work that a client needs to follow, such as the initial historical import
+after account linking, is recorded as a :class:`models.SyncJob` row, so its
+status can be polled by id from any worker process. Right after linking,
+Plaid answers /transactions/sync with empty pages until its initial pull is
+done. An import job therefore stays ``waiting`` and is retried every
+IMPORT_POLL_SECONDS, or sooner when a webhook for the item triggers a sync,
+until Plaid reports the pull complete or IMPORT_READY_TIMEOUT runs out.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+
+from models import db, SyncJob, User
+from plaid_integration import UPDATE_STATUS_NOT_READY, fetch_transaction_updates
+from transaction_ingest import IngestResult, apply_transaction_updates, delete_transactions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = int(os.getenv('PLAID_SYNC_WORKERS', '4'))
+# Finished jobs are kept this long for status polling, then deleted.
+JOB_RETENTION = timedelta(days=int(os.getenv('SYNC_JOB_RETENTION_DAYS', '7')))
+# How often a waiting import re-checks Plaid, and how long it waits in total.
+IMPORT_POLL_SECONDS = float(os.getenv('PLAID_IMPORT_POLL_SECONDS', '15'))
+IMPORT_READY_TIMEOUT = timedelta(seconds=int(os.getenv('PLAID_IMPORT_READY_TIMEOUT', '900')))
+# Send rows the local merchant classifier is unsure about to the LLM during syncs.
+LLM_CATEGORIZATION = os.getenv('SYNC_LLM_CATEGORIZATION', 'false').lower() == 'true'
+
+
+def _categorization_advisor():
+    if not LLM_CATEGORIZATION:
+        return None
+    from ai_services.registry import get_spending_advisor
+    return get_spending_advisor()
+
+
+def sync_user_item(user: User) -> IngestResult:
+    """Run one cursor-based incremental sync for a user's item and commit it."""
+    return _sync_item(user)[0]
+
+
+def _sync_item(user: User) -> Tuple[IngestResult, bool]:
+    """sync_user_item, also reporting whether Plaid has finished the item's initial pull."""
+    updates = fetch_transaction_updates(user.plaid_access_token, user.plaid_transactions_cursor)
+    result = apply_transaction_updates(user.id, updates, advisor=_categorization_advisor())
+    user.plaid_transactions_cursor = updates['next_cursor']
+    db.session.commit()
+    return result, updates.get('update_status') != UPDATE_STATUS_NOT_READY
+
+
+def _add_counts(previous: Optional[Dict[str, int]], summary: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    if not summary:
+        return previous
+    return {key: (previous or {}).get(key, 0) + value for key, value in summary.items()}
+
+
+class _ItemState:
+    """Work accumulated for one item while its job is queued or running."""
+
+    def __init__(self):
+        self.sync_requested = False
+        self.removed_ids: Set[str] = set()
+        self.job_ids: List[str] = []
+
+
+class SyncWorker:
+    """Thread pool that runs at most one sync job per Plaid item at a time."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='plaid-sync')
+        self._lock = threading.Lock()
+        self._items: Dict[str, _ItemState] = {}
+        self._retries: Dict[str, threading.Timer] = {}
+
+    def submit_import(self, app, user_id: int, item_id: str) -> SyncJob:
+        """Record and queue a full historical import for a newly linked item.
+
+        Commits the caller's session so the job is visible to the worker and
+        to status polls from other processes.
+        """
+        SyncJob.query.filter(SyncJob.finished_at < datetime.utcnow() - JOB_RETENTION)\
+            .delete(synchronize_session=False)
+        job = SyncJob(id=uuid.uuid4().hex, user_id=user_id, item_id=item_id, kind='initial_import',
+                      status='queued', created_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        self._enqueue(app, item_id, sync=True, job_id=job.id)
+        return job
+
+    def enqueue_sync(self, app, item_id: str) -> bool:
+        """Schedule an incremental sync; returns False if coalesced into a pending job."""
+        return self._enqueue(app, item_id, sync=True)
+
+    def enqueue_removal(self, app, item_id: str, transaction_ids: Iterable[str]) -> bool:
+        """Schedule a bulk delete of removed transactions for an item."""
+        return self._enqueue(app, item_id, removed_ids=transaction_ids)
+
+    def pending_items(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            retries, self._retries = list(self._retries.values()), {}
+        for timer in retries:
+            timer.cancel()
+        self._executor.shutdown(wait=wait)
+
+    def _enqueue(self, app, item_id: str, sync: bool = False,
+                 removed_ids: Optional[Iterable[str]] = None,
+                 job_id: Optional[str] = None) -> bool:
+        with self._lock:
+            state = self._items.get(item_id)
+            is_new = state is None
+            if is_new:
+                state = self._items[item_id] = _ItemState()
+            state.sync_requested |= sync
+            state.removed_ids.update(str(tx_id) for tx_id in removed_ids or [])
+            if job_id is not None:
+                state.job_ids.append(job_id)
+
+        if is_new:
+            self._executor.submit(self._run, app, item_id)
+        else:
+            logger.debug("Coalesced sync request for item %s", item_id)
+        return is_new
+
+    def _take_work(self, item_id: str) -> Optional[_ItemState]:
+        """Swap out the accumulated work, or retire the item if there is none."""
+        with self._lock:
+            state = self._items[item_id]
+            if not state.sync_requested and not state.removed_ids:
+                del self._items[item_id]
+                return None
+            self._items[item_id] = _ItemState()
+            return state
+
+    def _schedule_retry(self, app, item_id: str):
+        """Sync the item again after IMPORT_POLL_SECONDS, unless a retry is already pending."""
+        with self._lock:
+            if item_id in self._retries:
+                return
+            timer = threading.Timer(IMPORT_POLL_SECONDS, self._retry, (app, item_id))
+            timer.daemon = True
+            self._retries[item_id] = timer
+        timer.start()
+
+    def _retry(self, app, item_id: str):
+        with self._lock:
+            self._retries.pop(item_id, None)
+        self.enqueue_sync(app, item_id)
+
+    def _run(self, app, item_id: str):
+        with app.app_context():
+            while True:
+                work = self._take_work(item_id)
+                if work is None:
+                    return
+                self._mark_running(work.job_ids)
+                try:
+                    summary, ready = self._process(item_id, work)
+                    if self._finish(item_id, work, summary, ready):
+                        self._schedule_retry(app, item_id)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error("Background sync failed for item %s: %s", item_id, e, exc_info=True)
+                    self._fail(item_id, work, str(e))
+                finally:
+                    db.session.remove()
+
+    def _jobs(self, item_id: str, job_ids: List[str], include_waiting: bool) -> List[SyncJob]:
+        """This run's jobs, plus any import for the item still waiting on Plaid."""
+        condition = SyncJob.id.in_(job_ids)
+        if include_waiting:
+            condition = or_(condition, SyncJob.status == 'waiting')
+        return SyncJob.query.filter(SyncJob.item_id == item_id, condition).all()
+
+    def _mark_running(self, job_ids: List[str]):
+        if not job_ids:
+            return
+        SyncJob.query.filter(SyncJob.id.in_(job_ids))\
+            .update({'status': 'running', 'started_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+    def _finish(self, item_id: str, work: _ItemState, summary: Optional[Dict[str, int]], ready: bool) -> bool:
+        """Record a successful run on its jobs; returns True if an import is still waiting."""
+        now = datetime.utcnow()
+        waiting = False
+        for job in self._jobs(item_id, work.job_ids, include_waiting=work.sync_requested):
+            job.result = _add_counts(job.result, summary)
+            if ready:
+                job.status, job.finished_at = 'succeeded', now
+            elif now - job.created_at > IMPORT_READY_TIMEOUT:
+                job.status, job.finished_at = 'failed', now
+                job.error = "Plaid did not finish the initial transaction pull in time"
+            else:
+                job.status = 'waiting'
+                waiting = True
+        db.session.commit()
+        if waiting:
+            logger.info("Plaid has not finished the initial pull for item %s; waiting", item_id)
+        return waiting
+
+    def _fail(self, item_id: str, work: _ItemState, error: str):
+        try:
+            now = datetime.utcnow()
+            for job in self._jobs(item_id, work.job_ids, include_waiting=work.sync_requested):
+                job.status, job.error, job.finished_at = 'failed', error, now
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Could not record failed sync jobs for item %s", item_id)
+
+    def _process(self, item_id: str, work: _ItemState) -> Tuple[Optional[Dict[str, int]], bool]:
+        user = User.query.filter_by(plaid_item_id=item_id).first()
+        if user is None or not user.plaid_access_token:
+            raise LookupError(f"No connected user for Plaid item {item_id}")
+
+        summary, ready = None, True
+        if work.removed_ids:
+            removed = delete_transactions(user.id, work.removed_ids)
+            db.session.commit()
+            logger.info("Removed %d transactions for item %s", removed, item_id)
+
+        if work.sync_requested:
+            result, ready = _sync_item(user)
+            summary = result.to_dict()
+            logger.info("Background sync for item %s: %s", item_id, summary)
+        return summary, ready
+
+
+_worker: Optional[SyncWorker] = None
+_worker_pid: Optional[int] = None
+_worker_lock = threading.Lock()
+
+
+def get_sync_worker() -> SyncWorker:
+    """Return the process-wide worker, creating it on first use in each process.
+
+    A worker inherited through fork (e.g. from a preloaded gunicorn master)
+    has no running threads in the child, so it is replaced rather than reused.
+    """
+    global _worker, _worker_pid
+    pid = os.getpid()
+    if _worker is not None and _worker_pid == pid:
+        return _worker
+
+    with _worker_lock:
+        if _worker is None or _worker_pid != pid:
+            _worker = SyncWorker()
+            _worker_pid = pid
+    return _worker
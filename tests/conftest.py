@@ -0,0 +1,138 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from flask_login import LoginManager
+
+import plaid_integration
+from models import db, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A bare app with the API blueprints on a throwaway SQLite file.
+
+    A file rather than ``:memory:`` so background worker threads share the data.
+    """
+    from routes.plaid_routes import plaid_bp
+    from routes.transactions_routes import transaction_bp
+
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SECRET_KEY='test',
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        JWT_SECRET_KEY='test-jwt-secret-key-of-sufficient-length',
+        JWT_TOKEN_LOCATION=['headers'],
+        JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=1),
+    )
+    db.init_app(app)
+    JWTManager(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+    app.register_blueprint(plaid_bp, url_prefix='/api/plaid')
+    app.register_blueprint(transaction_bp, url_prefix='/api/transactions')
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make(user_id, **fields):
+        user = User(id=user_id, username=f'user{user_id}', email=f'user{user_id}@example.com', **fields)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user(1, plaid_access_token='access-sandbox-1', plaid_item_id='item-1')
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+class FakePlaidServer(ThreadingHTTPServer):
+    """A local HTTP stand-in for the Plaid API, reached by the real client through PLAID_ENV.
+
+    ``responses[path]`` is a list of answers consumed in order, or a single
+    answer reused for every call. An answer is a JSON body, or a
+    ``(status, body)`` pair for an error. Requests are recorded as
+    ``(path, body)`` pairs.
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _FakePlaidHandler)
+        self.responses = {}
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @staticmethod
+    def error(code, status=400):
+        """A Plaid error answer."""
+        return status, {'error_type': 'TRANSACTIONS_ERROR', 'error_code': code, 'error_message': code,
+                        'display_message': None}
+
+    def calls(self, path):
+        return [body for requested, body in self.requests if requested == path]
+
+    def answer(self, path):
+        answers = self.responses.get(path)
+        if answers is None:
+            return 404, {'error_code': 'NOT_FOUND', 'error_message': f'no fake response for {path}'}
+        answer = answers.pop(0) if isinstance(answers, list) else answers
+        return answer if isinstance(answer, tuple) else (200, answer)
+
+
+class _FakePlaidHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.requests.append((self.path, body))
+        status, payload = self.server.answer(self.path)
+        data = json.dumps({'request_id': 'fake-request', **payload}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_plaid(monkeypatch):
+    """Serve FakePlaidServer and point a freshly built Plaid client at it."""
+    server = FakePlaidServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    monkeypatch.setenv('PLAID_ENV', server.url)
+    monkeypatch.setenv('PLAID_CLIENT_ID', 'test-client')
+    monkeypatch.setenv('PLAID_SECRET', 'test-secret')
+    monkeypatch.setattr(plaid_integration, '_client', None)
+    monkeypatch.setattr(plaid_integration, '_webhook_keys', {})
+    monkeypatch.setattr(plaid_integration, 'PLAID_RETRY_BASE_DELAY', 0)
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,61 @@
+import pytest
+
+import merchant_classifier
+from merchant_classifier import categorize_transactions
+from models import db
+from transaction_ingest import upsert_transactions
+
+
+@pytest.fixture(autouse=True)
+def fresh_classifier(monkeypatch):
+    monkeypatch.setattr(merchant_classifier, '_classifier', None)
+
+
+def history(user_id, name, category, merchant_name=None, count=3):
+    upsert_transactions(user_id, [
+        {'transaction_id': f'{user_id}-{name}-{i}', 'date': f'2024-01-{i + 1:02d}', 'amount': 20.0,
+         'name': name, 'merchant_name': merchant_name, 'category': category}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def pending(name, merchant_name=None):
+    return {'transaction_id': name, 'name': name, 'merchant_name': merchant_name, 'category': 'Uncategorized'}
+
+
+def test_a_users_own_history_wins_over_other_users(user, make_user):
+    other = make_user(2)
+    history(user.id, 'COSTCO WHSE #1', 'Groceries', merchant_name='Costco')
+    history(other.id, 'COSTCO WHSE #9', 'Shopping', merchant_name='Costco', count=5)
+
+    mine, theirs = pending('COSTCO WHSE #4', 'Costco'), pending('COSTCO WHSE #7', 'Costco')
+    stats = categorize_transactions(user.id, [mine])
+    categorize_transactions(other.id, [theirs])
+
+    assert (mine['category'], theirs['category']) == ('Groceries', 'Shopping')
+    assert stats['user'] == 1
+
+
+def test_other_users_merchant_names_fill_gaps(user, make_user):
+    other = make_user(2)
+    history(other.id, 'BLUE BOTTLE 0042', 'Coffee', merchant_name='Blue Bottle Coffee')
+
+    row = pending('BLUE BOTTLE 0117', 'Blue Bottle Coffee')
+    stats = categorize_transactions(user.id, [row])
+
+    assert row['category'] == 'Coffee'
+    assert (stats['local'], stats['user']) == (1, 0)
+
+
+def test_payee_names_are_not_shared_between_users(user, make_user):
+    other = make_user(2)
+    history(other.id, 'VENMO PAYMENT JANE DOE', 'Rent', count=6)
+
+    row = pending('VENMO PAYMENT JANE DOE')
+    categorize_transactions(user.id, [row])
+    assert row['category'] == 'Uncategorized'
+
+    own = pending('VENMO PAYMENT JANE DOE')
+    categorize_transactions(other.id, [own])
+    assert own['category'] == 'Rent'
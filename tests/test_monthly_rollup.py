@@ -0,0 +1,98 @@
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+from dashboard_aggregates import aggregate_transactions
+from models import db, MonthlyCategoryRollup, Transaction
+from monthly_rollup import ensure_rollup, refresh_rollup
+from transaction_ingest import delete_transactions, upsert_transactions
+
+
+def raw_aggregate(user_id):
+    """What the rollup should hold, computed row by row from ``transaction``."""
+    groups = defaultdict(list)
+    for t in Transaction.query.filter_by(user_id=user_id):
+        groups[(t.date.strftime('%Y-%m'), t.category or '')].append(t.amount)
+    result = {}
+    for key, amounts in groups.items():
+        expenses = [a for a in amounts if a > 0]
+        result[key] = (
+            len(amounts),
+            pytest.approx(sum(-a for a in amounts if a < 0)),
+            len(expenses),
+            pytest.approx(sum(expenses)),
+            min(expenses, default=None),
+            max(expenses, default=None),
+            pytest.approx(sum(a * a for a in expenses)),
+        )
+    return result
+
+
+def rollup(user_id):
+    return {
+        (r.month, r.category): (r.row_count, r.income_total, r.expense_count, r.expense_total,
+                                r.expense_min, r.expense_max, r.expense_sum_squares)
+        for r in MonthlyCategoryRollup.query.filter_by(user_id=user_id)
+    }
+
+
+def tx(transaction_id, date, amount, category='Shops'):
+    return {'transaction_id': transaction_id, 'date': date, 'name': 'SHOP', 'amount': amount, 'category': category}
+
+
+def test_rollup_tracks_inserts_updates_and_deletes(user):
+    upsert_transactions(user.id, [
+        tx('a', '2024-01-03', 12.5),
+        tx('b', '2024-01-20', 40.0),
+        tx('c', '2024-01-21', -2000.0, category='Payroll'),
+        tx('d', '2024-03-02', 7.25, category=None),
+        tx('e', '2024-04-30', 99.0, category='Travel'),
+    ])
+    db.session.commit()
+    assert rollup(user.id) == raw_aggregate(user.id)
+
+    # Moves a row across months and categories, and changes the January minimum.
+    upsert_transactions(user.id, [tx('a', '2024-03-15', 18.0, category='Travel'), tx('b', '2024-01-20', 41.0)])
+    db.session.commit()
+    assert rollup(user.id) == raw_aggregate(user.id)
+
+    delete_transactions(user.id, ['b', 'e'])
+    db.session.commit()
+    assert rollup(user.id) == raw_aggregate(user.id)
+    assert ('2024-04', 'Travel') not in rollup(user.id)
+
+
+def test_refresh_recomputes_only_the_given_months(user):
+    upsert_transactions(user.id, [tx('a', '2024-01-05', 10.0), tx('b', '2024-02-05', 20.0), tx('c', '2024-03-05', 30.0)])
+    db.session.commit()
+    february = MonthlyCategoryRollup.query.filter_by(user_id=user.id, month='2024-02').one()
+    february.expense_total = -1.0
+    db.session.commit()
+
+    refresh_rollup(user.id, {'2024-01', '2024-03'})
+    db.session.commit()
+
+    assert MonthlyCategoryRollup.query.filter_by(user_id=user.id, month='2024-02').one().expense_total == -1.0
+    assert rollup(user.id)[('2024-03', 'Shops')][3] == 30.0
+
+
+def test_existing_transactions_are_backfilled_on_first_read(user):
+    db.session.execute(Transaction.__table__.insert(), [
+        {'user_id': user.id, 'transaction_id': f'old-{i}', 'date': datetime(2023, 1 + i % 12, 1 + i % 28),
+         'name': 'SHOP', 'amount': float(i % 50) - 5, 'category': ('Shops', 'Travel', None)[i % 3]}
+        for i in range(200)
+    ])
+    db.session.commit()
+    assert rollup(user.id) == {}
+
+    aggregates = aggregate_transactions(user.id, now=datetime(2023, 12, 15))
+
+    assert aggregates.transaction_count == 200
+    assert rollup(user.id) == raw_aggregate(user.id)
+    assert ensure_rollup(user.id) is False
+
+
+def test_backfill_skips_users_without_transactions(user):
+    assert ensure_rollup(user.id) is False
+    assert aggregate_transactions(user.id).transaction_count == 0
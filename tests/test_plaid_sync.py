@@ -0,0 +1,79 @@
+import pytest
+from plaid.exceptions import ApiException
+
+import plaid_integration
+from models import db, Transaction, User
+from sync_worker import sync_user_item
+
+MUTATION = 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION'
+SYNC = '/transactions/sync'
+
+
+def plaid_transaction(transaction_id, amount=5.0):
+    return {
+        'transaction_id': transaction_id, 'account_id': 'acct-1', 'date': '2024-04-02', 'name': 'GROCER',
+        'amount': amount, 'category': ['Shops'], 'merchant_name': 'Grocer', 'pending': False,
+        'iso_currency_code': 'USD', 'unofficial_currency_code': None, 'authorized_date': None,
+        'authorized_datetime': None, 'datetime': None, 'payment_channel': 'in store', 'transaction_code': None,
+    }
+
+
+def page(added=(), next_cursor='', has_more=False, removed=()):
+    return {
+        'transactions_update_status': 'HISTORICAL_UPDATE_COMPLETE', 'accounts': [],
+        'added': list(added), 'modified': [],
+        'removed': [{'transaction_id': r, 'account_id': 'acct-1'} for r in removed],
+        'next_cursor': next_cursor, 'has_more': has_more,
+    }
+
+
+def cursors(fake_plaid):
+    return [body.get('cursor') for body in fake_plaid.calls(SYNC)]
+
+
+def test_sync_restarts_from_the_saved_cursor_and_persists_the_final_one(user, fake_plaid):
+    user.plaid_transactions_cursor = 'cursor-0'
+    db.session.commit()
+    fake_plaid.responses[SYNC] = [
+        page([plaid_transaction('tx-1')], next_cursor='cursor-1', has_more=True),
+        fake_plaid.error(MUTATION),
+        page([plaid_transaction('tx-1')], next_cursor='cursor-1b', has_more=True),
+        page([plaid_transaction('tx-2')], next_cursor='cursor-2', has_more=False),
+    ]
+
+    result = sync_user_item(user)
+
+    assert cursors(fake_plaid) == ['cursor-0', 'cursor-1', 'cursor-0', 'cursor-1b']
+    assert {body['access_token'] for body in fake_plaid.calls(SYNC)} == {'access-sandbox-1'}
+    assert result.inserted == 2
+    db.session.expire_all()
+    assert db.session.get(User, user.id).plaid_transactions_cursor == 'cursor-2'
+    assert {t.transaction_id for t in Transaction.query} == {'tx-1', 'tx-2'}
+
+
+def test_sync_gives_up_after_bounded_restarts(user, fake_plaid):
+    user.plaid_transactions_cursor = 'cursor-0'
+    db.session.commit()
+    restarts = plaid_integration.PLAID_SYNC_MAX_RESTARTS
+    fake_plaid.responses[SYNC] = [fake_plaid.error(MUTATION)] * (restarts + 2)
+
+    with pytest.raises(ApiException):
+        sync_user_item(user)
+
+    assert cursors(fake_plaid) == ['cursor-0'] * (restarts + 1)
+    db.session.rollback()
+    assert db.session.get(User, user.id).plaid_transactions_cursor == 'cursor-0'
+    assert Transaction.query.count() == 0
+
+
+def test_sync_applies_removals(user, fake_plaid):
+    fake_plaid.responses[SYNC] = [
+        page([plaid_transaction('tx-1'), plaid_transaction('tx-2')], next_cursor='cursor-1'),
+        page(removed=['tx-1'], next_cursor='cursor-2'),
+    ]
+    sync_user_item(user)
+
+    result = sync_user_item(user)
+
+    assert result.removed == 1
+    assert [t.transaction_id for t in Transaction.query] == ['tx-2']
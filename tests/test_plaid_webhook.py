@@ -0,0 +1,119 @@
+import hashlib
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+
+import plaid_integration
+import routes.plaid_routes
+from models import db, Transaction
+from sync_worker import SyncWorker
+from transaction_ingest import upsert_transactions
+
+KEY_ID = 'test-key'
+KEY_PATH = '/webhook_verification_key/get'
+
+
+def public_jwk(private_key, **fields):
+    jwk = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    return {**jwk, 'alg': 'ES256', 'kid': KEY_ID, 'use': 'sig', 'created_at': 1, 'expired_at': None, **fields}
+
+
+@pytest.fixture
+def signing_key(fake_plaid):
+    """A throwaway key that the fake Plaid server publishes as KEY_ID."""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    fake_plaid.responses[KEY_PATH] = {'key': public_jwk(private_key)}
+    return private_key
+
+
+@pytest.fixture
+def worker(app, monkeypatch):
+    worker = SyncWorker(max_workers=1)
+    monkeypatch.setattr(routes.plaid_routes, 'get_sync_worker', lambda: worker)
+    yield worker
+    worker.shutdown()
+
+
+@pytest.fixture
+def stored_transactions(user):
+    upsert_transactions(user.id, [
+        {'transaction_id': tx_id, 'date': '2024-05-01', 'name': 'SHOP', 'amount': 20.0}
+        for tx_id in ('tx-1', 'tx-2')
+    ])
+    db.session.commit()
+
+
+def removal_body(item_id='item-1', removed=('tx-1',)):
+    return json.dumps({'webhook_type': 'TRANSACTIONS', 'webhook_code': 'TRANSACTIONS_REMOVED',
+                       'item_id': item_id, 'removed_transactions': list(removed)}).encode('utf-8')
+
+
+def sign(private_key, body, iat=None, kid=KEY_ID):
+    claims = {'iat': int(iat if iat is not None else time.time()),
+              'request_body_sha256': hashlib.sha256(body).hexdigest()}
+    return jwt.encode(claims, private_key, algorithm='ES256', headers={'kid': kid})
+
+
+def post(client, body, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token is not None:
+        headers['Plaid-Verification'] = token
+    return client.post('/api/plaid/webhook', data=body, headers=headers)
+
+
+def remaining():
+    db.session.expire_all()
+    return {t.transaction_id for t in Transaction.query}
+
+
+def test_verified_removal_deletes_transactions(client, fake_plaid, signing_key, worker, stored_transactions):
+    body = removal_body()
+
+    response = post(client, body, sign(signing_key, body))
+    worker.shutdown(wait=True)
+
+    assert response.status_code == 200
+    assert remaining() == {'tx-2'}
+
+
+def test_unsigned_webhook_is_rejected(client, fake_plaid, worker, stored_transactions):
+    response = post(client, removal_body())
+    worker.shutdown(wait=True)
+
+    assert response.status_code == 401
+    assert worker.pending_items() == 0
+    assert remaining() == {'tx-1', 'tx-2'}
+
+
+@pytest.mark.parametrize('forge', ['other_body', 'other_key', 'stale', 'expired_key', 'hs256'])
+def test_forged_webhook_is_rejected(client, fake_plaid, signing_key, worker, stored_transactions, forge):
+    body = removal_body(removed=('tx-1', 'tx-2'))
+    if forge == 'other_body':
+        token = sign(signing_key, removal_body(removed=()))
+    elif forge == 'other_key':
+        token = sign(ec.generate_private_key(ec.SECP256R1()), body)
+    elif forge == 'stale':
+        token = sign(signing_key, body, iat=time.time() - plaid_integration.WEBHOOK_MAX_AGE - 60)
+    elif forge == 'expired_key':
+        fake_plaid.responses[KEY_PATH]['key']['expired_at'] = 1700000000
+        token = sign(signing_key, body)
+    else:
+        token = jwt.encode({'iat': int(time.time()), 'request_body_sha256': hashlib.sha256(body).hexdigest()},
+                           'guessed-secret-that-is-long-enough', algorithm='HS256', headers={'kid': KEY_ID})
+
+    response = post(client, body, token)
+    worker.shutdown(wait=True)
+
+    assert response.status_code == 401
+    assert remaining() == {'tx-1', 'tx-2'}
+
+
+def test_verification_keys_are_cached(client, fake_plaid, signing_key, worker, user):
+    for _ in range(2):
+        body = json.dumps({'webhook_type': 'ITEM', 'webhook_code': 'WEBHOOK_UPDATE_ACKNOWLEDGED'}).encode()
+        assert post(client, body, sign(signing_key, body)).status_code == 200
+
+    assert [body['key_id'] for body in fake_plaid.calls(KEY_PATH)] == [KEY_ID]
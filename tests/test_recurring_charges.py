@@ -0,0 +1,116 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from models import db, RecurringCharge, Transaction
+from recurring_charges import detect_charge, load_recurring, merchant_key, refresh_recurring
+from transaction_ingest import delete_transactions, upsert_transactions
+
+
+def monthly(*months, day=15, amount=9.99, year=2024):
+    return [(datetime(year, month, day), amount) for month in months]
+
+
+def test_detects_a_monthly_charge():
+    charge = detect_charge(monthly(1, 2, 3, 4, 5))
+
+    assert charge['period'] == 'monthly'
+    assert charge['occurrences'] == 5
+    assert charge['next_expected'].strftime('%Y-%m') == '2024-06'
+    assert charge['amount_change'] == 0
+
+
+def test_tolerates_a_skipped_cycle():
+    charge = detect_charge(monthly(1, 2, 3, 5, 6, 7))
+
+    assert charge is not None
+    assert charge['period'] == 'monthly'
+    assert 28 <= charge['interval_days'] <= 31
+    assert charge['occurrences'] == 6
+
+
+def test_keeps_a_subscription_through_a_price_change():
+    charge = detect_charge(monthly(1, 2, 3, 4) + monthly(5, 6, 7, amount=12.99))
+
+    assert charge['period'] == 'monthly'
+    assert charge['amount'] == 12.99
+    assert charge['typical_amount'] == 9.99
+    assert charge['amount_change'] == pytest.approx(3.0 / 9.99)
+
+
+def test_ignores_irregular_spending():
+    days = [(1, 3), (1, 9), (2, 20), (2, 22), (4, 1), (6, 30)]
+    assert detect_charge([(datetime(2024, m, d), 25.0) for m, d in days]) is None
+
+
+def test_ignores_a_merchant_whose_price_keeps_changing():
+    assert detect_charge([(datetime(2024, m, 15), amount) for m, amount in
+                          zip(range(1, 7), (10.0, 25.0, 11.0, 40.0, 9.0, 30.0))]) is None
+
+
+def test_ingest_keeps_stored_charges_current(user):
+    spellings = ['NETFLIX.COM 8472', 'Netflix.com', 'NETFLIX.COM 1138']
+    upsert_transactions(user.id, [
+        {'transaction_id': f'nf-{month}', 'date': f'2024-{month:02d}-03', 'amount': 15.49,
+         'name': spellings[month % 3], 'category': 'Service'}
+        for month in (1, 2, 3, 5, 6)
+    ])
+    db.session.commit()
+
+    charges = load_recurring(user.id)
+    assert len(charges) == 1
+    assert charges[0]['period'] == 'monthly' and charges[0]['occurrences'] == 5
+
+    delete_transactions(user.id, ['nf-3', 'nf-5', 'nf-6'])
+    db.session.commit()
+    assert RecurringCharge.query.filter_by(user_id=user.id).count() == 0
+
+
+@pytest.fixture
+def transaction_rows_read():
+    """Count ``transaction`` rows fetched by SELECTs, by re-running each one."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT "transaction".'):
+            statements.append((statement, parameters))
+    engine = db.engine
+    event.listen(engine, 'after_cursor_execute', record)
+
+    def count():
+        connection = db.session.connection()
+        return sum(len(connection.exec_driver_sql(statement, parameters).fetchall())
+                   for statement, parameters in list(statements))
+    yield statements, count
+    event.remove(engine, 'after_cursor_execute', record)
+
+
+def test_refresh_reads_only_the_touched_merchants_rows(user, transaction_rows_read):
+    upsert_transactions(user.id, [
+        {'transaction_id': f'{merchant}-{month}-{day}', 'date': f'2024-{month:02d}-{day:02d}', 'amount': 9.99,
+         'name': merchant, 'category': 'Service'}
+        for merchant in ('NETFLIX.COM', 'SPOTIFY', 'GROCER 42') for month in range(1, 13) for day in (3, 17)
+    ])
+    db.session.commit()
+    statements, rows_read = transaction_rows_read
+    statements.clear()
+
+    refresh_recurring(user.id, {merchant_key('NETFLIX.COM')}, now=datetime(2024, 12, 31))
+
+    assert rows_read() == 24
+
+
+def test_refresh_fills_merchant_keys_of_older_rows(user):
+    db.session.execute(Transaction.__table__.insert(), [
+        {'user_id': user.id, 'transaction_id': f'old-{month}', 'date': datetime(2024, month, 3),
+         'name': 'HULU 123', 'amount': 7.99}
+        for month in range(1, 6)
+    ])
+    db.session.commit()
+
+    refresh_recurring(user.id, {'hulu'}, now=datetime(2024, 6, 1))
+    db.session.commit()
+
+    assert {t.merchant_key for t in Transaction.query.filter_by(user_id=user.id)} == {'hulu'}
+    assert [c['merchant'] for c in load_recurring(user.id)] == ['HULU 123']
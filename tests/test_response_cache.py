@@ -0,0 +1,74 @@
+import importlib
+from types import SimpleNamespace
+
+import pytest
+
+from response_cache import _MISSING, CacheBackend, MemoryLRUBackend, response_cache
+
+
+def test_backend_missing_a_method_fails_on_creation():
+    class NoClear(CacheBackend):
+        def get(self, key):
+            return _MISSING
+
+        def set(self, key, value, ttl):
+            pass
+
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError, match='clear'):
+        NoClear()
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryLRUBackend(max_entries=2)
+    backend.set('a', 1, ttl=60)
+    backend.set('b', 2, ttl=60)
+    backend.get('a')
+    backend.set('c', 3, ttl=60)
+
+    assert backend.get('b') is _MISSING
+    assert (backend.get('a'), backend.get('c'), len(backend)) == (1, 3, 2)
+
+
+@pytest.fixture
+def overview(app, client, user, monkeypatch):
+    """GET /api/ai/overview with scripted AI results; returns (get, results, calls)."""
+    monkeypatch.setenv('DATABASE_URL', 'sqlite://')
+    main = importlib.import_module('app')
+    app.add_url_rule('/api/ai/overview', view_func=main.get_ai_overview)
+    response_cache.backend.clear()
+
+    results, calls = {}, []
+
+    def run_concurrently(coroutines):
+        calls.append(list(coroutines))
+        return dict(results)
+
+    service = SimpleNamespace(**{name: lambda *args: None for name in (
+        'generate_financial_advice_async', 'analyze_budget_spending_async', 'generate_personalized_lesson_async')})
+    monkeypatch.setattr(main, 'aggregate_transactions', lambda user_id: SimpleNamespace(transaction_count=1))
+    monkeypatch.setattr(main, '_ai_user_context', lambda user_id, aggregates: ({}, {}, []))
+    monkeypatch.setattr(main, 'get_service', lambda cls: service)
+    monkeypatch.setattr(main, 'run_concurrently', run_concurrently)
+
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    yield lambda: client.get('/api/ai/overview'), results, calls
+    response_cache.backend.clear()
+
+
+def test_ai_overview_with_a_failed_call_is_not_cached(overview):
+    get, results, calls = overview
+    results.update(advice=None, budget_analysis={'ok': True}, lesson={'title': 'Saving'})
+
+    response = get()
+    assert response.status_code == 200
+    assert response.get_json()['advice'] is None
+    assert response.cache_control.no_store
+
+    results['advice'] = {'advice_summary': 'Spend less'}
+    assert get().get_json()['advice'] == {'advice_summary': 'Spend less'}
+    assert get().get_json()['advice'] == {'advice_summary': 'Spend less'}
+    assert len(calls) == 2
@@ -0,0 +1,35 @@
+import warnings
+
+import pytest
+
+from ai_services.schemas import FinancialAdvice
+from ai_services.structured import extract_json, repair_prompt, validate_response
+
+ADVICE = '{"advice_summary": "Spend less", "advice": [{"title": "Food", "recommendation": "Cook", ' \
+         '"actionable_item": "Plan meals"}],}'
+
+
+@pytest.fixture(autouse=True)
+def no_deprecations():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        yield
+
+
+def test_extracts_fenced_json_with_a_trailing_comma():
+    assert extract_json(f"Sure!\n```json\n{ADVICE}\n```\nHope that helps.")['advice_summary'] == 'Spend less'
+
+
+def test_validates_against_the_schema():
+    result, error = validate_response(ADVICE, FinancialAdvice)
+
+    assert error is None
+    assert result.model_dump()['advice'][0]['title'] == 'Food'
+
+
+def test_reports_why_validation_failed():
+    result, error = validate_response('{"advice_summary": "x"}', FinancialAdvice)
+
+    assert result is None
+    assert 'advice' in error
+    assert '"advice_summary"' in repair_prompt('{}', FinancialAdvice, error)
@@ -0,0 +1,134 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import sync_worker
+from models import db, SyncJob, Transaction
+
+
+def test_worker_is_rebuilt_in_a_forked_process(monkeypatch):
+    monkeypatch.setattr(sync_worker, '_worker', None)
+    monkeypatch.setattr(sync_worker, '_worker_pid', None)
+    monkeypatch.setattr(sync_worker.os, 'getpid', lambda: 100)
+    parent = sync_worker.get_sync_worker()
+    assert sync_worker.get_sync_worker() is parent
+
+    monkeypatch.setattr(sync_worker.os, 'getpid', lambda: 101)
+    child = sync_worker.get_sync_worker()
+
+    assert child is not parent
+    assert sync_worker.get_sync_worker() is child
+    parent.shutdown()
+    child.shutdown()
+
+
+def updates(*transaction_ids, status='INITIAL_UPDATE_COMPLETE', cursor='cursor'):
+    return {
+        'added': [{'transaction_id': tx_id, 'date': '2024-06-01', 'name': 'SHOP', 'amount': 5.0}
+                  for tx_id in transaction_ids],
+        'modified': [],
+        'removed': [],
+        'next_cursor': cursor,
+        'update_status': status,
+    }
+
+
+@pytest.fixture
+def plaid_pages(monkeypatch):
+    """Script the results of fetch_transaction_updates; an Exception entry is raised."""
+    script = []
+
+    def fetch(access_token, cursor=None):
+        step = script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+    monkeypatch.setattr(sync_worker, 'fetch_transaction_updates', fetch)
+    return script
+
+
+@pytest.fixture
+def worker(app, monkeypatch):
+    monkeypatch.setattr(sync_worker, 'IMPORT_POLL_SECONDS', 3600)
+    worker = sync_worker.SyncWorker(max_workers=1)
+    yield worker
+    worker.shutdown()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not reached")
+
+
+def job_status(job_id):
+    return db.session.get(SyncJob, job_id).status
+
+
+def test_import_job_is_stored_and_visible_to_any_process(app, client, user, worker, plaid_pages):
+    plaid_pages.append(updates('tx-1', 'tx-2'))
+
+    job = worker.submit_import(app, user.id, user.plaid_item_id)
+    wait_for(lambda: job_status(job.id) == 'succeeded')
+
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    response = client.get(f'/api/plaid/sync_jobs/{job.id}')
+    assert response.status_code == 200
+    assert response.get_json()['result']['inserted'] == 2
+
+
+def test_import_waits_until_plaid_finishes_the_initial_pull(app, user, worker, plaid_pages):
+    plaid_pages.append(updates(status='NOT_READY', cursor='cursor-1'))
+    job = worker.submit_import(app, user.id, user.plaid_item_id)
+    wait_for(lambda: worker.pending_items() == 0)
+    assert job_status(job.id) == 'waiting'
+
+    # A SYNC_UPDATES_AVAILABLE webhook, possibly handled by another process's worker.
+    plaid_pages.append(updates('tx-1', status='INITIAL_UPDATE_COMPLETE', cursor='cursor-2'))
+    other_worker = sync_worker.SyncWorker(max_workers=1)
+    other_worker.enqueue_sync(app, user.plaid_item_id)
+    other_worker.shutdown(wait=True)
+
+    db.session.expire_all()
+    job = db.session.get(SyncJob, job.id)
+    assert job.status == 'succeeded'
+    assert job.result['inserted'] == 1
+    assert Transaction.query.count() == 1
+
+
+def test_waiting_import_polls_plaid_again(app, user, worker, plaid_pages, monkeypatch):
+    monkeypatch.setattr(sync_worker, 'IMPORT_POLL_SECONDS', 0.05)
+    plaid_pages.extend([updates(status='NOT_READY'), updates(status='NOT_READY'), updates('tx-1')])
+
+    job = worker.submit_import(app, user.id, user.plaid_item_id)
+
+    wait_for(lambda: job_status(job.id) == 'succeeded')
+    assert not plaid_pages
+
+
+def test_waiting_import_times_out(app, user, worker, plaid_pages):
+    plaid_pages.append(updates(status='NOT_READY'))
+    job = worker.submit_import(app, user.id, user.plaid_item_id)
+    wait_for(lambda: worker.pending_items() == 0)
+    db.session.get(SyncJob, job.id).created_at = datetime.utcnow() - sync_worker.IMPORT_READY_TIMEOUT - timedelta(1)
+    db.session.commit()
+
+    plaid_pages.append(updates(status='NOT_READY'))
+    worker.enqueue_sync(app, user.plaid_item_id)
+
+    wait_for(lambda: job_status(job.id) == 'failed')
+
+
+def test_failed_sync_fails_the_job(app, user, worker, plaid_pages):
+    plaid_pages.append(RuntimeError('ITEM_LOGIN_REQUIRED'))
+
+    job = worker.submit_import(app, user.id, user.plaid_item_id)
+
+    wait_for(lambda: job_status(job.id) == 'failed')
+    assert 'ITEM_LOGIN_REQUIRED' in db.session.get(SyncJob, job.id).error
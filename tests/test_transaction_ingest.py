@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from models import db, Transaction, User
+from transaction_ingest import apply_transaction_updates, upsert_transactions
+
+
+def plaid_row(transaction_id, amount=10.0, date='2024-03-05', **fields):
+    return {
+        'transaction_id': transaction_id,
+        'account_id': 'acct-1',
+        'date': date,
+        'name': fields.pop('name', 'COFFEE SHOP'),
+        'amount': amount,
+        'category': fields.pop('category', 'Food and Drink'),
+        'merchant_name': fields.pop('merchant_name', 'Coffee Shop'),
+        'pending': False,
+        **fields,
+    }
+
+
+def stored(user_id):
+    return {t.transaction_id: t for t in Transaction.query.filter_by(user_id=user_id)}
+
+
+def test_upsert_inserts_new_rows(user):
+    result = upsert_transactions(user.id, [plaid_row('tx-1'), plaid_row('tx-2', amount=4.5)])
+    db.session.commit()
+
+    assert (result.inserted, result.updated, result.unchanged) == (2, 0, 0)
+    rows = stored(user.id)
+    assert rows['tx-2'].amount == 4.5
+    assert rows['tx-1'].date == datetime(2024, 3, 5)
+
+
+def test_upsert_dedupes_within_a_batch_keeping_the_last_row(user):
+    result = upsert_transactions(user.id, [plaid_row('tx-1', amount=1.0), plaid_row('tx-1', amount=2.0)])
+    db.session.commit()
+
+    assert result.inserted == 1 and result.total == 1
+    assert stored(user.id)['tx-1'].amount == 2.0
+
+
+def test_upsert_updates_changed_rows_and_counts_unchanged(user):
+    upsert_transactions(user.id, [plaid_row('tx-1'), plaid_row('tx-2')])
+    db.session.commit()
+
+    result = upsert_transactions(user.id, [plaid_row('tx-1', amount=12.0, pending=True), plaid_row('tx-2')])
+    db.session.commit()
+
+    assert (result.inserted, result.updated, result.unchanged) == (0, 1, 1)
+    db.session.expire_all()
+    rows = stored(user.id)
+    assert rows['tx-1'].amount == 12.0 and rows['tx-1'].pending is True
+    assert Transaction.query.count() == 2
+
+
+def test_upsert_reports_ids_owned_by_another_user(user, make_user):
+    other = make_user(2)
+    upsert_transactions(other.id, [plaid_row('tx-shared', amount=3.0)])
+    db.session.commit()
+
+    result = upsert_transactions(user.id, [plaid_row('tx-shared', amount=99.0), plaid_row('tx-mine')])
+    db.session.commit()
+
+    assert (result.inserted, result.unchanged, result.conflicts) == (1, 0, 1)
+    db.session.expire_all()
+    assert stored(other.id)['tx-shared'].amount == 3.0
+    assert set(stored(user.id)) == {'tx-mine'}
+
+
+def test_apply_updates_deletes_removed_ids_and_bumps_the_data_version(user):
+    upsert_transactions(user.id, [plaid_row('tx-1'), plaid_row('tx-2')])
+    db.session.commit()
+    version = db.session.get(User, user.id).data_version
+
+    result = apply_transaction_updates(user.id, {'added': [], 'modified': [], 'removed': ['tx-1', 'tx-unknown']})
+    db.session.commit()
+
+    assert result.removed == 1
+    assert set(stored(user.id)) == {'tx-2'}
+    db.session.expire_all()
+    assert db.session.get(User, user.id).data_version > version
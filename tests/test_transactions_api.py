@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from models import db, Transaction
+
+
+def add_rows(user_id, *rows):
+    """Insert (transaction_id, date, amount, category, merchant) rows."""
+    db.session.add_all([
+        Transaction(user_id=user_id, transaction_id=tx_id, date=date, name=merchant.upper(), merchant_name=merchant,
+                    amount=amount, category=category)
+        for tx_id, date, amount, category, merchant in rows
+    ])
+    db.session.commit()
+
+
+def history(user_id, count=23):
+    """Three rows a day, so most pages end in the middle of a date."""
+    add_rows(user_id, *[
+        (f'tx-{i}', datetime(2024, 5, 1 + i // 3), float(i + 1), ('Shops', 'Travel')[i % 2], f'Store {i % 4}')
+        for i in range(count)
+    ])
+
+
+def newest_first(user_id):
+    return [t.transaction_id for t in Transaction.query.filter_by(user_id=user_id)
+            .order_by(Transaction.date.desc(), Transaction.id.desc())]
+
+
+def pages(client, headers, **params):
+    """Follow next_cursor from the first page to the last, yielding each response body."""
+    params.setdefault('limit', 5)
+    cursor = None
+    while True:
+        query = dict(params, cursor=cursor) if cursor else params
+        response = client.get('/api/transactions', query_string=query, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        yield body
+        if not body['has_more']:
+            assert body['next_cursor'] is None
+            return
+        cursor = body['next_cursor']
+
+
+def listed(bodies):
+    return [t['id'] for body in bodies for t in body['transactions']]
+
+
+def test_cursor_pages_cover_every_row_once_newest_first(client, user, auth_headers):
+    history(user.id)
+
+    bodies = list(pages(client, auth_headers))
+
+    assert listed(bodies) == newest_first(user.id)
+    assert [len(body['transactions']) for body in bodies] == [5, 5, 5, 5, 3]
+
+
+def test_cursor_is_stable_when_newer_rows_arrive(client, user, auth_headers):
+    history(user.id)
+    expected = newest_first(user.id)
+    walk = pages(client, auth_headers)
+    first = next(walk)
+
+    # A sync lands mid-browse, including a row on the date the first page stopped at.
+    add_rows(user.id, ('new-1', datetime(2024, 6, 1), 1.0, 'Shops', 'Late'),
+             ('new-2', datetime(2024, 5, 7), 1.0, 'Shops', 'Late'))
+
+    assert listed([first]) + listed(walk) == expected
+
+
+def test_filters_apply_across_pages(client, user, auth_headers, make_user):
+    history(user.id)
+    make_user(2)
+    add_rows(2, ('other-1', datetime(2024, 5, 2), 50.0, 'Travel', 'Store 1'))
+
+    bodies = list(pages(client, auth_headers, category='Travel', min_amount=8, merchant='store 1', limit=2))
+
+    assert listed(bodies) == ['tx-21', 'tx-17', 'tx-13', 'tx-9']
+
+
+def test_invalid_cursor_is_rejected(client, user, auth_headers):
+    response = client.get('/api/transactions', query_string={'cursor': 'not-a-cursor'}, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['msg'] == 'Invalid cursor'
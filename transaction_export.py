@@ -0,0 +1,182 @@
+"""
+Streaming export of a user's transactions as NDJSON, CSV or Parquet.
+
+Rows are read as plain column tuples with ``yield_per``. On PostgreSQL this
+uses a server-side cursor, so at most EXPORT_BATCH_SIZE rows are held at a
+time and no ORM objects are built. Each format is encoded one batch at a
+time into bytes chunks for a generator response or a file. A Parquet batch
+becomes one row group, and the footer is written once the last batch is
+done. Memory stays flat however many rows a user has.
+
+``pyarrow`` is only imported for Parquet exports.
+
+    python transaction_export.py --user-id 1 --format csv --output transactions.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+from models import db, Transaction
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = int(os.getenv('TRANSACTION_EXPORT_BATCH_SIZE', '2000'))
+
+COLUMNS = ('transaction_id', 'date', 'name', 'amount', 'category', 'merchant_name', 'account_id', 'pending')
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def iter_batches(user_id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[Tuple]]:
+    """A user's transactions in (date, id) order, as lists of COLUMNS tuples.
+
+    Both dates are inclusive days.
+    """
+    query = db.session.query(*[getattr(Transaction, column) for column in COLUMNS])\
+        .filter(Transaction.user_id == user_id)
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.date < end_date + timedelta(days=1))
+    rows = query.order_by(Transaction.date, Transaction.id).yield_per(batch_size)
+
+    batch = []
+    for row in rows:
+        batch.append(tuple(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _iso(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_ndjson(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        lines = [json.dumps(dict(zip(COLUMNS, map(_iso, row))), separators=(',', ':')) for row in batch]
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def encode_csv(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for batch in batches:
+        writer.writerows([_iso(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for a user with no transactions.
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what has been written since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def encode_parquet(batches: Iterable[List[Tuple]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('transaction_id', pa.string()),
+        ('date', pa.timestamp('us')),
+        ('name', pa.string()),
+        ('amount', pa.float64()),
+        ('category', pa.string()),
+        ('merchant_name', pa.string()),
+        ('account_id', pa.string()),
+        ('pending', pa.bool_()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(zip(*batch), schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+_ENCODERS = {
+    'ndjson': encode_ndjson,
+    'csv': encode_csv,
+    'parquet': encode_parquet,
+}
+
+
+def export_transactions(user_id: int, fmt: str, start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None) -> Iterator[bytes]:
+    """Encoded chunks of a user's transactions; ``fmt`` is a key of FORMATS."""
+    if fmt not in _ENCODERS:
+        raise ValueError(f"Unsupported export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return _ENCODERS[fmt](iter_batches(user_id, start_date, end_date))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a user's transactions.")
+    parser.add_argument("--user-id", type=int, required=True, help="User to export.")
+    parser.add_argument("--format", choices=sorted(FORMATS), default='ndjson', help="Output format.")
+    parser.add_argument("--output", default='-', help="File to write; '-' for stdout.")
+    parser.add_argument("--start-date", type=lambda s: datetime.strptime(s, '%Y-%m-%d'), default=None,
+                        help="First day to include (YYYY-MM-DD).")
+    parser.add_argument("--end-date", type=lambda s: datetime.strptime(s, '%Y-%m-%d'), default=None,
+                        help="Last day to include (YYYY-MM-DD).")
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        started = time.perf_counter()
+        written = 0
+        out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+        try:
+            for chunk in export_transactions(args.user_id, args.format, args.start_date, args.end_date):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        print(f"Wrote {written} bytes of {args.format} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
@@ -0,0 +1,196 @@
+"""
+Columnar, NumPy-backed view of a set of transactions for analytics.
+
+A :class:`TransactionFrame` holds parallel arrays: dates as int64 days since
+1970-01-01, float64 amounts, and category and merchant codes that index
+into label lists in first-seen order. It is built once, either from a
+projected SQL query (:meth:`TransactionFrame.from_query`, no ORM objects) or
+from a list of transaction dicts (:meth:`TransactionFrame.from_dicts`).
+Analytics then run as grouped reductions over the arrays, with no per-row
+Python loops and no repeated date parsing.
+
+Amounts keep the sign of their source. Rows from the database use the app's
+convention, where a positive amount is an expense. Callers whose dicts use
+negative spending pass ``negative=True`` to :meth:`expenses`.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import Transaction
+
+UNCATEGORIZED = 'Uncategorized'
+
+# Columns read by from_query, in row order.
+FRAME_COLUMNS = (Transaction.date, Transaction.amount, Transaction.category, Transaction.merchant_name,
+                 Transaction.name)
+
+
+def factorize(values: Sequence) -> Tuple[List, np.ndarray]:
+    """Distinct values in first-seen order, and each value's index into them."""
+    index: Dict = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.intp, count=len(values))
+    return list(index), codes
+
+
+def _compact(labels: List, codes: np.ndarray) -> Tuple[List, np.ndarray]:
+    """Drop labels no code refers to, keeping first-seen order."""
+    present, first = np.unique(codes, return_index=True)
+    order = present[np.argsort(first)]
+    remap = np.empty(len(labels), dtype=np.intp)
+    remap[order] = np.arange(len(order))
+    return [labels[i] for i in order], remap[codes]
+
+
+def grouped_stats(codes: np.ndarray, values: np.ndarray, groups: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-group count, mean and population std of ``values`` in O(n).
+
+    Empty groups get a mean and std of NaN.
+    """
+    counts = np.bincount(codes, minlength=groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.bincount(codes, weights=values, minlength=groups) / counts
+        # Two passes rather than E[x^2] - E[x]^2, which loses precision for large amounts.
+        squared = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=groups)
+        stds = np.sqrt(squared / counts)
+    return counts, means, stds
+
+
+def _to_days(dates: Iterable) -> np.ndarray:
+    return np.array(list(dates), dtype='datetime64[D]').astype(np.int64)
+
+
+@dataclass
+class TransactionFrame:
+    days: np.ndarray            # days since 1970-01-01, int64
+    amounts: np.ndarray         # float64, sign as in the source
+    categories: List
+    category_codes: np.ndarray
+    merchants: List
+    merchant_codes: np.ndarray
+    # The source dicts when built by from_dicts, for reporting individual rows.
+    rows: Optional[List[Dict]] = None
+
+    @classmethod
+    def from_dicts(cls, transactions: Sequence[Dict]) -> 'TransactionFrame':
+        """Frame over ``to_dict``-style dicts; 'date' may be an ISO string or a date."""
+        transactions = list(transactions)
+        categories, category_codes = factorize([t.get('category', UNCATEGORIZED) for t in transactions])
+        merchants, merchant_codes = factorize([t.get('merchant_name', t.get('name', '')) for t in transactions])
+        return cls(
+            days=_to_days(str(t['date'])[:10] for t in transactions),
+            amounts=np.fromiter((t['amount'] for t in transactions), dtype=float, count=len(transactions)),
+            categories=categories,
+            category_codes=category_codes,
+            merchants=merchants,
+            merchant_codes=merchant_codes,
+            rows=transactions,
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> 'TransactionFrame':
+        """Frame over (date, amount, category, merchant_name, name) tuples."""
+        dates, amounts, categories, merchants = [], [], [], []
+        for tx_date, amount, category, merchant_name, name in rows:
+            dates.append(tx_date)
+            amounts.append(amount or 0.0)
+            categories.append(category or UNCATEGORIZED)
+            merchants.append(merchant_name or name or '')
+        category_labels, category_codes = factorize(categories)
+        merchant_labels, merchant_codes = factorize(merchants)
+        return cls(
+            days=_to_days(dates),
+            amounts=np.array(amounts, dtype=float),
+            categories=category_labels,
+            category_codes=category_codes,
+            merchants=merchant_labels,
+            merchant_codes=merchant_codes,
+        )
+
+    @classmethod
+    def from_query(cls, query) -> 'TransactionFrame':
+        """Frame over a ``Transaction`` query, selecting only FRAME_COLUMNS."""
+        return cls.from_rows(query.with_entities(*FRAME_COLUMNS))
+
+    @classmethod
+    def for_user(cls, user_id: int, since: Optional[datetime] = None) -> 'TransactionFrame':
+        query = Transaction.query.filter(Transaction.user_id == user_id)
+        if since is not None:
+            query = query.filter(Transaction.date >= since)
+        return cls.from_query(query)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def select(self, mask: np.ndarray) -> 'TransactionFrame':
+        """The rows where ``mask`` is true; label order stays first-seen within them."""
+        categories, category_codes = _compact(self.categories, self.category_codes[mask])
+        merchants, merchant_codes = _compact(self.merchants, self.merchant_codes[mask])
+        rows = None
+        if self.rows is not None:
+            rows = [self.rows[i] for i in np.flatnonzero(mask)]
+        return TransactionFrame(
+            days=self.days[mask],
+            amounts=self.amounts[mask],
+            categories=categories,
+            category_codes=category_codes,
+            merchants=merchants,
+            merchant_codes=merchant_codes,
+            rows=rows,
+        )
+
+    def expenses(self, negative: bool = False) -> 'TransactionFrame':
+        """Expense rows with positive amounts; ``negative`` if the source records spending below zero."""
+        spending = self.select(self.amounts < 0 if negative else self.amounts > 0)
+        spending.amounts = np.abs(spending.amounts)
+        return spending
+
+    @property
+    def months(self) -> np.ndarray:
+        """Months since 1970-01 per row, int64."""
+        return self.days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+    def category_summary(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Per-category count, total, min and max of the amounts."""
+        groups = len(self.categories)
+        counts = np.bincount(self.category_codes, minlength=groups)
+        totals = np.bincount(self.category_codes, weights=self.amounts, minlength=groups)
+        minima = np.full(groups, np.inf)
+        maxima = np.full(groups, -np.inf)
+        np.minimum.at(minima, self.category_codes, self.amounts)
+        np.maximum.at(maxima, self.category_codes, self.amounts)
+        return counts, totals, minima, maxima
+
+    def category_totals(self) -> Dict[str, float]:
+        totals = np.bincount(self.category_codes, weights=self.amounts, minlength=len(self.categories))
+        return {category: float(total) for category, total in zip(self.categories, totals)}
+
+    def monthly_totals(self) -> Dict[str, float]:
+        """Amount per 'YYYY-MM', for months that have any, in date order."""
+        if not len(self):
+            return {}
+        months = self.months
+        first = int(months.min())
+        totals = np.bincount(months - first, weights=self.amounts)
+        return {
+            str(np.datetime64(first + int(offset), 'M')): float(totals[offset])
+            for offset in np.flatnonzero(totals)
+        }
+
+    def category_z_scores(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Each row's z-score within its category (0 where the std is 0), and the category means."""
+        _, means, stds = grouped_stats(self.category_codes, self.amounts, len(self.categories))
+        row_std = stds[self.category_codes]
+        deviation = self.amounts - means[self.category_codes]
+        z_scores = np.divide(deviation, row_std, out=np.zeros_like(deviation), where=row_std > 0)
+        return z_scores, means
+
+    def merchant_intervals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Days between consecutive rows of the same merchant in date order, and each interval's merchant code."""
+        order = np.lexsort((self.days, self.merchant_codes))
+        codes, days = self.merchant_codes[order], self.days[order]
+        same_merchant = codes[1:] == codes[:-1]
+        return np.diff(days)[same_merchant].astype(float), codes[1:][same_merchant]
@@ -0,0 +1,232 @@
+"""
+Bulk ingestion of Plaid transactions into the ``transaction`` table.
+
+A whole sync batch is de-duplicated against the unique ``transaction_id``
+column with one set-based lookup per chunk instead of a SELECT per row.
+New rows are written with a native ``INSERT ... ON CONFLICT DO NOTHING`` on
+PostgreSQL and SQLite (a plain multi-row insert elsewhere) and changed rows
+are updated with a single executemany. Deltas from ``/transactions/sync``
+are applied with :func:`apply_transaction_updates`, which also bulk-deletes
+removed transaction ids. Both keep ``monthly_category_rollup`` and
+``recurring_charge`` current by refreshing the months and merchants they
+touched. Uncategorized rows in a delta are
+labelled by the local merchant classifier before they are written.
+"""
+
+import logging
+from dataclasses import dataclass, asdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Set
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from merchant_classifier import categorize_transactions, merchant_key
+from models import db, Transaction
+from monthly_rollup import lock_user, month_of, refresh_rollup, transaction_months
+from recurring_charges import refresh_recurring, transaction_merchants
+from response_cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+# Columns a sync is allowed to overwrite on an existing row.
+UPDATABLE_FIELDS = ('account_id', 'date', 'name', 'amount', 'category', 'merchant_name', 'merchant_key', 'pending')
+
+# Rows per IN (...) lookup and multi-row INSERT. A full insert binds 500 x 10 =
+# 5,000 parameters, so SQLite must be 3.32 or later (limit 32,766; older
+# builds stop at 999).
+CHUNK_SIZE = 500
+
+_ON_CONFLICT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+@dataclass
+class IngestResult:
+    """Counts reported by a bulk upsert."""
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # Rows whose transaction_id is already stored for a different user; never written.
+    conflicts: int = 0
+    removed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated + self.unchanged + self.conflicts
+
+    def merge(self, other: 'IngestResult') -> 'IngestResult':
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.conflicts += other.conflicts
+        self.removed += other.removed
+        return self
+
+    def to_dict(self) -> Dict[str, int]:
+        return {**asdict(self), 'total': self.total}
+
+
+def normalize_row(user_id: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce a processed Plaid transaction into ``transaction`` column values."""
+    tx_date = row.get('date')
+    if isinstance(tx_date, str):
+        tx_date = datetime.strptime(tx_date[:10], '%Y-%m-%d')
+    elif isinstance(tx_date, date) and not isinstance(tx_date, datetime):
+        tx_date = datetime.combine(tx_date, datetime.min.time())
+
+    name = row.get('name') or ''
+    return {
+        'user_id': user_id,
+        'transaction_id': str(row['transaction_id']),
+        'account_id': row.get('account_id'),
+        'date': tx_date,
+        'name': name,
+        'amount': float(row.get('amount') or 0.0),
+        'category': row.get('category'),
+        'merchant_name': row.get('merchant_name'),
+        'merchant_key': merchant_key(name, row.get('merchant_name')),
+        'pending': bool(row.get('pending')),
+    }
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_rows(rows: List[Dict[str, Any]]) -> int:
+    """Insert new rows, letting the database skip ids that raced in meanwhile."""
+    if not rows:
+        return 0
+
+    table = Transaction.__table__
+    insert = _ON_CONFLICT_INSERTS.get(db.engine.dialect.name)
+    if insert is None:
+        db.session.execute(table.insert(), rows)
+        return len(rows)
+
+    stmt = insert(table).values(rows).on_conflict_do_nothing(index_elements=['transaction_id'])
+    result = db.session.execute(stmt)
+    return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+
+
+def _upsert_chunk(user_id: int, rows: List[Dict[str, Any]], months: Set[str], merchants: Set[str]) -> IngestResult:
+    result = IngestResult()
+    existing = {
+        r.transaction_id: r
+        for r in db.session.query(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.transaction_id,
+            *[getattr(Transaction, field) for field in UPDATABLE_FIELDS]
+        ).filter(Transaction.transaction_id.in_([row['transaction_id'] for row in rows]))
+    }
+
+    inserts, updates = [], []
+    for row in rows:
+        current = existing.get(row['transaction_id'])
+        if current is None:
+            inserts.append(row)
+            months.add(month_of(row['date']))
+            merchants.add(row['merchant_key'])
+            continue
+        if current.user_id != user_id:
+            logger.warning("Skipping transaction %s for user %s: already stored for user %s",
+                           row['transaction_id'], user_id, current.user_id)
+            result.conflicts += 1
+            continue
+
+        changes = {
+            field: row[field] for field in UPDATABLE_FIELDS
+            if getattr(current, field) != row[field]
+        }
+        if changes:
+            updates.append({'id': current.id, **changes})
+            months.update((month_of(current.date), month_of(row['date'])))
+            merchants.update((merchant_key(current.name, current.merchant_name), row['merchant_key']))
+        else:
+            result.unchanged += 1
+
+    inserted = _insert_rows(inserts)
+    result.inserted += inserted
+    result.unchanged += len(inserts) - inserted
+
+    if updates:
+        db.session.bulk_update_mappings(Transaction, updates)
+        result.updated += len(updates)
+
+    return result
+
+
+def upsert_transactions(user_id: int, transactions: Iterable[Dict[str, Any]]) -> IngestResult:
+    """Insert or update a batch of processed Plaid transactions for a user.
+
+    The caller owns the session and is expected to commit or roll back.
+    """
+    # Later duplicates within one batch win, matching Plaid's modified-after-added order.
+    batch = {}
+    for transaction in transactions:
+        row = normalize_row(user_id, transaction)
+        batch[row['transaction_id']] = row
+
+    result = IngestResult()
+    if not batch:
+        return result
+    # Taken before any row is written, so concurrent syncs for a user queue up
+    # here instead of deadlocking on each other's rows and the user row.
+    lock_user(user_id)
+    months, merchants = set(), set()
+    for chunk in _chunks(list(batch.values()), CHUNK_SIZE):
+        result.merge(_upsert_chunk(user_id, chunk, months, merchants))
+    refresh_rollup(user_id, months)
+    refresh_recurring(user_id, merchants)
+    if months:
+        bump_data_version(user_id)
+
+    logger.info(
+        "Upserted %d transactions for user %s: %d inserted, %d updated, %d unchanged, %d conflicting",
+        result.total, user_id, result.inserted, result.updated, result.unchanged, result.conflicts
+    )
+    return result
+
+
+def delete_transactions(user_id: int, transaction_ids: Iterable[str]) -> int:
+    """Delete a user's transactions by Plaid ``transaction_id`` in chunked bulk DELETEs."""
+    ids = list({str(transaction_id) for transaction_id in transaction_ids})
+    if not ids:
+        return 0
+    lock_user(user_id)
+    deleted = 0
+    months, merchants = set(), set()
+    for chunk in _chunks(ids, CHUNK_SIZE):
+        months.update(transaction_months(user_id, chunk))
+        merchants.update(transaction_merchants(user_id, chunk))
+        deleted += Transaction.query.filter(
+            Transaction.user_id == user_id,
+            Transaction.transaction_id.in_(chunk)
+        ).delete(synchronize_session=False)
+    refresh_rollup(user_id, months)
+    refresh_recurring(user_id, merchants)
+    if deleted:
+        bump_data_version(user_id)
+    return deleted
+
+
+def apply_transaction_updates(user_id: int, updates: Dict[str, Any], advisor=None) -> IngestResult:
+    """Apply an added/modified/removed delta from ``fetch_transaction_updates``.
+
+    ``advisor``, an optional ``AIFinancialAdvisor``, categorizes rows the
+    local classifier is unsure about. The caller owns the session and is
+    expected to commit or roll back, storing ``updates['next_cursor']`` in
+    the same transaction.
+    """
+    changed = [*updates.get('added', []), *updates.get('modified', [])]
+    categorize_transactions(user_id, changed, advisor)
+    result = upsert_transactions(user_id, changed)
+    removed = updates.get('removed', [])
+    if removed:
+        result.removed = delete_transactions(user_id, removed)
+        logger.info("Removed %d transactions for user %s", result.removed, user_id)
+    return result
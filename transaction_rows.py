@@ -0,0 +1,75 @@
+"""
+Column-projected reads and fast JSON encoding for transaction lists.
+
+``Transaction.to_dict`` needs a fully hydrated ORM object per row, and it
+coerces every field inside a try/except. List and analytics endpoints only
+need eight columns. :func:`project` turns any ``Transaction`` query into a
+query for those columns as plain tuples. :func:`row_to_dict` unpacks a tuple
+into the same dict ``to_dict`` returns.
+
+:func:`json_response` encodes with ``orjson`` when it is installed. Otherwise
+it uses a shared stdlib encoder with compact separators and no circular
+check, which stays on the C fast path.
+"""
+
+import json
+from typing import Any, Dict, List
+
+from flask import Response
+
+from models import Transaction
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# Fields of Transaction.to_dict, in row order; ``id`` is last so keyset cursors can use it.
+COLUMNS = (
+    Transaction.transaction_id,
+    Transaction.account_id,
+    Transaction.date,
+    Transaction.name,
+    Transaction.amount,
+    Transaction.category,
+    Transaction.merchant_name,
+    Transaction.pending,
+    Transaction.id,
+)
+
+_encoder = json.JSONEncoder(separators=(',', ':'), check_circular=False, ensure_ascii=False, default=str)
+
+
+def project(query):
+    """The same ``Transaction`` query, selecting COLUMNS as tuples instead of ORM objects."""
+    return query.with_entities(*COLUMNS)
+
+
+def row_to_dict(row) -> Dict[str, Any]:
+    """``Transaction.to_dict()`` for a row of COLUMNS."""
+    transaction_id, account_id, tx_date, name, amount, category, merchant_name, pending, _ = row
+    return {
+        'id': transaction_id,
+        'account_id': account_id or '',
+        'date': tx_date.isoformat()[:10] if tx_date else '',
+        'name': name or '',
+        'amount': float(amount) if amount is not None else 0.0,
+        'category': category or 'Uncategorized',
+        'merchant_name': merchant_name or '',
+        'pending': bool(pending)
+    }
+
+
+def transaction_dicts(query) -> List[Dict[str, Any]]:
+    """Run a ``Transaction`` query through the projected path; same output as ``to_dict`` per row."""
+    return [row_to_dict(row) for row in project(query)]
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return _encoder.encode(payload).encode('utf-8')
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    return Response(dumps(payload), status=status, mimetype='application/json')